@@ -0,0 +1,68 @@
+"""Write throughput on a single hot link: one counter row vs striped shards.
+
+Run from ``backend/`` with ``DATABASE_URL`` pointing at Postgres (a throwaway
+test database is created next to it)::
+
+    python -m benchmarks.click_counters --writers 1 8 64 --increments 200
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+
+from . import scratch_database, setup_django
+
+
+def _run(link_id: int, writers: int, increments: int) -> float:
+    from django.db import connection
+
+    from shortener.counters import increment_click_counts
+
+    barrier = threading.Barrier(writers + 1)
+
+    def worker() -> None:
+        try:
+            connection.ensure_connection()
+            barrier.wait()
+            for _ in range(increments):
+                increment_click_counts({link_id: 1})
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return writers * increments / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--increments", type=int, default=200, help="Increments per writer.")
+    parser.add_argument("--shards", type=int, default=16)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+
+    from shortener.models import Link
+
+    with scratch_database():
+        link = Link.objects.create(code="benchctr", target_url="https://example.com/bench")
+        print(f"{'writers':>8} {'single row/s':>14} {'striped/s':>12} {'speedup':>8}")
+        for writers in args.writers:
+            with override_settings(CLICK_COUNTER_SHARDS=1):
+                single = _run(link.pk, writers, args.increments)
+            with override_settings(CLICK_COUNTER_SHARDS=args.shards):
+                striped = _run(link.pk, writers, args.increments)
+            print(f"{writers:>8} {single:>14.0f} {striped:>12.0f} {striped / single:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Per-character ``secrets.choice`` vs the bulk ``bytes.translate`` generator.
+
+Pure Python, no database needed::
+
+    python -m benchmarks.code_generator --lengths 7 32
+"""
+from __future__ import annotations
+
+import argparse
+import secrets
+import timeit
+from typing import Set
+
+from shortener.utils import BASE62_ALPHABET, batch_generate_codes
+
+
+def _per_char_batch(length: int, count: int) -> Set[str]:
+    codes: Set[str] = set()
+    while len(codes) < count:
+        codes.add("".join(secrets.choice(BASE62_ALPHABET) for _ in range(length)))
+    return codes
+
+
+def _best_of(func, repeat: int = 3) -> float:
+    number = 1
+    while timeit.timeit(func, number=number) < 0.2 and number < 10_000:
+        number *= 10
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[7, 32])
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'length':>6} {'count':>8} {'per-char ms':>12} {'bulk ms':>10} {'speedup':>8}")
+    for length in args.lengths:
+        for count in args.counts:
+            legacy = _best_of(lambda: _per_char_batch(length, count))
+            bulk = _best_of(lambda: batch_generate_codes(length, count))
+            print(f"{length:>6} {count:>8} {legacy * 1e3:>12.3f} {bulk * 1e3:>10.3f} {legacy / bulk:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
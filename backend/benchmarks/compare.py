@@ -0,0 +1,92 @@
+"""Compare two ``benchmarks.suite`` JSON reports and flag regressions.
+
+    python -m benchmarks.compare before.json after.json --threshold 0.10
+
+Latencies (``*_ms``) regress when they grow, throughputs (``*_per_sec``)
+when they shrink, by more than the threshold. Exits with status 1 when any
+case regressed, so it can gate CI.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_METRICS = ("p50_ms", "p95_ms", "ops_per_sec")
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_sec")
+
+
+def compare(baseline: dict, candidate: dict, *, threshold: float, metrics=DEFAULT_METRICS) -> List[dict]:
+    """One row per (scenario, case, metric) present in both reports."""
+    before: Dict[Tuple[str, str], dict] = {
+        (row["scenario"], row["case"]): row["metrics"] for row in baseline["results"]
+    }
+    rows = []
+    for result in candidate["results"]:
+        key = (result["scenario"], result["case"])
+        if key not in before:
+            continue
+        for metric in metrics:
+            old, new = before[key].get(metric), result["metrics"].get(metric)
+            if old is None or new is None or old == 0:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better(metric) else change
+            rows.append(
+                {
+                    "scenario": key[0],
+                    "case": key[1],
+                    "metric": metric,
+                    "baseline": old,
+                    "candidate": new,
+                    "change": change,
+                    "regression": worse > threshold,
+                    "improvement": -worse > threshold,
+                }
+            )
+    return rows
+
+
+def _mismatches(baseline: dict, candidate: dict) -> List[str]:
+    notes = []
+    for field in ("scale", "database", "machine"):
+        old, new = baseline["meta"].get(field), candidate["meta"].get(field)
+        if old != new:
+            notes.append(f"warning: {field} differs ({old} vs {new}); numbers may not be comparable")
+    return notes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change that counts, e.g. 0.10.")
+    parser.add_argument("--metrics", nargs="+", default=list(DEFAULT_METRICS))
+    args = parser.parse_args()
+
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    with open(args.candidate) as handle:
+        candidate = json.load(handle)
+
+    for note in _mismatches(baseline, candidate):
+        print(note)
+    rows = compare(baseline, candidate, threshold=args.threshold, metrics=args.metrics)
+    print(f"{'scenario':<9} {'case':<28} {'metric':<12} {'baseline':>11} {'candidate':>11} {'change':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ("  improved" if row["improvement"] else "")
+        print(
+            f"{row['scenario']:<9} {row['case']:<28} {row['metric']:<12} "
+            f"{row['baseline']:>11.2f} {row['candidate']:>11.2f} {row['change']:>+7.1%}{flag}"
+        )
+    regressions = sum(row["regression"] for row in rows)
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
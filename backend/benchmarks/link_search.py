@@ -0,0 +1,95 @@
+"""Link list search latency: unindexed scans vs trigram and hashed-target indexes.
+
+Run from ``backend/`` with ``DATABASE_URL`` pointing at Postgres (a throwaway
+test database is created next to it)::
+
+    python -m benchmarks.link_search --links 1000000
+
+On SQLite both search backends compile to the same ``LIKE`` scan, so only the
+exact-target comparison is meaningful there.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from . import scratch_database, setup_django
+
+
+def _seed(owner_id: int, count: int) -> None:
+    from django.db import connection
+
+    from shortener.models import Link, hash_target_url
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO shortener_link
+                    (owner_id, code, target_url, target_url_hash, is_active, created_at, updated_at, click_count)
+                SELECT %s, 'bn' || n, url, encode(sha256(convert_to(url, 'UTF8')), 'hex'), true, now(), now(), 0
+                FROM (
+                    SELECT n, 'https://shop' || (n %% 5000) || '.example.com/campaign/' || n AS url
+                    FROM generate_series(1, %s) AS n
+                ) AS rows
+                """,
+                [owner_id, count],
+            )
+            cursor.execute("ANALYZE shortener_link")
+        return
+    batch = []
+    for n in range(1, count + 1):
+        url = f"https://shop{n % 5000}.example.com/campaign/{n}"
+        batch.append(Link(owner_id=owner_id, code=f"bn{n}", target_url=url, target_url_hash=hash_target_url(url)))
+        if len(batch) == 5000:
+            Link.objects.bulk_create(batch)
+            batch = []
+    Link.objects.bulk_create(batch)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def _time(queryset_factory, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        list(queryset_factory()[:100])
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+
+    from shortener.models import Link
+    from shortener.search import IContainsSearch, TrigramSearch
+
+    with scratch_database():
+        owner = get_user_model().objects.create_user(username="bench", password="bench")
+        started = time.perf_counter()
+        _seed(owner.pk, args.links)
+        print(f"seeded {args.links} links in {time.perf_counter() - started:.1f}s")
+
+        links = Link.objects.filter(owner=owner).order_by("-created_at", "-id")
+        needle = f"campaign/{args.links // 2}"
+        target = f"https://shop{(args.links // 2) % 5000}.example.com/campaign/{args.links // 2}"
+        rows = [
+            ("search icontains", lambda: IContainsSearch().filter(links, needle)),
+            ("search trigram", lambda: TrigramSearch().filter(links, needle)),
+            ("target_url = …", lambda: links.filter(target_url=target)),
+            ("target_url_hash = …", lambda: links.for_target(target)),
+        ]
+        print(f"{'query':<22} {'median ms':>10}")
+        for label, factory in rows:
+            print(f"{label:<22} {_time(factory, args.repeats):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
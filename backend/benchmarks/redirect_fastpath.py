@@ -0,0 +1,89 @@
+"""Per-request latency and allocations: fast-path middleware vs RedirectView.
+
+Both variants run through a real ``WSGIHandler`` with the configured
+middleware; the baseline simply drops ``RedirectFastPathMiddleware``. Click
+recording goes to the in-process buffer so only request handling is timed::
+
+    python -m benchmarks.redirect_fastpath --requests 5000
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from . import scratch_database, setup_django
+
+FAST_PATH = "shortener.middleware.RedirectFastPathMiddleware"
+
+
+def _measure(path: str, requests: int, fast_path: bool) -> dict:
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.test import RequestFactory
+    from django.test.utils import override_settings
+
+    from shortener.clicks import local_click_buffer
+
+    middleware = [entry for entry in settings.MIDDLEWARE if fast_path or entry != FAST_PATH]
+    with override_settings(MIDDLEWARE=middleware, CLICK_BUFFER_BACKEND="local"):
+        handler = WSGIHandler()
+        factory = RequestFactory()
+
+        def call() -> None:
+            environ = factory.get(path).environ
+            response = handler(environ, lambda status, headers: None)
+            assert response.status_code == 302, response.status_code
+            response.close()
+
+        for _ in range(min(200, requests)):
+            call()
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        peaks = []
+        for _ in range(min(500, requests)):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+        local_click_buffer.pop_batch(len(local_click_buffer))
+
+    timings.sort()
+    return {
+        "mean_us": statistics.fmean(timings) * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p99_us": timings[int(len(timings) * 0.99)] * 1e6,
+        "peak_kib": statistics.fmean(peaks) / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from shortener.models import Link
+
+    with scratch_database():
+        link = Link.objects.create(code="benchfp1", target_url="https://example.com/fast")
+        rows = {
+            "RedirectView": _measure(f"/{link.code}", args.requests, fast_path=False),
+            "fast path": _measure(f"/{link.code}", args.requests, fast_path=True),
+        }
+    print(f"{'variant':<14} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'peak KiB/req':>13}")
+    for name, row in rows.items():
+        print(
+            f"{name:<14} {row['mean_us']:>9.1f} {row['p50_us']:>9.1f} {row['p99_us']:>9.1f} {row['peak_kib']:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Reproducible end-to-end benchmarks with JSON results.
+
+Seeds a throwaway database with ``seed_links`` and times, through the full
+middleware stack:
+
+* redirects at 1/8/32 concurrent threads, with the per-worker cache warm,
+  only the Redis tier available, or no cache at all;
+* bulk creation of 10, 200 and 10k links at code lengths 7 and 12;
+* the stats and time-series endpoints for the most clicked seeded link;
+* the link list: first page, a deep keyset page, and search.
+
+Run from ``backend/`` (use Postgres for numbers that mean anything)::
+
+    python -m benchmarks.suite --scale full --output before.json
+    python -m benchmarks.suite --scale full --output after.json
+    python -m benchmarks.compare before.json after.json
+
+``--scale smoke`` takes about a minute on SQLite.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+from . import BACKEND_DIR, scratch_database, setup_django
+
+SCALES: Dict[str, dict] = {
+    "smoke": {"links": 5_000, "clicks": 50_000, "redirects": 2_000, "repeats": 5},
+    "full": {"links": 1_000_000, "clicks": 1_000_000, "redirects": 20_000, "repeats": 20},
+}
+SCENARIOS = ("redirect", "bulk", "stats", "list")
+CONCURRENCY = (1, 8, 32)
+CACHE_STATES = ("warm", "redis", "cold")
+BULK_COUNTS = (10, 200, 10_000)
+CODE_LENGTHS = (7, 12)
+HOT_CODES = 1000
+SEED_PREFIX = "bm"
+
+# Limits would otherwise throttle the benchmark itself.
+NO_RATE_LIMITS = {name: {"limit": 0, "period": 60} for name in ("bulk", "redirect", "api")}
+
+
+def summarize(samples: List[float], elapsed: float | None = None) -> dict:
+    """Latency percentiles in ms, and throughput over ``elapsed`` (or the summed samples)."""
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+    return {
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "ops_per_sec": len(ordered) / (elapsed if elapsed is not None else sum(ordered)),
+    }
+
+
+def timed(func: Callable[[], object], repeats: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def _result(scenario: str, case: str, params: dict, metrics: dict) -> dict:
+    print(f"{scenario:<9} {case:<28} p50 {metrics['p50_ms']:>9.2f} ms  {metrics['ops_per_sec']:>10.1f} ops/s")
+    return {"scenario": scenario, "case": case, "params": params, "metrics": metrics}
+
+
+@contextmanager
+def cache_state(state: str) -> Iterator[None]:
+    from shortener.cache import link_cache
+
+    maxsize = link_cache.local.maxsize
+    link_cache.clear_local()
+    if state != "warm":
+        link_cache.local.maxsize = 0
+    if state == "cold":
+        link_cache._redis_down_until = float("inf")
+    try:
+        yield
+    finally:
+        link_cache.local.maxsize = maxsize
+        link_cache._redis_down_until = 0.0
+        link_cache.clear_local()
+
+
+def bench_redirect(scale: dict, codes: List[str]) -> Iterator[dict]:
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.test import RequestFactory
+
+    from shortener.clicks import local_click_buffer
+
+    handler = WSGIHandler()
+    environs = [RequestFactory().get(f"/{code}").environ for code in codes]
+
+    def call(index: int) -> None:
+        response = handler(dict(environs[index % len(environs)]), lambda status, headers: None)
+        assert response.status_code == 302, response.status_code
+        response.close()
+
+    for state in CACHE_STATES:
+        with cache_state(state):
+            for index in range(len(environs)):
+                call(index)
+            for threads in CONCURRENCY:
+                per_thread = max(1, scale["redirects"] // threads)
+                samples: List[float] = []
+                barrier = threading.Barrier(threads + 1)
+
+                def worker(offset: int) -> None:
+                    local = []
+                    try:
+                        barrier.wait()
+                        for step in range(per_thread):
+                            started = time.perf_counter()
+                            call(offset + step * threads)
+                            local.append(time.perf_counter() - started)
+                    finally:
+                        samples.extend(local)
+                        connection.close()
+
+                pool = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+                for thread in pool:
+                    thread.start()
+                barrier.wait()
+                started = time.perf_counter()
+                for thread in pool:
+                    thread.join()
+                elapsed = time.perf_counter() - started
+                local_click_buffer.pop_batch(len(local_click_buffer))
+                yield _result(
+                    "redirect",
+                    f"{state} c={threads}",
+                    {"cache": state, "concurrency": threads, "requests": per_thread * threads},
+                    summarize(samples, elapsed),
+                )
+
+
+def bench_bulk(scale: dict, owner) -> Iterator[dict]:
+    from shortener.services import bulk_create_links
+
+    for count in BULK_COUNTS:
+        repeats = scale["repeats"] if count <= 200 else max(2, scale["repeats"] // 10)
+        for length in CODE_LENGTHS:
+            metrics = timed(
+                lambda: bulk_create_links(
+                    owner=owner,
+                    target_url="https://example.com/bench",
+                    count=count,
+                    code_length=length,
+                    expires_at=None,
+                ),
+                repeats,
+            )
+            metrics["links_per_sec"] = metrics["ops_per_sec"] * count
+            yield _result("bulk", f"n={count} len={length}", {"count": count, "code_length": length}, metrics)
+
+
+def bench_stats(scale: dict, client, hot_link) -> Iterator[dict]:
+    from shortener.rollups import rollup_clicks
+
+    started = time.perf_counter()
+    rolled = rollup_clicks(lag_seconds=0)
+    elapsed = time.perf_counter() - started
+    yield _result("stats", "rollup all clicks", {"clicks": rolled}, summarize([elapsed]))
+
+    def get(path: str, **params) -> None:
+        response = client.get(path, params)
+        assert response.status_code == 200, response.status_code
+
+    base = f"/api/links/{hot_link.code}/stats/"
+    params = {"clicks": hot_link.click_count}
+    yield _result("stats", "summary", params, timed(lambda: get(base), scale["repeats"]))
+    for granularity in ("hour", "day"):
+        yield _result(
+            "stats",
+            f"timeseries {granularity}",
+            params,
+            timed(lambda: get(base + "timeseries/", granularity=granularity), scale["repeats"]),
+        )
+
+
+def bench_list(scale: dict, client, owner) -> Iterator[dict]:
+    from shortener.models import Link
+    from shortener.pagination import encode_cursor
+
+    def get(**params) -> None:
+        response = client.get("/api/links/", params)
+        assert response.status_code == 200, response.status_code
+
+    links = Link.objects.filter(owner=owner).order_by("-created_at", "-id")
+    middle = links.values_list("created_at", "id")[scale["links"] // 2]
+    needle = f"campaign/{scale['links'] // 2}"
+    cases = {
+        "first page": {},
+        "deep page": {"cursor": encode_cursor(*middle)},
+        "search": {"q": needle},
+        "search + fields": {"q": needle, "fields": "code,target_url"},
+    }
+    for case, params in cases.items():
+        yield _result("list", case, {"links": scale["links"], **params}, timed(lambda: get(**params), scale["repeats"]))
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scale_name: str, scenarios: List[str]) -> dict:
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+
+    from shortener.models import Link
+    from shortener.seeding import seed_code
+
+    scale = SCALES[scale_name]
+    results: List[dict] = []
+    overrides = {"ALLOWED_HOSTS": ["*"], "CLICK_BUFFER_BACKEND": "local", "RATE_LIMIT_POLICIES": NO_RATE_LIMITS}
+    with scratch_database(), override_settings(**overrides):
+        started = time.perf_counter()
+        call_command(
+            "seed_links",
+            links=scale["links"],
+            clicks=scale["clicks"],
+            seed=0,
+            prefix=SEED_PREFIX,
+            owner="bench",
+            stdout=io.StringIO(),
+        )
+        seeded_in = time.perf_counter() - started
+        print(f"seeded {scale['links']} links / {scale['clicks']} clicks in {seeded_in:.1f}s")
+        owner = get_user_model().objects.get(username="bench")
+        client = APIClient()
+        client.force_authenticate(owner)
+        hot_link = Link.objects.filter(owner=owner).order_by("-click_count").first()
+        codes = [seed_code(SEED_PREFIX, number) for number in range(min(HOT_CODES, scale["links"]))]
+
+        if "redirect" in scenarios:
+            results.extend(bench_redirect(scale, codes))
+        if "stats" in scenarios:
+            results.extend(bench_stats(scale, client, hot_link))
+        if "list" in scenarios:
+            results.extend(bench_list(scale, client, owner))
+        # Last, since it adds links that would shift the list cases.
+        if "bulk" in scenarios:
+            results.extend(bench_bulk(scale, owner))
+        vendor = connection.vendor
+
+    return {
+        "meta": {
+            "scale": scale_name,
+            "params": scale,
+            "database": vendor,
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "seed_seconds": seeded_in,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="smoke")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    args = parser.parse_args()
+
+    setup_django()
+    report = run(args.scale, args.scenarios)
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
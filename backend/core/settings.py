@@ -3,6 +3,7 @@ from datetime import timedelta
 from pathlib import Path
 
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -16,6 +17,8 @@ CORS_ALLOWED_ORIGINS = [
     if origin.strip()
 ]
 
+CORS_EXPOSE_HEADERS = ["Link", "X-Next-Cursor"]
+
 CSRF_TRUSTED_ORIGINS = [
     origin.strip()
     for origin in os.environ.get("CSRF_TRUSTED_ORIGINS", "http://localhost:5173").split(",")
@@ -36,6 +39,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "shortener.metrics.MetricsMiddleware",
+    "shortener.middleware.ReplicaRoutingMiddleware",
+    "shortener.middleware.RedirectFastPathMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -68,16 +74,48 @@ TEMPLATES = [
 WSGI_APPLICATION = "core.wsgi.application"
 ASGI_APPLICATION = "core.asgi.application"
 
+# "persistent" keeps one connection per worker thread open for
+# DATABASE_CONN_MAX_AGE seconds. "pgbouncer" targets a PgBouncer in
+# transaction pooling mode, where server-side cursors cannot work because
+# consecutive transactions may land on different server connections.
+DATABASE_POOL_MODE = os.environ.get("DATABASE_POOL_MODE", "persistent")
+if DATABASE_POOL_MODE not in ("persistent", "pgbouncer"):
+    raise ImproperlyConfigured("DATABASE_POOL_MODE must be 'persistent' or 'pgbouncer'")
+
 DATABASES = {
     "default": dj_database_url.config(
         default=os.environ.get(
             "DATABASE_URL",
             "postgres://postgres:postgres@db:5432/postgres",
         ),
-        conn_max_age=600,
+        conn_max_age=int(os.environ.get("DATABASE_CONN_MAX_AGE", 600)),
+        conn_health_checks=True,
     )
 }
 
+# Read replicas, as a comma-separated list of database URLs. Requests read
+# from them; writes, transactions and background workers use "default".
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(",")), start=1):
+    alias = f"replica_{index}"
+    DATABASES[alias] = dj_database_url.parse(
+        url.strip(),
+        conn_max_age=DATABASES["default"]["CONN_MAX_AGE"],
+        conn_health_checks=True,
+    )
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(alias)
+for alias in DATABASES:
+    if DATABASE_POOL_MODE == "pgbouncer":
+        DATABASES[alias]["DISABLE_SERVER_SIDE_CURSORS"] = True
+DATABASE_ROUTERS = ["shortener.db_router.PrimaryReplicaRouter"]
+DATABASE_REPLICA_STICKY_SECONDS = float(os.environ.get("DATABASE_REPLICA_STICKY_SECONDS", 5))
+DATABASE_REPLICA_HEALTH_CHECK_SECONDS = float(os.environ.get("DATABASE_REPLICA_HEALTH_CHECK_SECONDS", 10))
+DATABASE_REPLICA_MAX_LAG_SECONDS = float(os.environ.get("DATABASE_REPLICA_MAX_LAG_SECONDS", 30))
+DATABASE_REPLICA_STICKY_REDIS_URL = os.environ.get(
+    "DATABASE_REPLICA_STICKY_REDIS_URL", os.environ.get("REDIS_URL", "redis://redis:6379/0")
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -96,13 +134,20 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Reverse proxies in front of the app that append to X-Forwarded-For; 0 trusts none of it.
+NUM_PROXIES = int(os.environ.get("NUM_PROXIES", 0))
+
 REST_FRAMEWORK = {
+    "NUM_PROXIES": NUM_PROXIES,
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    "DEFAULT_THROTTLE_CLASSES": (
+        "shortener.throttling.PolicyRateThrottle",
+    ),
 }
 
 SIMPLE_JWT = {
@@ -112,15 +157,98 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
 }
 
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "True").lower() == "true"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Serve metrics without the token or a staff session, e.g. when only reachable on an internal network.
+METRICS_PUBLIC = os.environ.get("METRICS_PUBLIC", "False").lower() == "true"
+
 REDIRECT_BASE_URL = os.environ.get("REDIRECT_BASE_URL", "http://localhost:8000")
+REDIRECT_FAST_PATH = os.environ.get("REDIRECT_FAST_PATH", "True").lower() == "true"
+ASYNC_REDIRECTS = os.environ.get("ASYNC_REDIRECTS", "False").lower() == "true"
+
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 50))
+REDIS_POOL_TIMEOUT_SECONDS = float(os.environ.get("REDIS_POOL_TIMEOUT_SECONDS", 1))
+REDIS_SOCKET_TIMEOUT_SECONDS = float(os.environ.get("REDIS_SOCKET_TIMEOUT_SECONDS", 1))
+REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS", 1))
+REDIS_HEALTH_CHECK_INTERVAL_SECONDS = int(os.environ.get("REDIS_HEALTH_CHECK_INTERVAL_SECONDS", 30))
 
 RATE_LIMIT_REDIS_URL = os.environ.get("RATE_LIMIT_REDIS_URL", os.environ.get("REDIS_URL", "redis://redis:6379/0"))
 BULK_RATE_LIMIT = int(os.environ.get("BULK_RATE_LIMIT", 10))
 BULK_RATE_PERIOD_SECONDS = int(os.environ.get("BULK_RATE_PERIOD_SECONDS", 60))
+RATE_LIMIT_FAILURE_MODE = os.environ.get("RATE_LIMIT_FAILURE_MODE", "local")
+RATE_LIMIT_LOCAL_MULTIPLIER = float(os.environ.get("RATE_LIMIT_LOCAL_MULTIPLIER", 1))
+RATE_LIMIT_LOCAL_MAX_KEYS = int(os.environ.get("RATE_LIMIT_LOCAL_MAX_KEYS", 100_000))
+RATE_LIMIT_REDIS_RETRY_SECONDS = float(os.environ.get("RATE_LIMIT_REDIS_RETRY_SECONDS", 5))
+RATE_LIMIT_POLICIES = {
+    "bulk": {"limit": BULK_RATE_LIMIT, "period": BULK_RATE_PERIOD_SECONDS, "algorithm": "sliding_log"},
+    "redirect": {"limit": 600, "period": 60, "algorithm": "gcra"},
+    "api": {"limit": 1200, "period": 60, "algorithm": "gcra"},
+}
+# Overrides look like "redirect=300/60,api=100/1:sliding_log"; a limit of 0 disables a policy.
+for entry in os.environ.get("RATE_LIMIT_POLICIES", "").split(","):
+    if "=" not in entry:
+        continue
+    name, spec = (part.strip() for part in entry.split("=", 1))
+    rate, _, algorithm = spec.partition(":")
+    limit, _, period = rate.partition("/")
+    RATE_LIMIT_POLICIES[name] = {
+        "limit": int(limit),
+        "period": float(period or 60),
+        "algorithm": algorithm or RATE_LIMIT_POLICIES.get(name, {}).get("algorithm", "gcra"),
+    }
+LINK_CACHE_REDIS_URL = os.environ.get("LINK_CACHE_REDIS_URL", os.environ.get("REDIS_URL", "redis://redis:6379/0"))
+LINK_CACHE_LOCAL_MAXSIZE = int(os.environ.get("LINK_CACHE_LOCAL_MAXSIZE", 10000))
+LINK_CACHE_LOCAL_TTL_SECONDS = float(os.environ.get("LINK_CACHE_LOCAL_TTL_SECONDS", 5))
+LINK_CACHE_TTL_SECONDS = int(os.environ.get("LINK_CACHE_TTL_SECONDS", 300))
+LINK_CACHE_NEGATIVE_TTL_SECONDS = int(os.environ.get("LINK_CACHE_NEGATIVE_TTL_SECONDS", 30))
+LINK_CACHE_REDIS_RETRY_SECONDS = float(os.environ.get("LINK_CACHE_REDIS_RETRY_SECONDS", 5))
+CLICK_BUFFER_BACKEND = os.environ.get("CLICK_BUFFER_BACKEND", "redis")
+CLICK_BUFFER_REDIS_URL = os.environ.get("CLICK_BUFFER_REDIS_URL", os.environ.get("REDIS_URL", "redis://redis:6379/0"))
+CLICK_BUFFER_REDIS_KEY = os.environ.get("CLICK_BUFFER_REDIS_KEY", "clicks:pending")
+CLICK_BUFFER_DEAD_LETTER_KEY = os.environ.get("CLICK_BUFFER_DEAD_LETTER_KEY", "clicks:dead")
+CLICK_FLUSH_BATCH_SIZE = int(os.environ.get("CLICK_FLUSH_BATCH_SIZE", 500))
+CLICK_FLUSH_INTERVAL_SECONDS = float(os.environ.get("CLICK_FLUSH_INTERVAL_SECONDS", 1))
+CLICK_COUNTER_SHARDS = int(os.environ.get("CLICK_COUNTER_SHARDS", 16))
+ROLLUP_SAFETY_LAG_SECONDS = int(os.environ.get("ROLLUP_SAFETY_LAG_SECONDS", 30))
+ROLLUP_BATCH_SIZE = int(os.environ.get("ROLLUP_BATCH_SIZE", 5000))
+STATS_MAX_BUCKETS = int(os.environ.get("STATS_MAX_BUCKETS", 1000))
+STATS_RECENT_CLICKS_WINDOW_DAYS = int(os.environ.get("STATS_RECENT_CLICKS_WINDOW_DAYS", 31))
+CLICK_PARTITION_MONTHS_AHEAD = int(os.environ.get("CLICK_PARTITION_MONTHS_AHEAD", 3))
+CLICK_RETENTION_MONTHS = int(os.environ.get("CLICK_RETENTION_MONTHS", 0))
+CLICK_ARCHIVE_DIR = os.environ.get("CLICK_ARCHIVE_DIR", "")
+GEOIP_DATABASE_PATH = os.environ.get("GEOIP_DATABASE_PATH", "")
+GEOIP_CACHE_SIZE = int(os.environ.get("GEOIP_CACHE_SIZE", 65536))
+USER_AGENT_CACHE_SIZE = int(os.environ.get("USER_AGENT_CACHE_SIZE", 10000))
+CLICK_EXCLUDE_BOTS = os.environ.get("CLICK_EXCLUDE_BOTS", "False").lower() == "true"
+LINK_EXPIRY_BATCH_SIZE = int(os.environ.get("LINK_EXPIRY_BATCH_SIZE", 1000))
+LINK_EXPIRED_PURGE_DAYS = int(os.environ.get("LINK_EXPIRED_PURGE_DAYS", 0))
 MAX_BULK_LINKS = int(os.environ.get("MAX_BULK_LINKS", 200))
+LINK_SEARCH_BACKEND = os.environ.get("LINK_SEARCH_BACKEND", "auto")
+LINK_LIST_PAGE_SIZE = int(os.environ.get("LINK_LIST_PAGE_SIZE", 100))
+LINK_LIST_MAX_PAGE_SIZE = int(os.environ.get("LINK_LIST_MAX_PAGE_SIZE", 1000))
+BULK_STREAM_CHUNK_SIZE = int(os.environ.get("BULK_STREAM_CHUNK_SIZE", 1000))
+BULK_STREAM_MAX_ROWS = int(os.environ.get("BULK_STREAM_MAX_ROWS", 1_000_000))
+BULK_JOB_MAX_LINKS = int(os.environ.get("BULK_JOB_MAX_LINKS", 100_000))
+BULK_JOB_CHUNK_SIZE = int(os.environ.get("BULK_JOB_CHUNK_SIZE", 1000))
+BULK_JOB_STALE_SECONDS = int(os.environ.get("BULK_JOB_STALE_SECONDS", 300))
+BULK_JOB_PAGE_SIZE = int(os.environ.get("BULK_JOB_PAGE_SIZE", 100))
 DEFAULT_CODE_LENGTH = int(os.environ.get("DEFAULT_CODE_LENGTH", 7))
 MIN_CODE_LENGTH = int(os.environ.get("MIN_CODE_LENGTH", 4))
 MAX_CODE_LENGTH = int(os.environ.get("MAX_CODE_LENGTH_LIMIT", 32))
+CODE_BLOCK_SIZE = int(os.environ.get("CODE_BLOCK_SIZE", 1000))
+CODE_POOL_SIZES = {
+    int(length): int(size)
+    for length, size in (
+        entry.split(":", 1) for entry in os.environ.get("CODE_POOL_SIZES", "").split(",") if entry.strip()
+    )
+}
+CODE_POOL_LOW_WATERMARK = float(os.environ.get("CODE_POOL_LOW_WATERMARK", 0.25))
+CODE_PERMUTATION_KEY = os.environ.get("CODE_PERMUTATION_KEY", SECRET_KEY)
+CODE_FILTER_ENABLED = os.environ.get("CODE_FILTER_ENABLED", "True").lower() == "true"
+CODE_FILTER_CAPACITY = int(os.environ.get("CODE_FILTER_CAPACITY", 1_000_000))
+CODE_FILTER_ERROR_RATE = float(os.environ.get("CODE_FILTER_ERROR_RATE", 0.001))
+CODE_FILTER_SYNC_SECONDS = float(os.environ.get("CODE_FILTER_SYNC_SECONDS", 1))
+CODE_FILTER_PATH = os.environ.get("CODE_FILTER_PATH", "")
 
 DENYLIST_SCHEMES = {
     scheme.strip().lower()
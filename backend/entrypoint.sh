@@ -5,4 +5,22 @@ set -o nounset
 python manage.py migrate --noinput
 python manage.py collectstatic --noinput
 
-exec gunicorn core.wsgi:application --bind 0.0.0.0:${PORT:-8000} --workers ${GUNICORN_WORKERS:-3}
+# Workers warm-start their code filter from this file instead of each
+# streaming every code from the database.
+if [ -n "${CODE_FILTER_PATH:-}" ]; then
+    python manage.py build_code_filter
+fi
+
+# Gunicorn workers share metrics through this directory; stale files from a
+# previous run would be counted again, so start from an empty one.
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    export ASYNC_REDIRECTS="${ASYNC_REDIRECTS:-true}"
+    exec gunicorn core.asgi:application --config gunicorn.conf.py --bind 0.0.0.0:${PORT:-8000} --workers ${GUNICORN_WORKERS:-3} \
+        --worker-class uvicorn.workers.UvicornWorker
+fi
+
+exec gunicorn core.wsgi:application --config gunicorn.conf.py --bind 0.0.0.0:${PORT:-8000} --workers ${GUNICORN_WORKERS:-3}
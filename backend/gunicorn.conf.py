@@ -0,0 +1,15 @@
+from prometheus_client import multiprocess
+
+
+def post_worker_init(worker):
+    # Django is set up by now; load the code filter before requests need it
+    # rather than inside one.
+    from shortener.code_filter import code_filter
+
+    code_filter.start()
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges; its counters and histograms stay
+    # in PROMETHEUS_MULTIPROC_DIR so totals keep adding up across restarts.
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Click, Link
+from .models import BulkJob, Click, Link, UserAgent
 
 
 @admin.register(Link)
@@ -15,3 +15,18 @@ class ClickAdmin(admin.ModelAdmin):
     list_display = ("link", "ts", "ip", "referrer")
     search_fields = ("link__code", "ip", "referrer")
     list_filter = ("ts",)
+    raw_id_fields = ("ua",)
+
+
+@admin.register(UserAgent)
+class UserAgentAdmin(admin.ModelAdmin):
+    list_display = ("browser", "os", "device", "is_bot", "created_at")
+    search_fields = ("raw",)
+    list_filter = ("is_bot", "device")
+
+
+@admin.register(BulkJob)
+class BulkJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "owner", "status", "created_count", "requested_count", "created_at")
+    list_filter = ("status",)
+    search_fields = ("id", "idempotency_key", "target_url")
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from .models import CodeSequence
+from .utils import BASE62_ALPHABET
+
+RADIX = len(BASE62_ALPHABET)
+
+
+class CodePermutation:
+    """Keyed bijection on ``[0, 62**length)`` rendered as a base62 code.
+
+    An FF1-style alternating Feistel network over the two halves of the
+    base62 digits, so every sequence number maps to a distinct code of the
+    requested length and consecutive numbers look unrelated without the key.
+    """
+
+    def __init__(self, key: bytes, length: int, rounds: int = 10):
+        if length < 2:
+            raise ValueError("length must be at least 2")
+        self.key = key
+        self.length = length
+        self.rounds = rounds
+        self.size = RADIX**length
+        self._mod_u = RADIX ** (length // 2)
+        self._mod_v = RADIX ** (length - length // 2)
+
+    def _round(self, index: int, value: int) -> int:
+        digest = hashlib.blake2b(
+            bytes((index, self.length)) + value.to_bytes(24, "big"),
+            key=self.key,
+            digest_size=24,
+        ).digest()
+        return int.from_bytes(digest, "big")
+
+    def permute(self, value: int) -> int:
+        if not 0 <= value < self.size:
+            raise ValueError("value outside the code space")
+        a, b = divmod(value, self._mod_v)
+        for index in range(self.rounds):
+            modulus = self._mod_u if index % 2 == 0 else self._mod_v
+            a, b = b, (a + self._round(index, b)) % modulus
+        return a * self._mod_v + b
+
+    def encode(self, value: int) -> str:
+        number = self.permute(value)
+        digits = []
+        for _ in range(self.length):
+            number, digit = divmod(number, RADIX)
+            digits.append(BASE62_ALPHABET[digit])
+        return "".join(reversed(digits))
+
+
+@lru_cache(maxsize=None)
+def get_permutation(key: bytes, length: int) -> CodePermutation:
+    return CodePermutation(key, length)
+
+
+def permutation_key() -> bytes:
+    return hashlib.blake2b(settings.CODE_PERMUTATION_KEY.encode(), digest_size=32).digest()
+
+
+def reserve_block(length: int, size: int) -> Tuple[int, int]:
+    """Reserve ``size`` sequence numbers for ``length`` and return ``[start, end)``."""
+    if connection.vendor == "postgresql":
+        start, end = _reserve_block_postgres(length, size)
+    else:
+        start, end = _reserve_block_table(length, size)
+    limit = RADIX**length
+    if start >= limit:
+        raise IntegrityError(f"Code space for length {length} is exhausted")
+    return start, min(end, limit)
+
+
+def _reserve_block_postgres(length: int, size: int) -> Tuple[int, int]:
+    # nextval() is not rolled back with the surrounding transaction, so a
+    # block handed to this worker can never be handed out again. The block
+    # size is the sequence's INCREMENT, fixed when the sequence is created.
+    sequence = f"shortener_code_seq_{length}"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE SEQUENCE IF NOT EXISTS {sequence} AS bigint MINVALUE 0 START WITH 0 INCREMENT BY {int(size)}"
+        )
+        cursor.execute(
+            "SELECT nextval(%s), increment_by FROM pg_sequences "
+            "WHERE schemaname = current_schema() AND sequencename = %s",
+            [sequence, sequence],
+        )
+        start, increment = cursor.fetchone()
+    return start, start + increment
+
+
+def _reserve_block_table(length: int, size: int) -> Tuple[int, int]:
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                sequence, _ = CodeSequence.objects.select_for_update().get_or_create(length=length)
+                start = sequence.next_value
+                sequence.next_value = start + size
+                sequence.save(update_fields=["next_value"])
+                return start, start + size
+        except IntegrityError:
+            continue
+    raise IntegrityError(f"Could not reserve a code block for length {length}")
+
+
+class CodeAllocator:
+    """Hands out unique codes from per-worker blocks of sequence numbers."""
+
+    def __init__(self, block_size: int | None = None):
+        self.block_size = block_size
+        self._blocks: Dict[int, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, length: int, count: int = 1) -> List[str]:
+        permutation = get_permutation(permutation_key(), length)
+        return [permutation.encode(value) for value in self._take(length, count)]
+
+    def _take(self, length: int, count: int) -> List[int]:
+        block_size = self.block_size or settings.CODE_BLOCK_SIZE
+        values: List[int] = []
+        with self._lock:
+            while len(values) < count:
+                start, end = self._blocks.get(length, (0, 0))
+                if start >= end:
+                    start, end = reserve_block(length, block_size)
+                take = min(end - start, count - len(values))
+                values.extend(range(start, start + take))
+                self._blocks[length] = (start + take, end)
+        return values
+
+    def reset(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+
+
+code_allocator = CodeAllocator()
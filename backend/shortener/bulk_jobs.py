@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import logging
+import uuid
+from datetime import timedelta
+from typing import Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from rest_framework import exceptions
+
+from .models import BulkJob
+from .services import bulk_create_links
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def submit_job(
+    *,
+    owner: User,
+    target_url: str,
+    count: int,
+    code_length: int,
+    expires_at,
+    idempotency_key: str | None = None,
+) -> Tuple[BulkJob, bool]:
+    """Queue a bulk job, or return the job already queued under ``idempotency_key``.
+
+    Returns ``(job, created)``. Reusing a key with different parameters is a
+    client error rather than a silent replay.
+    """
+    params = {
+        "target_url": target_url,
+        "requested_count": count,
+        "code_length": code_length,
+        "expires_at": expires_at,
+    }
+    if idempotency_key:
+        existing = BulkJob.objects.filter(owner=owner, idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return _retry_if_failed(_replay(existing, params)), False
+    try:
+        with transaction.atomic():
+            job = BulkJob.objects.create(owner=owner, idempotency_key=idempotency_key or None, **params)
+    except IntegrityError:
+        # A concurrent retry with the same key won the insert.
+        existing = BulkJob.objects.filter(owner=owner, idempotency_key=idempotency_key).first()
+        if existing is None:
+            raise
+        return _replay(existing, params), False
+    return job, True
+
+
+def _replay(job: BulkJob, params: dict) -> BulkJob:
+    if any(getattr(job, field) != value for field, value in params.items()):
+        raise exceptions.ValidationError(
+            {"idempotency_key": "This key was already used for a job with different parameters."}
+        )
+    return job
+
+
+def _retry_if_failed(job: BulkJob) -> BulkJob:
+    """Resubmitting a failed job queues it again; it resumes from ``created_count``."""
+    if job.status == BulkJob.Status.FAILED:
+        BulkJob.objects.filter(pk=job.pk, status=BulkJob.Status.FAILED).update(
+            status=BulkJob.Status.PENDING, error="", finished_at=None
+        )
+        job.refresh_from_db()
+    return job
+
+
+class JobLost(Exception):
+    """Another worker reclaimed the job; this one must stop writing to it."""
+
+
+def claim_job() -> BulkJob | None:
+    """Claim the oldest pending job, or a running one whose worker went quiet."""
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.BULK_JOB_STALE_SECONDS)
+    with transaction.atomic():
+        job = (
+            BulkJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                models.Q(status=BulkJob.Status.PENDING)
+                | models.Q(status=BulkJob.Status.RUNNING, heartbeat_at__lt=stale_before)
+            )
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = BulkJob.Status.RUNNING
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        job.claim_token = uuid.uuid4()
+        job.save(update_fields=["status", "started_at", "heartbeat_at", "claim_token"])
+    return job
+
+
+def _lock_owned(job: BulkJob) -> BulkJob:
+    current = BulkJob.objects.select_for_update().get(pk=job.pk)
+    if current.claim_token != job.claim_token or current.status != BulkJob.Status.RUNNING:
+        raise JobLost(f"Bulk job {job.pk} was reclaimed by another worker.")
+    return current
+
+
+def run_job(job: BulkJob, chunk_size: int | None = None) -> BulkJob:
+    """Create the job's links chunk by chunk.
+
+    Each chunk's links and the job's progress counter commit together, so a
+    job picked up again after a crash resumes from ``created_count`` without
+    minting duplicates. Every chunk locks the job row and checks the claim
+    token first, so a worker that stalled past ``BULK_JOB_STALE_SECONDS``
+    stops as soon as it notices another worker has taken over.
+    """
+    chunk_size = chunk_size or settings.BULK_JOB_CHUNK_SIZE
+    try:
+        while True:
+            with transaction.atomic():
+                current = _lock_owned(job)
+                job.created_count = current.created_count
+                if job.created_count >= job.requested_count:
+                    break
+                created, _ = bulk_create_links(
+                    owner=job.owner,
+                    target_url=job.target_url,
+                    count=min(chunk_size, job.requested_count - job.created_count),
+                    code_length=job.code_length,
+                    expires_at=job.expires_at,
+                    bulk_job=job,
+                )
+                job.created_count += len(created)
+                job.heartbeat_at = timezone.now()
+                job.save(update_fields=["created_count", "heartbeat_at"])
+    except JobLost:
+        logger.warning("Bulk job %s was reclaimed by another worker; stopping", job.pk)
+        job.refresh_from_db()
+        return job
+    except Exception as exc:
+        logger.exception("Bulk job %s failed", job.pk)
+        job.refresh_from_db(fields=["created_count"])
+        job.status = BulkJob.Status.FAILED
+        job.error = str(exc) or exc.__class__.__name__
+    else:
+        job.status = BulkJob.Status.SUCCEEDED
+    job.finished_at = timezone.now()
+    # Only the worker that still holds the claim may finish the job.
+    BulkJob.objects.filter(pk=job.pk, claim_token=job.claim_token).update(
+        status=job.status, error=job.error, finished_at=job.finished_at
+    )
+    return job
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Generic, Hashable, Iterable, Optional, TypeVar
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from redis.exceptions import RedisError
+
+from .connections import get_async_redis, get_redis
+from .metrics import LINK_CACHE_LOOKUPS
+
+K = TypeVar("K", bound=Hashable)
+
+MISSING: Any = object()
+_NEGATIVE_MARKER = b"-"
+
+
+@dataclass(frozen=True)
+class LinkResolution:
+    link_id: int
+    target_url: str
+    is_active: bool
+    expires_at: Optional[datetime] = None
+
+    def is_expired(self) -> bool:
+        return bool(self.expires_at and timezone.now() >= self.expires_at)
+
+    def dumps(self) -> bytes:
+        return json.dumps(
+            {
+                "id": self.link_id,
+                "url": self.target_url,
+                "active": self.is_active,
+                "exp": self.expires_at.isoformat() if self.expires_at else None,
+            },
+            separators=(",", ":"),
+        ).encode()
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "LinkResolution":
+        data = json.loads(raw)
+        expires_at = parse_datetime(data["exp"]) if data.get("exp") else None
+        return cls(
+            link_id=data["id"],
+            target_url=data["url"],
+            is_active=data["active"],
+            expires_at=expires_at,
+        )
+
+
+class LocalTTLCache(Generic[K]):
+    """Bounded, thread-safe LRU whose entries also expire after a TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K, default: Any = MISSING) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: Any, ttl: float | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LinkResolutionCache:
+    """Per-worker LRU in front of a shared Redis layer.
+
+    Values are ``LinkResolution`` instances, or ``None`` for codes known not
+    to exist. ``get`` returns ``MISSING`` when neither tier has an answer.
+    """
+
+    key_prefix = "link:res:"
+
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        *,
+        local_maxsize: int | None = None,
+        local_ttl: float | None = None,
+        ttl: int | None = None,
+        negative_ttl: int | None = None,
+    ):
+        self.redis_url = redis_url or settings.LINK_CACHE_REDIS_URL
+        self.ttl = ttl if ttl is not None else settings.LINK_CACHE_TTL_SECONDS
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.LINK_CACHE_NEGATIVE_TTL_SECONDS
+        self.local = LocalTTLCache[str](
+            maxsize=local_maxsize if local_maxsize is not None else settings.LINK_CACHE_LOCAL_MAXSIZE,
+            ttl=local_ttl if local_ttl is not None else settings.LINK_CACHE_LOCAL_TTL_SECONDS,
+        )
+        self._client: redis.Redis | None = None
+        self._async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._redis_down_until = 0.0
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = get_redis(self.redis_url)
+        return self._client
+
+    @property
+    def async_client(self) -> aioredis.Redis:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = get_async_redis(self.redis_url)
+        return client
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _mark_redis_down(self) -> None:
+        self._redis_down_until = time.monotonic() + settings.LINK_CACHE_REDIS_RETRY_SECONDS
+
+    def _local_ttl_for(self, value: LinkResolution | None) -> float:
+        if value is None:
+            return min(self.local.ttl, self.negative_ttl)
+        return self.local.ttl
+
+    def get(self, code: str) -> LinkResolution | None:
+        value = self.local.get(code)
+        if value is not MISSING:
+            LINK_CACHE_LOOKUPS.labels("local", "hit").inc()
+            return value
+        if not self._redis_available():
+            LINK_CACHE_LOOKUPS.labels("redis", "skipped").inc()
+            return MISSING
+        try:
+            raw = self.client.get(self.key_prefix + code)
+        except RedisError:
+            self._mark_redis_down()
+            LINK_CACHE_LOOKUPS.labels("redis", "error").inc()
+            return MISSING
+        if raw is None:
+            LINK_CACHE_LOOKUPS.labels("redis", "miss").inc()
+            return MISSING
+        LINK_CACHE_LOOKUPS.labels("redis", "hit").inc()
+        value = self._decode(raw)
+        self.local.set(code, value, ttl=self._local_ttl_for(value))
+        return value
+
+    def set(self, code: str, value: LinkResolution | None) -> None:
+        self.local.set(code, value, ttl=self._local_ttl_for(value))
+        if not self._redis_available():
+            return
+        raw, ttl = self._encode(value)
+        try:
+            self.client.set(self.key_prefix + code, raw, ex=ttl)
+        except RedisError:
+            self._mark_redis_down()
+
+    async def aget(self, code: str) -> LinkResolution | None:
+        value = self.local.get(code)
+        if value is not MISSING:
+            LINK_CACHE_LOOKUPS.labels("local", "hit").inc()
+            return value
+        if not self._redis_available():
+            LINK_CACHE_LOOKUPS.labels("redis", "skipped").inc()
+            return MISSING
+        try:
+            raw = await self.async_client.get(self.key_prefix + code)
+        except RedisError:
+            self._mark_redis_down()
+            LINK_CACHE_LOOKUPS.labels("redis", "error").inc()
+            return MISSING
+        if raw is None:
+            LINK_CACHE_LOOKUPS.labels("redis", "miss").inc()
+            return MISSING
+        LINK_CACHE_LOOKUPS.labels("redis", "hit").inc()
+        value = self._decode(raw)
+        self.local.set(code, value, ttl=self._local_ttl_for(value))
+        return value
+
+    async def aset(self, code: str, value: LinkResolution | None) -> None:
+        self.local.set(code, value, ttl=self._local_ttl_for(value))
+        if not self._redis_available():
+            return
+        raw, ttl = self._encode(value)
+        try:
+            await self.async_client.set(self.key_prefix + code, raw, ex=ttl)
+        except RedisError:
+            self._mark_redis_down()
+
+    def _encode(self, value: LinkResolution | None) -> tuple[bytes, int]:
+        if value is None:
+            return _NEGATIVE_MARKER, self.negative_ttl
+        return value.dumps(), self.ttl
+
+    @staticmethod
+    def _decode(raw: bytes) -> LinkResolution | None:
+        return None if raw == _NEGATIVE_MARKER else LinkResolution.loads(raw)
+
+    def invalidate(self, code: str) -> None:
+        self.invalidate_many([code])
+
+    def invalidate_many(self, codes: Iterable[str]) -> None:
+        codes = [code for code in codes if code]
+        if not codes:
+            return
+        for code in codes:
+            self.local.delete(code)
+        try:
+            self.client.delete(*(self.key_prefix + code for code in codes))
+        except RedisError:
+            self._mark_redis_down()
+
+    def clear_local(self) -> None:
+        self.local.clear()
+
+
+link_cache = LinkResolutionCache()
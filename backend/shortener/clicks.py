@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Deque, Iterable, List, Optional, Protocol, Set
+
+import redis
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from redis.exceptions import RedisError
+
+from .connections import get_async_redis, get_redis
+from .counters import increment_click_counts
+from .db_router import use_primary
+from .geoip import country_for
+from .metrics import CLICKS_DEAD_LETTERED, CLICKS_FLUSHED, CLICKS_RECORDED
+from .models import Click, Link
+from .user_agents import agent_cache, clean
+from .visitors import record_visitors, visitor_keys
+
+logger = logging.getLogger(__name__)
+
+# Errors that say the database is unreachable rather than that a click is bad;
+# those batches go back on the buffer instead of to the dead-letter list.
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+def clean_ip(value: str | None) -> str | None:
+    """Canonical form of an IP address, or None for anything an ``inet`` column would reject."""
+    if not value:
+        return None
+    try:
+        address = ipaddress.ip_address(value.strip())
+    except ValueError:
+        return None
+    # Drops an IPv6 zone id ("fe80::1%eth0"), which inet doesn't accept either.
+    return str(type(address)(int(address)))
+
+
+@dataclass
+class ClickEvent:
+    link_id: int
+    ip: Optional[str] = None
+    user_agent: Optional[str] = None
+    referrer: Optional[str] = None
+    country: Optional[str] = None
+    ts: datetime = field(default_factory=timezone.now)
+
+    def __post_init__(self) -> None:
+        self.ip = clean_ip(self.ip)
+
+    def dumps(self) -> bytes:
+        data = asdict(self)
+        data["ts"] = self.ts.isoformat()
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    @classmethod
+    def loads(cls, raw: bytes | str) -> "ClickEvent":
+        data = json.loads(raw)
+        data["ts"] = parse_datetime(data["ts"])
+        return cls(**data)
+
+
+class ClickBuffer(Protocol):
+    def push(self, event: ClickEvent) -> None: ...
+
+    async def apush(self, event: ClickEvent) -> None: ...
+
+    def pop_batch(self, max_items: int) -> List[ClickEvent]: ...
+
+    def requeue(self, events: List[ClickEvent]) -> None: ...
+
+    def dead_letter(self, events: List[ClickEvent]) -> None: ...
+
+
+class RedisClickBuffer:
+    def __init__(self, redis_url: str | None = None, key: str | None = None, dead_key: str | None = None):
+        self.redis_url = redis_url or settings.CLICK_BUFFER_REDIS_URL
+        self.key = key or settings.CLICK_BUFFER_REDIS_KEY
+        self.dead_key = dead_key or settings.CLICK_BUFFER_DEAD_LETTER_KEY
+        self._client: redis.Redis | None = None
+        self._async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = get_redis(self.redis_url)
+        return self._client
+
+    @property
+    def async_client(self) -> aioredis.Redis:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = get_async_redis(self.redis_url)
+        return client
+
+    def push(self, event: ClickEvent) -> None:
+        self.client.rpush(self.key, event.dumps())
+
+    async def apush(self, event: ClickEvent) -> None:
+        await self.async_client.rpush(self.key, event.dumps())
+
+    def pop_batch(self, max_items: int) -> List[ClickEvent]:
+        raw_items = self.client.lpop(self.key, max_items) or []
+        return [ClickEvent.loads(raw) for raw in raw_items]
+
+    def requeue(self, events: List[ClickEvent]) -> None:
+        if events:
+            self.client.lpush(self.key, *(event.dumps() for event in reversed(events)))
+
+    def dead_letter(self, events: List[ClickEvent]) -> None:
+        if events:
+            self.client.rpush(self.dead_key, *(event.dumps() for event in events))
+
+    def __len__(self) -> int:
+        return self.client.llen(self.key)
+
+
+class LocalClickBuffer:
+    """In-process stand-in for the Redis buffer (tests and single-process dev).
+
+    Nothing else can reach it, so the web process drains it itself: see ``_drain_local``.
+    """
+
+    def __init__(self) -> None:
+        self._events: Deque[ClickEvent] = deque()
+        self._lock = threading.Lock()
+        self._first_at = 0.0
+        self.dead: List[ClickEvent] = []
+
+    def push(self, event: ClickEvent) -> None:
+        with self._lock:
+            if not self._events:
+                self._first_at = time.monotonic()
+            self._events.append(event)
+
+    def due(self) -> bool:
+        """True once a full batch is waiting or the oldest event has waited the flush interval."""
+        return len(self._events) >= settings.CLICK_FLUSH_BATCH_SIZE or (
+            bool(self._events) and time.monotonic() - self._first_at >= settings.CLICK_FLUSH_INTERVAL_SECONDS
+        )
+
+    async def apush(self, event: ClickEvent) -> None:
+        self.push(event)
+
+    def pop_batch(self, max_items: int) -> List[ClickEvent]:
+        with self._lock:
+            count = min(max_items, len(self._events))
+            return [self._events.popleft() for _ in range(count)]
+
+    def requeue(self, events: List[ClickEvent]) -> None:
+        with self._lock:
+            if not self._events:
+                self._first_at = time.monotonic()
+            self._events.extendleft(reversed(events))
+
+    def dead_letter(self, events: List[ClickEvent]) -> None:
+        with self._lock:
+            self.dead.extend(events)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+
+redis_click_buffer = RedisClickBuffer()
+local_click_buffer = LocalClickBuffer()
+
+
+def get_click_buffer() -> ClickBuffer | None:
+    backend = settings.CLICK_BUFFER_BACKEND
+    if backend == "redis":
+        return redis_click_buffer
+    if backend == "local":
+        return local_click_buffer
+    return None
+
+
+def record_click(
+    link_id: int,
+    *,
+    ip: str | None,
+    user_agent: str | None,
+    referrer: str | None,
+    country: str | None = None,
+) -> None:
+    event = ClickEvent(link_id=link_id, ip=ip, user_agent=user_agent, referrer=referrer, country=country)
+    buffer = get_click_buffer()
+    if buffer is not None:
+        try:
+            buffer.push(event)
+            CLICKS_RECORDED.labels("buffered").inc()
+        except RedisError:
+            pass
+        else:
+            if buffer is local_click_buffer:
+                _drain_local()
+            return
+    CLICKS_RECORDED.labels("direct").inc()
+    flush_clicks([event])
+
+
+async def arecord_click(
+    link_id: int,
+    *,
+    ip: str | None,
+    user_agent: str | None,
+    referrer: str | None,
+    country: str | None = None,
+) -> None:
+    event = ClickEvent(link_id=link_id, ip=ip, user_agent=user_agent, referrer=referrer, country=country)
+    buffer = get_click_buffer()
+    if buffer is not None:
+        try:
+            await buffer.apush(event)
+            CLICKS_RECORDED.labels("buffered").inc()
+        except RedisError:
+            pass
+        else:
+            if buffer is local_click_buffer and local_click_buffer.due():
+                await sync_to_async(_drain_local)()
+            return
+    CLICKS_RECORDED.labels("direct").inc()
+    await sync_to_async(flush_clicks)([event])
+
+
+def _drain_local() -> None:
+    """Flush the in-process buffer from the request that finds it due; no worker can see it."""
+    while local_click_buffer.due():
+        events = local_click_buffer.pop_batch(settings.CLICK_FLUSH_BATCH_SIZE)
+        if not events:
+            return
+        try:
+            flush_buffered(local_click_buffer, events)
+        except TRANSIENT_ERRORS:
+            # The batch is back on the buffer; the next due request retries it.
+            logger.warning("Could not flush the local click buffer", exc_info=True)
+            return
+
+
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _task_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Failed to record click", exc_info=task.exception())
+
+
+def schedule_click(link_id: int, **kwargs) -> None:
+    """Record a click from async code without making the caller wait for it."""
+    task = asyncio.get_running_loop().create_task(arecord_click(link_id, **kwargs))
+    _background_tasks.add(task)
+    task.add_done_callback(_task_done)
+
+
+async def wait_for_scheduled_clicks() -> None:
+    while _background_tasks:
+        await asyncio.gather(*list(_background_tasks), return_exceptions=True)
+
+
+def flush_clicks(events: Iterable[ClickEvent]) -> int:
+    events = list(events)
+    if not events:
+        return 0
+    link_ids = {event.link_id for event in events}
+    with use_primary():
+        live_ids = set(Link.objects.filter(pk__in=link_ids).order_by().values_list("pk", flat=True))
+    events = [event for event in events if event.link_id in live_ids]
+    if not events:
+        return 0
+    for event in events:
+        if event.country is None:
+            event.country = country_for(event.ip)
+    with transaction.atomic():
+        agents = agent_cache.resolve(event.user_agent for event in events)
+        clicks = []
+        counted = []
+        for event in events:
+            agent = agents.get(clean(event.user_agent))
+            clicks.append(
+                Click(
+                    link_id=event.link_id,
+                    ts=event.ts,
+                    ip=event.ip,
+                    ua_id=agent.id if agent else None,
+                    referrer=event.referrer,
+                    country=event.country,
+                    recorded_at=Now(),
+                )
+            )
+            if not (settings.CLICK_EXCLUDE_BOTS and agent and agent.is_bot):
+                counted.append(event)
+        Click.objects.bulk_create(clicks, batch_size=settings.CLICK_FLUSH_BATCH_SIZE)
+        increment_click_counts(Counter(event.link_id for event in counted))
+        record_visitors(visitor_keys((event.link_id, event.ts, event.ip) for event in counted))
+    CLICKS_FLUSHED.inc(len(events))
+    return len(events)
+
+
+def flush_buffered(buffer: ClickBuffer, events: List[ClickEvent]) -> int:
+    """Flush a popped batch without letting one bad event wedge the queue.
+
+    If the database is unreachable the batch goes back on the buffer and the
+    error propagates. Any other failure is narrowed down by retrying the
+    events one at a time; the ones that still fail go to the dead-letter list.
+    """
+    try:
+        return flush_clicks(events)
+    except TRANSIENT_ERRORS:
+        buffer.requeue(events)
+        raise
+    except Exception:
+        logger.warning("Flushing %d clicks failed; retrying them one at a time", len(events), exc_info=True)
+    flushed = 0
+    for index, event in enumerate(events):
+        try:
+            flushed += flush_clicks([event])
+        except TRANSIENT_ERRORS:
+            buffer.requeue(events[index:])
+            raise
+        except Exception:
+            logger.exception("Moving an unwritable click for link %s to the dead-letter list", event.link_id)
+            buffer.dead_letter([event])
+            CLICKS_DEAD_LETTERED.inc()
+    return flushed
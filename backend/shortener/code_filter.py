@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+import time
+from datetime import timedelta
+from typing import Iterable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from .db_router import use_primary
+from .metrics import CODE_FILTER_CHECKS
+from .models import Link
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">4sQQQQd")
+_MAGIC = b"CBF1"
+# How long a new link is re-read by the sync in case a lower id commits after it.
+SYNC_OVERLAP_SECONDS = 60
+# Ceiling for the back-off between failed start-up builds.
+MAX_RETRY_SECONDS = 60
+
+
+class BloomFilter:
+    """Plain bit-array Bloom filter; ``k`` probes derived from one blake2b digest (Kirsch-Mitzenmacher)."""
+
+    def __init__(self, capacity: int, error_rate: float, *, bits: int | None = None, hashes: int | None = None):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = bits or max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = hashes or max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+        return ((first + index * second) % self.size for index in range(self.hashes))
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, values: Iterable[str]) -> None:
+        for value in values:
+            self.add(value)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def to_bytes(self, watermark: int = 0) -> bytes:
+        header = _HEADER.pack(_MAGIC, self.capacity, self.size, self.hashes, self.count, self.error_rate)
+        return header + struct.pack(">Q", watermark) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> tuple["BloomFilter", int]:
+        """Returns the filter and the watermark it was saved with."""
+        magic, capacity, size, hashes, count, error_rate = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Not a saved code filter.")
+        (watermark,) = struct.unpack_from(">Q", data, _HEADER.size)
+        bloom = cls(capacity, error_rate, bits=size, hashes=hashes)
+        body = data[_HEADER.size + 8 :]
+        if len(body) != len(bloom.bits):
+            raise ValueError("Truncated code filter.")
+        bloom.bits[:] = body
+        bloom.count = count
+        return bloom, watermark
+
+
+class CodeFilter:
+    """Per-worker Bloom filter over every code in ``Link``.
+
+    ``might_exist`` returning False means the code is definitely not taken,
+    so redirects can 404 and new codes can skip the collision check without
+    touching the database. Links created in this process are added as they
+    are saved; those created elsewhere are picked up by an id-watermark sync
+    that runs at most every ``CODE_FILTER_SYNC_SECONDS``, and only before
+    answering "absent". A link created by another worker can therefore 404
+    here for at most that long. Deleted codes stay set (Bloom filters cannot
+    remove), which only costs them a database lookup until the next rebuild.
+
+    Requests never build the filter: ``start`` loads it on a background thread
+    when the worker boots, and until then every code "might exist". Rebuilds
+    after the filter outgrows its capacity run on that thread too.
+    """
+
+    def __init__(self) -> None:
+        self.bloom: BloomFilter | None = None
+        self.watermark = 0
+        self.synced_at = 0.0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.CODE_FILTER_ENABLED
+
+    @property
+    def loaded(self) -> bool:
+        """Whether ``might_exist`` can rule anything out yet."""
+        return self.enabled and self.bloom is not None
+
+    def might_exist(self, code: str) -> bool:
+        bloom = self.bloom
+        if not self.enabled or bloom is None:
+            return True
+        if code not in bloom and self._sync_due():
+            self.sync()
+        present = code in self.bloom if self.bloom is not None else True
+        CODE_FILTER_CHECKS.labels("maybe" if present else "absent").inc()
+        return present
+
+    async def amight_exist(self, code: str) -> bool:
+        bloom = self.bloom
+        if not self.enabled or bloom is None or code in bloom:
+            return True
+        if not self._sync_due():
+            CODE_FILTER_CHECKS.labels("absent").inc()
+            return False
+        return await sync_to_async(self.might_exist)(code)
+
+    def add(self, codes: Iterable[str]) -> None:
+        if self.bloom is not None:
+            self.bloom.update(codes)
+
+    def start(self) -> None:
+        """Load the filter on a background thread; called from the Gunicorn ``post_worker_init`` hook."""
+        if self.enabled and self.bloom is None:
+            self._in_background(self._load_until_ready)
+
+    def _load_until_ready(self) -> None:
+        delay = 1.0
+        while self.enabled and self.bloom is None:
+            try:
+                self.load()
+            except DatabaseError:
+                logger.warning("Code filter build failed; retrying in %.0fs", delay, exc_info=True)
+                connections.close_all()
+            if self.bloom is None:
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_SECONDS)
+
+    def _in_background(self, target) -> None:
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(target,), name="code-filter", daemon=True)
+            self._thread.start()
+
+    @staticmethod
+    def _run(target) -> None:
+        try:
+            target()
+        except Exception:
+            logger.exception("Code filter background build failed")
+        finally:
+            connections.close_all()
+
+    def _sync_due(self) -> bool:
+        return time.monotonic() - self.synced_at >= settings.CODE_FILTER_SYNC_SECONDS
+
+    def load(self) -> None:
+        """Warm-start from ``CODE_FILTER_PATH`` when possible, else build from the database."""
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self.bloom is not None:
+                return
+            path = settings.CODE_FILTER_PATH
+            if path and os.path.exists(path):
+                try:
+                    with open(path, "rb") as handle:
+                        bloom, watermark = BloomFilter.from_bytes(handle.read())
+                except (OSError, ValueError, struct.error):
+                    logger.warning("Ignoring unreadable code filter at %s", path, exc_info=True)
+                else:
+                    if bloom.error_rate == settings.CODE_FILTER_ERROR_RATE:
+                        self.bloom, self.watermark = bloom, watermark
+                        self._sync_locked()
+                        return
+            self._build_locked()
+        finally:
+            self._lock.release()
+
+    def build(self) -> BloomFilter:
+        with self._lock:
+            self._build_locked()
+            return self.bloom
+
+    def _build_locked(self) -> None:
+        cutoff = timezone.now() - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        with use_primary():
+            links = Link.objects.order_by()
+            total = links.count()
+            bloom = BloomFilter(max(settings.CODE_FILTER_CAPACITY, total * 2), settings.CODE_FILTER_ERROR_RATE)
+            newest = recent = 0
+            for pk, code, created_at in links.values_list("pk", "code", "created_at").iterator(chunk_size=20_000):
+                bloom.add(code)
+                newest = max(newest, pk)
+                if created_at > cutoff:
+                    recent = min(recent or pk, pk)
+        self.bloom, self.synced_at = bloom, time.monotonic()
+        self.watermark = recent - 1 if recent else newest
+
+    def sync(self) -> None:
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._sync_locked()
+        finally:
+            self._lock.release()
+
+    def _sync_locked(self) -> None:
+        cutoff = timezone.now() - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        with use_primary():
+            rows = Link.objects.filter(pk__gt=self.watermark).order_by("pk").values_list("pk", "code", "created_at")
+            rows = list(rows)
+        settled = True
+        for pk, code, created_at in rows:
+            if code not in self.bloom:
+                self.bloom.add(code)
+            # Ids are handed out before commit, so a lower id can still show
+            # up late; recent rows are re-read until they are old enough.
+            settled = settled and created_at <= cutoff
+            if settled:
+                self.watermark = pk
+        self.synced_at = time.monotonic()
+        if self.bloom.count > self.bloom.capacity:
+            # Past capacity the false-positive rate climbs; rebuild at a larger
+            # size. The current filter keeps answering until the new one is in.
+            self._in_background(self.build)
+
+    def save(self, path: str | None = None) -> str:
+        path = path or settings.CODE_FILTER_PATH
+        if self.bloom is None:
+            self.build()
+        partial = f"{path}.partial"
+        with open(partial, "wb") as handle:
+            handle.write(self.bloom.to_bytes(self.watermark))
+        os.replace(partial, path)
+        return path
+
+    def reset(self) -> None:
+        with self._lock:
+            self.bloom, self.watermark, self.synced_at = None, 0, 0.0
+
+
+code_filter = CodeFilter()
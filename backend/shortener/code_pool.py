@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .allocator import code_allocator
+from .models import CodePool, Link
+
+
+def pool_sizes() -> Dict[int, int]:
+    return dict(settings.CODE_POOL_SIZES)
+
+
+def pop_codes(length: int, count: int) -> List[str]:
+    if count <= 0:
+        return []
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {CodePool._meta.db_table} WHERE id IN ("
+                f"SELECT id FROM {CodePool._meta.db_table} WHERE length = %s "
+                "ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED) RETURNING code",
+                [length, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+    with transaction.atomic():
+        rows = list(
+            CodePool.objects.select_for_update(skip_locked=True)
+            .filter(length=length)
+            .order_by("id")
+            .values_list("id", "code")[:count]
+        )
+        CodePool.objects.filter(id__in=[row[0] for row in rows]).delete()
+    return [row[1] for row in rows]
+
+
+def take_codes(length: int, count: int) -> List[str]:
+    codes = pop_codes(length, count) if length in pool_sizes() else []
+    if len(codes) < count:
+        codes += code_allocator.allocate(length, count - len(codes))
+    return codes
+
+
+def refill(length: int, target: int, batch_size: int = 1000) -> int:
+    """Top the pool for ``length`` up to ``target``; returns how many codes were inserted."""
+    added = 0
+    while True:
+        missing = target - CodePool.objects.filter(length=length).count()
+        if missing <= 0:
+            return added
+        codes = code_allocator.allocate(length, min(batch_size, missing))
+        # Codes already used by a link or sitting in the pool don't count towards the target.
+        taken = set(Link.objects.filter(code__in=codes).values_list("code", flat=True))
+        taken.update(CodePool.objects.filter(code__in=codes).values_list("code", flat=True))
+        fresh = [code for code in codes if code not in taken]
+        CodePool.objects.bulk_create([CodePool(length=length, code=code) for code in fresh], ignore_conflicts=True)
+        added += CodePool.objects.filter(code__in=fresh).count()
+
+
+def pool_status() -> List[dict]:
+    low_fraction = settings.CODE_POOL_LOW_WATERMARK
+    status = []
+    for length, target in sorted(pool_sizes().items()):
+        available = CodePool.objects.filter(length=length).count()
+        low_watermark = int(target * low_fraction)
+        status.append(
+            {
+                "length": length,
+                "available": available,
+                "target": target,
+                "low_watermark": low_watermark,
+                "fill_ratio": round(available / target, 4) if target else 0.0,
+                "below_low_watermark": available < low_watermark,
+            }
+        )
+    return status
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from typing import Dict, List
+from urllib.parse import urlsplit, urlunsplit
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.db import connections
+
+
+class SharedConnectionPool(redis.BlockingConnectionPool):
+    """Blocking pool that waits ``REDIS_POOL_TIMEOUT_SECONDS`` for a free
+    connection instead of opening unbounded ones, and counts how often it had to."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.exhausted = 0
+
+    def get_connection(self, command_name, *keys, **options):
+        if self.pool.empty():
+            self.exhausted += 1
+        return super().get_connection(command_name, *keys, **options)
+
+    def usage(self) -> Dict[str, int]:
+        idle = sum(1 for connection in list(self.pool.queue) if connection is not None)
+        created = len(self._connections)
+        return {
+            "max": self.max_connections,
+            "created": created,
+            "in_use": created - idle,
+            "idle": idle,
+            "exhausted": self.exhausted,
+        }
+
+
+class AsyncSharedConnectionPool(aioredis.BlockingConnectionPool):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.exhausted = 0
+
+    async def get_connection(self, command_name, *keys, **options):
+        if not self.can_get_connection():
+            self.exhausted += 1
+        return await super().get_connection(command_name, *keys, **options)
+
+    def usage(self) -> Dict[str, int]:
+        in_use = len(self._in_use_connections)
+        idle = len(self._available_connections)
+        return {
+            "max": self.max_connections,
+            "created": in_use + idle,
+            "in_use": in_use,
+            "idle": idle,
+            "exhausted": self.exhausted,
+        }
+
+
+_pools: Dict[str, SharedConnectionPool] = {}
+_async_pools: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncSharedConnectionPool]] = (
+    weakref.WeakKeyDictionary()
+)
+_lock = threading.Lock()
+
+
+def _pool_options() -> dict:
+    return {
+        "max_connections": settings.REDIS_MAX_CONNECTIONS,
+        "timeout": settings.REDIS_POOL_TIMEOUT_SECONDS,
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+        "socket_connect_timeout": settings.REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS,
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS,
+    }
+
+
+def get_redis(url: str) -> redis.Redis:
+    """Client on this process's shared pool for ``url``.
+
+    Every component pointing at the same Redis URL (rate limiter, link
+    cache, click buffer) draws from one bounded pool.
+    """
+    with _lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = _pools[url] = SharedConnectionPool.from_url(url, **_pool_options())
+    return redis.Redis(connection_pool=pool)
+
+
+def get_async_redis(url: str) -> aioredis.Redis:
+    # asyncio connections are bound to the loop that opened them.
+    pools = _async_pools.setdefault(asyncio.get_running_loop(), {})
+    pool = pools.get(url)
+    if pool is None:
+        pool = pools[url] = AsyncSharedConnectionPool.from_url(url, **_pool_options())
+    return aioredis.Redis(connection_pool=pool)
+
+
+def reset_pools() -> None:
+    with _lock:
+        for pool in _pools.values():
+            pool.disconnect()
+        _pools.clear()
+    _async_pools.clear()
+
+
+def redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    if parts.password is None:
+        return url
+    netloc = f"{parts.username or ''}:***@{parts.hostname}"
+    if parts.port:
+        netloc += f":{parts.port}"
+    return urlunsplit(parts._replace(netloc=netloc))
+
+
+def redis_pool_stats() -> List[dict]:
+    stats = [{"url": redact_url(url), "kind": "sync", **pool.usage()} for url, pool in list(_pools.items())]
+    for pools in list(_async_pools.values()):
+        stats.extend({"url": redact_url(url), "kind": "async", **pool.usage()} for url, pool in list(pools.items()))
+    return stats
+
+
+def database_stats() -> List[dict]:
+    stats = []
+    for alias in connections:
+        connection = connections[alias]
+        entry = {
+            "alias": alias,
+            "vendor": connection.vendor,
+            "pool_mode": settings.DATABASE_POOL_MODE,
+            "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+            "server_side_cursors": not connection.settings_dict.get("DISABLE_SERVER_SIDE_CURSORS", False),
+        }
+        if connection.vendor == "postgresql":
+            entry.update(_postgres_backends(connection))
+        stats.append(entry)
+    return stats
+
+
+def _postgres_backends(connection) -> dict:
+    # Counted on the server, so behind PgBouncer this shows the real backends
+    # the pooler holds open, not the client connections it multiplexes.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT coalesce(state, 'unknown'), count(*) FROM pg_stat_activity "
+            "WHERE datname = current_database() GROUP BY 1"
+        )
+        states = dict(cursor.fetchall())
+        cursor.execute("SELECT current_setting('max_connections')::int")
+        (max_connections,) = cursor.fetchone()
+    return {"server_connections": sum(states.values()), "server_max_connections": max_connections, "states": states}
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import random
+from typing import Mapping
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Greatest
+
+from .models import Link, LinkClickShard
+
+
+def increment_click_counts(increments: Mapping[int, int]) -> None:
+    shards = settings.CLICK_COUNTER_SHARDS
+    for link_id, amount in sorted(increments.items()):
+        if amount <= 0:
+            continue
+        if shards <= 1:
+            Link.objects.filter(pk=link_id).update(click_count=models.F("click_count") + amount)
+            continue
+        _increment_shard(link_id, random.randrange(shards), amount)
+
+
+def _increment_shard(link_id: int, shard: int, amount: int) -> None:
+    rows = LinkClickShard.objects.filter(link_id=link_id, shard=shard)
+    if rows.update(count=models.F("count") + amount):
+        return
+    try:
+        with transaction.atomic():
+            LinkClickShard.objects.create(link_id=link_id, shard=shard, count=amount)
+    except IntegrityError:
+        rows.update(count=models.F("count") + amount)
+
+
+def reconcile_click_counts(batch_size: int = 500) -> int:
+    """Fold shard counts into ``Link.click_count``; returns links touched."""
+    link_ids = list(
+        LinkClickShard.objects.filter(count__gt=0)
+        .order_by("link_id")
+        .values_list("link_id", flat=True)
+        .distinct()[:batch_size]
+    )
+    for link_id in link_ids:
+        _fold_shards(link_id)
+    return len(link_ids)
+
+
+def _fold_shards(link_id: int) -> None:
+    with transaction.atomic():
+        shards = list(LinkClickShard.objects.select_for_update().filter(link_id=link_id, count__gt=0).order_by("shard"))
+        total = sum(shard.count for shard in shards)
+        if not total:
+            return
+        Link.objects.filter(pk=link_id).update(click_count=models.F("click_count") + total)
+        LinkClickShard.objects.filter(pk__in=[shard.pk for shard in shards]).update(count=0)
+
+
+def discount_click_counts(decrements: Mapping[int, int]) -> None:
+    """Take already counted clicks back out, e.g. ones later found to be bots.
+
+    Shards are folded first so the subtraction can't drive ``click_count``
+    below what was actually recorded.
+    """
+    for link_id, amount in sorted(decrements.items()):
+        if amount <= 0:
+            continue
+        _fold_shards(link_id)
+        Link.objects.filter(pk=link_id).update(click_count=Greatest(models.F("click_count") - amount, 0))
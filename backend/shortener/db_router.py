@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.functional import SimpleLazyObject, empty
+from redis.exceptions import RedisError
+
+from .cache import LocalTTLCache
+from .connections import get_redis
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Replicas are only read from inside a web request; workers and management
+# commands run without one and always see the primary.
+_current_request: contextvars.ContextVar = contextvars.ContextVar("db_router_request", default=None)
+_primary_pinned: contextvars.ContextVar[bool] = contextvars.ContextVar("db_router_primary_pinned", default=False)
+
+
+def replicas_enabled() -> bool:
+    return bool(settings.DATABASE_REPLICAS)
+
+
+@contextmanager
+def use_primary() -> Iterator[None]:
+    token = _primary_pinned.set(True)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(token)
+
+
+@contextmanager
+def routing_request(request) -> Iterator[None]:
+    request_token = _current_request.set(request)
+    pinned_token = _primary_pinned.set(request.method not in SAFE_METHODS)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(pinned_token)
+        _current_request.reset(request_token)
+
+
+def probe_replica(alias: str) -> bool:
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor != "postgresql":
+                cursor.execute("SELECT 1")
+                return True
+            # NULL on a server that is not replaying WAL, i.e. a primary.
+            cursor.execute("SELECT extract(epoch FROM now() - pg_last_xact_replay_timestamp())")
+            (lag,) = cursor.fetchone()
+    except DatabaseError:
+        return False
+    return lag is None or float(lag) <= settings.DATABASE_REPLICA_MAX_LAG_SECONDS
+
+
+class ReplicaSet:
+    """Round-robin over the replicas whose last health probe passed.
+
+    A replica is probed at most once per ``DATABASE_REPLICA_HEALTH_CHECK_SECONDS``
+    per process; it fails the probe when unreachable or lagging more than
+    ``DATABASE_REPLICA_MAX_LAG_SECONDS`` behind the primary.
+    """
+
+    def __init__(self) -> None:
+        self._counter = itertools.count()
+        self._health: Dict[str, Tuple[float, bool]] = {}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            checked_at, healthy = self._health.get(alias, (float("-inf"), True))
+            if now - checked_at < settings.DATABASE_REPLICA_HEALTH_CHECK_SECONDS:
+                return healthy
+            # Claim the probe so concurrent threads keep the previous verdict.
+            self._health[alias] = (now, healthy)
+        healthy = probe_replica(alias)
+        with self._lock:
+            self._health[alias] = (time.monotonic(), healthy)
+        return healthy
+
+    def healthy(self) -> List[str]:
+        return [alias for alias in settings.DATABASE_REPLICAS if self.is_healthy(alias)]
+
+    def choose(self) -> Optional[str]:
+        healthy = self.healthy()
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._health.clear()
+
+
+class RecentWrites:
+    """Remembers which users wrote in the last ``DATABASE_REPLICA_STICKY_SECONDS``.
+
+    Markers live in Redis so every worker sees them, and in a local cache so
+    the worker that took the write still honours them while Redis is down.
+    """
+
+    key_prefix = "db:sticky:"
+
+    def __init__(self, redis_url: str | None = None):
+        self.redis_url = redis_url or settings.DATABASE_REPLICA_STICKY_REDIS_URL
+        self.local = LocalTTLCache[int](maxsize=10_000, ttl=settings.DATABASE_REPLICA_STICKY_SECONDS)
+        self._redis_down_until = 0.0
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _mark_redis_down(self) -> None:
+        self._redis_down_until = time.monotonic() + settings.LINK_CACHE_REDIS_RETRY_SECONDS
+
+    def mark(self, user_id: int) -> None:
+        seconds = settings.DATABASE_REPLICA_STICKY_SECONDS
+        self.local.set(user_id, True, ttl=seconds)
+        if not self._redis_available():
+            return
+        try:
+            get_redis(self.redis_url).set(f"{self.key_prefix}{user_id}", 1, px=int(seconds * 1000))
+        except RedisError:
+            self._mark_redis_down()
+
+    def recent(self, user_id: int) -> bool:
+        if self.local.get(user_id, False):
+            return True
+        if not self._redis_available():
+            return False
+        try:
+            return bool(get_redis(self.redis_url).exists(f"{self.key_prefix}{user_id}"))
+        except RedisError:
+            self._mark_redis_down()
+            return False
+
+    def clear_local(self) -> None:
+        self.local.clear()
+
+
+replica_set = ReplicaSet()
+recent_writes = RecentWrites()
+
+
+def request_user(request):
+    """The user already authenticated for ``request``, without triggering auth.
+
+    DRF authenticates inside the view and stores the user on the Django
+    request; before that only the session middleware's lazy user exists.
+    """
+    user = request.__dict__.get("user")
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    if user is None or not user.is_authenticated:
+        return None
+    return user
+
+
+def _sticky(request) -> bool:
+    sticky = request.__dict__.get("_db_sticky")
+    if sticky is not None:
+        return sticky
+    user = request_user(request)
+    if user is None:
+        # Not authenticated yet; decide again on the next query.
+        return False
+    request._db_sticky = recent_writes.recent(user.pk)
+    return request._db_sticky
+
+
+class PrimaryReplicaRouter:
+    """Send reads made while serving a request to a healthy replica.
+
+    Reads stay on the primary inside transactions, for unsafe request methods,
+    and for users who wrote within ``DATABASE_REPLICA_STICKY_SECONDS``.
+    """
+
+    def db_for_read(self, model, **hints) -> str:
+        request = _current_request.get()
+        if (
+            request is None
+            or not settings.DATABASE_REPLICAS
+            or _primary_pinned.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+            or _sticky(request)
+        ):
+            return DEFAULT_DB_ALIAS
+        return replica_set.choose() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        return db == DEFAULT_DB_ALIAS
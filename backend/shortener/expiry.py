@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import List
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from .cache import link_cache
+from .models import Click, Link
+
+
+def expired_active_links(now: datetime) -> models.QuerySet:
+    """Active links past ``expires_at``; served by the ``shortener_link_expiring_idx`` partial index."""
+    return Link.objects.filter(is_active=True, expires_at__isnull=False, expires_at__lte=now).order_by("expires_at")
+
+
+def deactivate_expired_batch(batch_size: int, now: datetime | None = None) -> List[str]:
+    """Deactivate up to ``batch_size`` expired links with one UPDATE; returns their codes."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        # SKIP LOCKED lets several sweepers share the backlog without waiting on each other.
+        expired = expired_active_links(now).select_for_update(skip_locked=True)
+        rows = list(expired.values_list("pk", "code")[:batch_size])
+        if not rows:
+            return []
+        Link.objects.filter(pk__in=[pk for pk, _ in rows]).update(is_active=False, updated_at=now)
+        codes = [code for _, code in rows]
+        transaction.on_commit(lambda: link_cache.invalidate_many(codes))
+    return codes
+
+
+def deactivate_expired_links(batch_size: int = 1000, now: datetime | None = None) -> int:
+    now = now or timezone.now()
+    total = 0
+    while True:
+        codes = deactivate_expired_batch(batch_size, now)
+        total += len(codes)
+        if len(codes) < batch_size:
+            return total
+
+
+def purgeable_links(grace: timedelta, now: datetime | None = None) -> models.QuerySet:
+    """Inactive links that expired more than ``grace`` ago."""
+    cutoff = (now or timezone.now()) - grace
+    return Link.objects.filter(is_active=False, expires_at__isnull=False, expires_at__lte=cutoff).order_by("pk")
+
+
+def delete_clicks(link_ids: List[int], chunk_size: int) -> int:
+    """Delete the links' clicks ``chunk_size`` rows per statement, each in its own short transaction."""
+    total = 0
+    while True:
+        chunk = list(Click.objects.filter(link_id__in=link_ids).order_by().values_list("pk", flat=True)[:chunk_size])
+        if not chunk:
+            return total
+        deleted, _ = Click.objects.filter(link_id__in=link_ids, pk__in=chunk).delete()
+        total += deleted
+
+
+def purge_expired_links(
+    grace: timedelta, batch_size: int = 500, click_chunk_size: int = 5000, now: datetime | None = None
+) -> tuple[int, int]:
+    """Hard-delete links past the grace period, clicks first; returns ``(links, clicks)`` deleted."""
+    links = clicks = 0
+    queryset = purgeable_links(grace, now)
+    while True:
+        link_ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not link_ids:
+            return links, clicks
+        clicks += delete_clicks(link_ids, click_chunk_size)
+        # Rollups, sketches and counter shards cascade; they are a handful of rows per link.
+        with transaction.atomic():
+            Link.objects.filter(pk__in=link_ids).delete()
+        links += len(link_ids)
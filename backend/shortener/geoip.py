@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import bisect
+import csv
+import ipaddress
+import logging
+import mmap
+import os
+import struct
+import threading
+from collections import Counter, defaultdict
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Click, RollupWatermark
+from .rollups import WATERMARK_NAME, day_bucket, reassign_countries
+
+logger = logging.getLogger(__name__)
+
+# Compiled range table: header, then IPv4 records (start, end, country) and
+# IPv6 records, each sorted by start. Lookups bisect the mmap'd file directly,
+# so a multi-million-row table costs page cache, not Python objects.
+_MAGIC = b"GEO1"
+_HEADER = struct.Struct(">4sII")
+_V4 = struct.Struct(">II2s")
+_V6 = struct.Struct(">16s16s2s")
+
+Range = Tuple[int, int, int, str]  # (version, start, end, country)
+
+
+class _RecordKeys:
+    """Sequence view of the record start addresses, for ``bisect``."""
+
+    def __init__(self, buffer: mmap.mmap, offset: int, count: int, record: struct.Struct, width: int):
+        self.buffer, self.offset, self.count, self.record, self.width = buffer, offset, count, record, width
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> int:
+        start = self.offset + index * self.record.size
+        return int.from_bytes(self.buffer[start : start + self.width], "big")
+
+    def record_at(self, index: int) -> Tuple[int, str]:
+        fields = self.record.unpack_from(self.buffer, self.offset + index * self.record.size)
+        end = fields[1] if isinstance(fields[1], int) else int.from_bytes(fields[1], "big")
+        return end, fields[2].decode("ascii")
+
+
+class GeoIPDatabase:
+    """Country lookups against a compiled range table (see ``compile_ranges``)."""
+
+    def __init__(self, path: str, cache_size: int = 65536):
+        with open(path, "rb") as handle:
+            self._buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, v4_count, v6_count = _HEADER.unpack_from(self._buffer)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a compiled GeoIP range table.")
+        v6_offset = _HEADER.size + v4_count * _V4.size
+        if len(self._buffer) != v6_offset + v6_count * _V6.size:
+            raise ValueError(f"{path} is truncated.")
+        self.path = path
+        self._v4 = _RecordKeys(self._buffer, _HEADER.size, v4_count, _V4, 4)
+        self._v6 = _RecordKeys(self._buffer, v6_offset, v6_count, _V6, 16)
+        self.country = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def __len__(self) -> int:
+        return len(self._v4) + len(self._v6)
+
+    def _lookup(self, ip: str) -> Optional[str]:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            return None
+        keys = self._v4 if address.version == 4 else self._v6
+        value = int(address)
+        index = bisect.bisect_right(keys, value) - 1
+        if index < 0:
+            return None
+        end, country = keys.record_at(index)
+        return country if value <= end else None
+
+    def close(self) -> None:
+        self._buffer.close()
+
+
+def parse_range_rows(rows: Iterable[List[str]]) -> Iterator[Range]:
+    """``network,country`` (CIDR) or ``first_ip,last_ip,country`` rows; headers and bad rows are skipped."""
+    for row in rows:
+        row = [field.strip() for field in row]
+        try:
+            if len(row) == 2:
+                network = ipaddress.ip_network(row[0], strict=False)
+                first, last, country = network.network_address, network.broadcast_address, row[1]
+            elif len(row) >= 3:
+                first, last, country = ipaddress.ip_address(row[0]), ipaddress.ip_address(row[1]), row[2]
+            else:
+                continue
+        except ValueError:
+            continue
+        country = country.upper()
+        if first.version != last.version or len(country) != 2 or not country.isalpha() or int(first) > int(last):
+            continue
+        yield first.version, int(first), int(last), country
+
+
+def compile_ranges(ranges: Iterable[Range]) -> bytes:
+    """Sort and pack ranges. Overlaps are trimmed so each address matches at most one row."""
+    by_version = {4: [], 6: []}
+    for version, first, last, country in ranges:
+        by_version[version].append((first, last, country))
+    parts = [b""]
+    counts = []
+    for version, record in ((4, _V4), (6, _V6)):
+        rows = sorted(by_version[version])
+        packed = []
+        for index, (first, last, country) in enumerate(rows):
+            if index + 1 < len(rows):
+                last = min(last, rows[index + 1][0] - 1)
+            if version == 4:
+                packed.append(record.pack(first, last, country.encode()))
+            else:
+                packed.append(record.pack(first.to_bytes(16, "big"), last.to_bytes(16, "big"), country.encode()))
+        parts.append(b"".join(packed))
+        counts.append(len(packed))
+    parts[0] = _HEADER.pack(_MAGIC, *counts)
+    return b"".join(parts)
+
+
+def compile_csv(source: str, output: str) -> int:
+    """Compile a CSV range file to ``output`` atomically; returns the number of ranges."""
+    with open(source, newline="") as handle:
+        ranges = list(parse_range_rows(csv.reader(handle)))
+    partial = f"{output}.partial"
+    with open(partial, "wb") as handle:
+        handle.write(compile_ranges(ranges))
+    os.replace(partial, output)
+    return len(ranges)
+
+
+_database: GeoIPDatabase | None = None
+_database_path: str | None = None
+_lock = threading.Lock()
+
+
+def get_geoip() -> GeoIPDatabase | None:
+    """The database at ``GEOIP_DATABASE_PATH``, opened once per process; None when unset or unusable."""
+    global _database, _database_path
+    path = settings.GEOIP_DATABASE_PATH
+    if path == _database_path:
+        return _database
+    with _lock:
+        if path != _database_path:
+            database = None
+            if path:
+                try:
+                    database = GeoIPDatabase(path, cache_size=settings.GEOIP_CACHE_SIZE)
+                except (OSError, ValueError, struct.error):
+                    logger.warning("GeoIP database %s could not be opened; countries stay empty", path, exc_info=True)
+            _database, _database_path = database, path
+    return _database
+
+
+def country_for(ip: str | None) -> str | None:
+    database = get_geoip()
+    if database is None or not ip:
+        return None
+    return database.country(ip)
+
+
+def backfill_click_countries(batch_size: int = 5000, since: date | None = None) -> Tuple[int, int]:
+    """Fill ``Click.country`` for stored clicks that lack it; returns ``(scanned, updated)``.
+
+    Clicks the rollup worker already counted under the empty country are
+    moved to their real country in ``DailyCountryRollup`` in the same
+    transaction, holding the rollup watermark lock so the two can't race.
+    With ``CLICK_EXCLUDE_BOTS`` bot clicks were never counted there, so they
+    only get their ``country`` set.
+    """
+    if get_geoip() is None:
+        raise ValueError("GEOIP_DATABASE_PATH is not set or cannot be opened.")
+    clicks = Click.objects.filter(country__isnull=True, ip__isnull=False)
+    if since is not None:
+        clicks = clicks.filter(ts__date__gte=since)
+    last_id = scanned = updated = 0
+    while True:
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK_NAME)
+            batch = clicks.filter(pk__gt=last_id).order_by("pk")
+            rows = list(batch.values_list("pk", "link_id", "ts", "ip", "ua__is_bot")[:batch_size])
+            if not rows:
+                return scanned, updated
+            by_country: Dict[str, List[int]] = defaultdict(list)
+            rolled_up: Counter = Counter()
+            for pk, link_id, ts, ip, is_bot in rows:
+                country = country_for(ip)
+                if country is None:
+                    continue
+                by_country[country].append(pk)
+                if pk <= watermark.last_click_id and not (is_bot and settings.CLICK_EXCLUDE_BOTS):
+                    rolled_up[(link_id, day_bucket(ts), country)] += 1
+            for country, pks in by_country.items():
+                updated += Click.objects.filter(pk__in=pks).update(country=country)
+            reassign_countries(rolled_up)
+        scanned += len(rows)
+        last_id = rows[-1][0]
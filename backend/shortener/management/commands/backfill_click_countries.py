@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from shortener.geoip import backfill_click_countries
+
+
+class Command(BaseCommand):
+    help = "Resolve the country of stored clicks that have none, in chunks, and correct the country rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Clicks per transaction.")
+        parser.add_argument("--since", type=parse_date, help="Only clicks on or after this UTC date.")
+
+    def handle(self, *args, **options):
+        try:
+            scanned, updated = backfill_click_countries(batch_size=options["batch_size"], since=options["since"])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(f"Scanned {scanned} clicks; set the country on {updated}.")
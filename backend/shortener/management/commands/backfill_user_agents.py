@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from shortener.user_agents import backfill_user_agents
+
+
+class Command(BaseCommand):
+    help = "Parse the raw user agent of stored clicks into the UserAgent table, in chunks, and correct the rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Clicks per transaction.")
+        parser.add_argument("--since", type=parse_date, help="Only clicks on or after this UTC date.")
+
+    def handle(self, *args, **options):
+        scanned, bots = backfill_user_agents(batch_size=options["batch_size"], since=options["since"])
+        self.stdout.write(f"Scanned {scanned} clicks; {bots} came from bots.")
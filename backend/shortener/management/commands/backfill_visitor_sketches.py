@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from shortener.visitors import backfill_visitor_sketches
+
+
+class Command(BaseCommand):
+    help = "Build unique-visitor sketches from stored clicks (safe to re-run; merges into existing sketches)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Links per pass.")
+        parser.add_argument("--since", type=parse_date, help="Only read clicks on or after this UTC date.")
+
+    def handle(self, *args, **options):
+        scanned = backfill_visitor_sketches(batch_size=options["batch_size"], since=options["since"])
+        self.stdout.write(f"Scanned clicks for {scanned} links.")
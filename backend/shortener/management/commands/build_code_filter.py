@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shortener.code_filter import code_filter
+
+
+class Command(BaseCommand):
+    help = "Build the code Bloom filter from the database and save it for warm starts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=settings.CODE_FILTER_PATH, help="Defaults to CODE_FILTER_PATH.")
+
+    def handle(self, *args, **options):
+        if not options["path"]:
+            raise CommandError("Set CODE_FILTER_PATH or pass --path.")
+        started = time.perf_counter()
+        bloom = code_filter.build()
+        code_filter.save(options["path"])
+        self.stdout.write(
+            f"Saved {bloom.count} codes to {options['path']} ({len(bloom.bits) / 1024:.0f} KiB, "
+            f"{bloom.hashes} hashes) in {time.perf_counter() - started:.1f}s."
+        )
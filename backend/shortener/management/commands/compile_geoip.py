@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shortener.geoip import compile_csv
+
+
+class Command(BaseCommand):
+    help = "Compile a CSV of IP ranges (network,country or first_ip,last_ip,country) into the GeoIP lookup table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="CSV file, e.g. a DB-IP or IP2Location country lite export.")
+        parser.add_argument("--output", default=settings.GEOIP_DATABASE_PATH, help="Defaults to GEOIP_DATABASE_PATH.")
+
+    def handle(self, *args, **options):
+        if not options["output"]:
+            raise CommandError("Set GEOIP_DATABASE_PATH or pass --output.")
+        try:
+            count = compile_csv(options["source"], options["output"])
+        except OSError as exc:
+            raise CommandError(str(exc)) from exc
+        if not count:
+            raise CommandError(f"No usable ranges found in {options['source']}.")
+        self.stdout.write(f"Compiled {count} ranges into {options['output']}.")
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shortener.clicks import ClickEvent, flush_buffered, get_click_buffer
+
+
+class Command(BaseCommand):
+    help = "Drain buffered click events into the database in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.CLICK_FLUSH_BATCH_SIZE)
+        parser.add_argument(
+            "--flush-interval",
+            type=float,
+            default=settings.CLICK_FLUSH_INTERVAL_SECONDS,
+            help="Maximum seconds a buffered click waits before being written.",
+        )
+        parser.add_argument("--once", action="store_true", help="Drain what is buffered now and exit.")
+
+    def handle(self, *args, **options):
+        buffer = get_click_buffer()
+        if buffer is None:
+            raise CommandError("CLICK_BUFFER_BACKEND is 'sync'; there is nothing to drain.")
+        batch_size = options["batch_size"]
+        interval = options["flush_interval"]
+        if batch_size <= 0:
+            raise CommandError("--batch-size must be positive.")
+
+        # docker stop sends SIGTERM; stop popping and flush what is already in hand.
+        stopping = threading.Event()
+        previous = signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+        pending: list[ClickEvent] = []
+        first_pending_at = 0.0
+        total = 0
+        try:
+            while not stopping.is_set():
+                events = buffer.pop_batch(batch_size - len(pending))
+                if events and not pending:
+                    first_pending_at = time.monotonic()
+                pending.extend(events)
+                drained = not events
+                due = pending and (
+                    len(pending) >= batch_size
+                    or (drained and options["once"])
+                    or time.monotonic() - first_pending_at >= interval
+                )
+                if due:
+                    batch, pending = pending, []
+                    total += flush_buffered(buffer, batch)
+                if drained and options["once"] and not pending:
+                    break
+                if drained:
+                    stopping.wait(min(interval, 0.1))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            if pending:
+                total += flush_buffered(buffer, pending)
+        self.stdout.write(f"Flushed {total} clicks.")
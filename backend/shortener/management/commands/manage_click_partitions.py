@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shortener import partitions
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly Click partitions and archive or drop expired ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=settings.CLICK_PARTITION_MONTHS_AHEAD)
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=settings.CLICK_RETENTION_MONTHS,
+            help="Drop partitions that ended more than N months ago. 0 keeps everything.",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            default=settings.CLICK_ARCHIVE_DIR,
+            help="Export expired partitions to gzipped CSV here before dropping them.",
+        )
+        parser.add_argument(
+            "--detach-only",
+            action="store_true",
+            help="Detach expired partitions but keep them as standalone tables.",
+        )
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if not partitions.is_partitioned():
+            self.stdout.write("Click table is not partitioned (PostgreSQL only); nothing to do.")
+            return
+        dry_run = options["dry_run"]
+        if dry_run:
+            for month in partitions.missing_partitions(options["months_ahead"]):
+                self.stdout.write(f"would create {partitions.partition_name(month)}")
+        else:
+            for name in partitions.ensure_partitions(options["months_ahead"]):
+                self.stdout.write(f"created {name}")
+
+        expired = partitions.expired_partitions(partitions.list_partitions(), options["retention_months"])
+        for name in expired:
+            if dry_run:
+                self.stdout.write(f"would {'detach' if options['detach_only'] else 'drop'} {name}")
+                continue
+            if options["archive_dir"]:
+                path = partitions.archive_partition(name, options["archive_dir"])
+                self.stdout.write(f"archived {name} to {path}")
+            partitions.drop_partition(name, detach_only=options["detach_only"])
+            self.stdout.write(f"{'detached' if options['detach_only'] else 'dropped'} {name}")
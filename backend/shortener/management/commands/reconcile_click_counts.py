@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from shortener.counters import reconcile_click_counts
+
+
+class Command(BaseCommand):
+    help = "Fold striped click counter shards into Link.click_count."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running, reconciling every N seconds. 0 runs a single pass.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        interval = options["interval"]
+        while True:
+            total = 0
+            while True:
+                touched = reconcile_click_counts(batch_size=batch_size)
+                total += touched
+                if touched < batch_size:
+                    break
+            self.stdout.write(f"Reconciled {total} links.")
+            if interval <= 0:
+                return
+            time.sleep(interval)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from shortener.code_pool import pool_sizes, pool_status, refill
+
+
+class Command(BaseCommand):
+    help = "Top up the pre-generated code pool for each configured code length."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running, checking watermarks every N seconds. 0 runs a single pass.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Refill to target even when the pool is above its low watermark.",
+        )
+
+    def handle(self, *args, **options):
+        force = options["force"]
+        while True:
+            targets = pool_sizes()
+            for row in pool_status():
+                if not (force or row["below_low_watermark"]):
+                    continue
+                added = refill(row["length"], targets[row["length"]], batch_size=options["batch_size"])
+                self.stdout.write(f"length={row['length']} added={added} target={row['target']}")
+            if options["interval"] <= 0:
+                return
+            force = False
+            time.sleep(options["interval"])
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shortener.rollups import rollup_clicks
+
+
+class Command(BaseCommand):
+    help = "Fold new clicks into the hourly and daily rollup tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.ROLLUP_BATCH_SIZE)
+        parser.add_argument(
+            "--lag",
+            type=float,
+            default=settings.ROLLUP_SAFETY_LAG_SECONDS,
+            help="Leave clicks younger than N seconds for the next pass.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running, rolling up every N seconds. 0 runs a single pass.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = rollup_clicks(batch_size=options["batch_size"], lag_seconds=options["lag"])
+            self.stdout.write(f"Rolled up {total} clicks.")
+            if options["interval"] <= 0:
+                return
+            time.sleep(options["interval"])
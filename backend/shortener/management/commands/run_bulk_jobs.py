@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shortener.bulk_jobs import claim_job, run_job
+from shortener.code_filter import code_filter
+
+
+class Command(BaseCommand):
+    help = "Work through queued bulk link jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=settings.BULK_JOB_CHUNK_SIZE)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before polling again when the queue is empty.",
+        )
+        parser.add_argument("--once", action="store_true", help="Run the jobs queued now and exit.")
+
+    def handle(self, *args, **options):
+        if not options["once"]:
+            # Lets chunks skip the up-front collision check once it is loaded.
+            code_filter.start()
+        processed = 0
+        try:
+            while True:
+                job = claim_job()
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+                job = run_job(job, chunk_size=options["chunk_size"])
+                processed += 1
+                self.stdout.write(f"job={job.pk} status={job.status} created={job.created_count}/{job.requested_count}")
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Processed {processed} jobs.")
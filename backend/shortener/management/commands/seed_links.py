@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from shortener.models import Link
+from shortener.seeding import SeedPlan, seed
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic links and clicks for benchmarks and local debugging."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--links", type=int, default=10_000)
+        parser.add_argument("--clicks", type=int, default=100_000)
+        parser.add_argument("--days", type=int, default=30, help="Spread clicks over the last N days.")
+        parser.add_argument("--seed", type=int, default=0, help="Same seed, same rows.")
+        parser.add_argument("--zipf", type=float, default=1.1, help="Click skew exponent across links.")
+        parser.add_argument("--prefix", default="sd", help="Code prefix; must not be in use yet.")
+        parser.add_argument("--owner", default="seed", help="Username owning the links (created if missing).")
+        parser.add_argument("--visitors", type=int, help="Distinct visitor IPs (default: clicks / 4).")
+        parser.add_argument(
+            "--until", help="ISO timestamp the click window ends at (default: now); fix it for identical rows."
+        )
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per INSERT, and per progress line.")
+        parser.add_argument(
+            "--no-copy", action="store_true", help="Use bulk_create on Postgres too instead of COPY FROM STDIN."
+        )
+
+    def handle(self, *args, **options):
+        if options["links"] <= 0:
+            raise CommandError("--links must be positive.")
+        if Link.objects.filter(code__startswith=options["prefix"]).exists():
+            raise CommandError(f"Codes starting with {options['prefix']!r} already exist; pick another --prefix.")
+        until = None
+        if options["until"]:
+            try:
+                until = datetime.fromisoformat(options["until"])
+            except ValueError as exc:
+                raise CommandError(f"--until: {exc}") from exc
+            if timezone.is_naive(until):
+                until = timezone.make_aware(until, dt_timezone.utc)
+        owner, _ = get_user_model().objects.get_or_create(username=options["owner"])
+        plan = SeedPlan(
+            links=options["links"],
+            clicks=options["clicks"],
+            days=options["days"],
+            seed=options["seed"],
+            zipf_s=options["zipf"],
+            prefix=options["prefix"],
+            visitors=options["visitors"],
+            until=until,
+        )
+        use_copy = connection.vendor == "postgresql" and not options["no_copy"]
+        started = time.perf_counter()
+
+        def progress(label: str, done: int, total: int) -> None:
+            self.stdout.write(f"  {label}: {done}/{total} after {time.perf_counter() - started:.1f}s")
+
+        seed(
+            plan,
+            owner_id=owner.pk,
+            batch_size=options["batch_size"],
+            progress=progress if options["verbosity"] >= 1 else None,
+            use_copy=use_copy,
+        )
+        self.stdout.write(
+            f"Seeded {plan.links} links and {plan.clicks} clicks for {owner.username} "
+            f"in {time.perf_counter() - started:.1f}s using {'COPY' if use_copy else 'bulk_create'}."
+        )
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shortener.expiry import deactivate_expired_links, expired_active_links, purge_expired_links, purgeable_links
+
+
+class Command(BaseCommand):
+    help = "Deactivate links past expires_at and optionally hard-delete them after a grace period."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.LINK_EXPIRY_BATCH_SIZE)
+        parser.add_argument(
+            "--purge-after-days",
+            type=int,
+            default=settings.LINK_EXPIRED_PURGE_DAYS,
+            help="Delete expired links (and their clicks) this many days after expiry. 0 never deletes.",
+        )
+        parser.add_argument("--click-chunk-size", type=int, default=5000, help="Clicks removed per DELETE.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would change.")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep running, sweeping every N seconds. 0 runs a single pass.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.sweep(options)
+            if options["interval"] <= 0:
+                return
+            time.sleep(options["interval"])
+
+    def sweep(self, options) -> None:
+        now = timezone.now()
+        grace = timedelta(days=options["purge_after_days"])
+        if options["dry_run"]:
+            self.stdout.write(f"Would deactivate {expired_active_links(now).count()} expired links.")
+            if options["purge_after_days"] > 0:
+                purgeable = purgeable_links(grace, now).count()
+                self.stdout.write(f"Would delete {purgeable} links expired over {grace.days} days.")
+            return
+        deactivated = deactivate_expired_links(batch_size=options["batch_size"], now=now)
+        self.stdout.write(f"Deactivated {deactivated} expired links.")
+        if options["purge_after_days"] > 0:
+            links, clicks = purge_expired_links(
+                grace, batch_size=options["batch_size"], click_chunk_size=options["click_chunk_size"], now=now
+            )
+            self.stdout.write(f"Deleted {links} links and {clicks} clicks expired over {grace.days} days.")
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hmac
+import os
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# With PROMETHEUS_MULTIPROC_DIR set (see entrypoint.sh and gunicorn.conf.py)
+# every worker writes its samples to mmap'd files in that directory and
+# /api/ops/metrics/ aggregates them, so a scrape sees all workers, not just one.
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent serving a request, by route.",
+    ["route", "method"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter("http_requests_total", "Requests served, by route and status.", ["route", "method", "status"])
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries issued while serving a request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+LINK_CACHE_LOOKUPS = Counter(
+    "link_cache_lookups_total",
+    "Redirect resolution cache lookups, by tier and result.",
+    ["tier", "result"],
+)
+CODE_FILTER_CHECKS = Counter(
+    "code_filter_checks_total", "Code Bloom filter answers: definitely absent, or maybe present.", ["result"]
+)
+CLICKS_RECORDED = Counter("clicks_recorded_total", "Clicks recorded, by path taken.", ["path"])
+CLICKS_FLUSHED = Counter("clicks_flushed_total", "Clicks written to the database.")
+CLICKS_DEAD_LETTERED = Counter(
+    "clicks_dead_lettered_total", "Buffered clicks that could not be written and were set aside."
+)
+LINK_INSERT_ATTEMPTS = Counter("link_insert_attempts_total", "bulk_create batches attempted for new links.")
+LINK_CODE_COLLISIONS = Counter("link_code_collisions_total", "Allocated codes that clashed with existing ones.")
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total",
+    "Rate limiter decisions, by policy and outcome.",
+    ["policy", "outcome"],
+)
+RATE_LIMIT_REDIS_ERRORS = Counter("rate_limit_redis_errors_total", "Rate limiter calls that failed to reach Redis.")
+
+UNMATCHED_ROUTE = "<unmatched>"
+REDIRECT_ROUTE = "<slug:code>"
+
+
+def _route(request, response) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is not None:
+        return match.route
+    # The fast-path middleware answers redirects before URL resolution.
+    if response.status_code in (301, 302, 307, 308) and request.path_info.count("/") == 1:
+        return REDIRECT_ROUTE
+    return UNMATCHED_ROUTE
+
+
+class _QueryCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Per-route latency, status and database query counts.
+
+    Query counts are only taken in sync mode: async views run their queries
+    on other threads, whose connections this middleware cannot wrap.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        counter = _QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            response = self.get_response(request)
+        route = self._observe(request, response, time.perf_counter() - start)
+        REQUEST_QUERIES.labels(route).observe(counter.count)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _observe(request, response, elapsed: float) -> str:
+        route = _route(request, response)
+        REQUEST_LATENCY.labels(route, request.method).observe(elapsed)
+        REQUESTS.labels(route, request.method, str(response.status_code)).inc()
+        return route
+
+
+def metrics_registry() -> CollectorRegistry:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def _may_scrape(request) -> bool:
+    if settings.METRICS_PUBLIC:
+        return True
+    token = settings.METRICS_TOKEN
+    if token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return True
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_staff)
+
+
+def metrics_view(request) -> HttpResponse:
+    """Prometheus text for ``METRICS_TOKEN`` bearers and staff sessions; anyone with ``METRICS_PUBLIC``."""
+    if not _may_scrape(request):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    return HttpResponse(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
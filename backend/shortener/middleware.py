@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+
+from .db_router import SAFE_METHODS, recent_writes, replicas_enabled, request_user, routing_request
+from .redirects import aredirect_response, redirect_response
+
+REDIRECT_PATH = re.compile(r"^/(?P<code>[-a-zA-Z0-9_]+)$")
+
+
+class RedirectFastPathMiddleware:
+    """Answer ``/<code>`` before the rest of the middleware stack runs.
+
+    Anonymous redirects need no session, CSRF, auth or CORS handling. Unknown
+    codes fall through to the regular stack so 404s behave exactly as before.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REDIRECT_FAST_PATH:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _match(self, request) -> str | None:
+        if request.method not in ("GET", "HEAD"):
+            return None
+        match = REDIRECT_PATH.match(request.path_info)
+        return match.group("code") if match else None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        code = self._match(request)
+        if code is None:
+            return self.get_response(request)
+        try:
+            response = redirect_response(request, code)
+        except Http404:
+            return self.get_response(request)
+        return _secure(response)
+
+    async def __acall__(self, request):
+        code = self._match(request)
+        if code is None:
+            return await self.get_response(request)
+        try:
+            response = await aredirect_response(request, code)
+        except Http404:
+            return await self.get_response(request)
+        return _secure(response)
+
+
+class ReplicaRoutingMiddleware:
+    """Scope ``PrimaryReplicaRouter`` decisions to the current request.
+
+    Placed ahead of the fast path so its reads are scoped too, although
+    redirect resolution itself always reads the primary (see ``resolve_link``).
+    A successful write by an authenticated user pins that user's reads to the
+    primary for ``DATABASE_REPLICA_STICKY_SECONDS``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replicas_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with routing_request(request):
+            response = self.get_response(request)
+        _remember_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        with routing_request(request):
+            response = await self.get_response(request)
+        _remember_write(request, response)
+        return response
+
+
+def _secure(response: HttpResponse) -> HttpResponse:
+    # Same headers SecurityMiddleware and XFrameOptionsMiddleware would add.
+    if settings.SECURE_CONTENT_TYPE_NOSNIFF:
+        response.headers.setdefault("X-Content-Type-Options", "nosniff")
+    if settings.SECURE_REFERRER_POLICY:
+        policy = settings.SECURE_REFERRER_POLICY
+        if not isinstance(policy, str):
+            policy = ",".join(policy)
+        response.headers.setdefault("Referrer-Policy", policy)
+    if settings.SECURE_CROSS_ORIGIN_OPENER_POLICY:
+        response.headers.setdefault("Cross-Origin-Opener-Policy", settings.SECURE_CROSS_ORIGIN_OPENER_POLICY)
+    response.headers.setdefault("X-Frame-Options", getattr(settings, "X_FRAME_OPTIONS", "DENY").upper())
+    return response
+
+
+def _remember_write(request, response: HttpResponse) -> None:
+    if request.method in SAFE_METHODS or response.status_code >= 400:
+        return
+    user = request_user(request)
+    if user is not None:
+        recent_writes.mark(user.pk)
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="click",
+            name="ts",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
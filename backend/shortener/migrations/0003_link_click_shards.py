@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0002_click_ts_default"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LinkClickShard",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("count", models.PositiveBigIntegerField(default=0)),
+                ("link", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="click_shards", to="shortener.link")),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="linkclickshard",
+            constraint=models.UniqueConstraint(fields=("link", "shard"), name="shortener_click_shard_unique"),
+        ),
+    ]
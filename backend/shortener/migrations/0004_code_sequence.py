@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0003_link_click_shards"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CodeSequence",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("length", models.PositiveSmallIntegerField(unique=True)),
+                ("next_value", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0004_code_sequence"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CodePool",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("length", models.PositiveSmallIntegerField()),
+                ("code", models.SlugField(max_length=16, unique=True)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["length", "id"], name="shortener_codepool_len_idx")],
+            },
+        ),
+    ]
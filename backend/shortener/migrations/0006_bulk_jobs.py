@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("shortener", "0005_code_pool"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BulkJob",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("idempotency_key", models.CharField(blank=True, max_length=255, null=True)),
+                ("target_url", models.TextField()),
+                ("code_length", models.PositiveSmallIntegerField()),
+                ("expires_at", models.DateTimeField(blank=True, null=True)),
+                ("requested_count", models.PositiveIntegerField()),
+                ("created_count", models.PositiveIntegerField(default=0)),
+                ("status", models.CharField(choices=[("pending", "Pending"), ("running", "Running"), ("succeeded", "Succeeded"), ("failed", "Failed")], default="pending", max_length=16)),
+                ("error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("heartbeat_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("owner", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="bulk_jobs", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "ordering": ("-created_at",),
+            },
+        ),
+        migrations.AddField(
+            model_name="link",
+            name="bulk_job",
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="links", to="shortener.bulkjob"),
+        ),
+        migrations.AddIndex(
+            model_name="bulkjob",
+            index=models.Index(fields=["status", "created_at"], name="shortener_bulkjob_queue_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="bulkjob",
+            constraint=models.UniqueConstraint(fields=("owner", "idempotency_key"), name="shortener_bulkjob_idempotency"),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0006_bulk_jobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=64, unique=True)),
+                ("last_click_id", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="HourlyClickRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("bucket", models.DateTimeField()),
+                ("clicks", models.PositiveBigIntegerField(default=0)),
+                ("link", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="hourly_rollups", to="shortener.link")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyReferrerRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("host", models.CharField(blank=True, default="", max_length=255)),
+                ("clicks", models.PositiveBigIntegerField(default=0)),
+                ("link", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="referrer_rollups", to="shortener.link")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyCountryRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("country", models.CharField(blank=True, default="", max_length=2)),
+                ("clicks", models.PositiveBigIntegerField(default=0)),
+                ("link", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="country_rollups", to="shortener.link")),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyClickRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("clicks", models.PositiveBigIntegerField(default=0)),
+                ("link", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="daily_rollups", to="shortener.link")),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="hourlyclickrollup",
+            constraint=models.UniqueConstraint(fields=("link", "bucket"), name="shortener_hourly_rollup_unique"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyreferrerrollup",
+            constraint=models.UniqueConstraint(fields=("link", "day", "host"), name="shortener_referrer_rollup_unique"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailycountryrollup",
+            constraint=models.UniqueConstraint(fields=("link", "day", "country"), name="shortener_country_rollup_unique"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyclickrollup",
+            constraint=models.UniqueConstraint(fields=("link", "day"), name="shortener_daily_rollup_unique"),
+        ),
+    ]
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.db import migrations
+
+TABLE = "shortener_click"
+LEGACY = "shortener_click_legacy"
+# A plain sequence: the old identity sequence is dropped with the old table.
+SEQUENCE = "shortener_click_part_id_seq"
+COLUMNS = "id, ts, ip, user_agent, referrer, country, link_id"
+MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _is_partitioned(cursor) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+        [TABLE],
+    )
+    return cursor.fetchone() is not None
+
+
+def _set_aside(cursor) -> None:
+    # Move the current table and the names Postgres derives from it out of
+    # the way so the replacement can be created under the original names.
+    cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}")
+    cursor.execute(f"ALTER TABLE {LEGACY} RENAME CONSTRAINT {TABLE}_pkey TO {LEGACY}_pkey")
+    cursor.execute("ALTER INDEX shortener_link_ts_idx RENAME TO shortener_link_ts_legacy_idx")
+
+
+def partition_clicks(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        if _is_partitioned(cursor):
+            return
+        _set_aside(cursor)
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0), MIN(ts), CURRENT_DATE FROM {LEGACY}")
+        max_id, oldest, today = cursor.fetchone()
+        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {SEQUENCE} AS bigint")
+        cursor.execute("SELECT setval(%s, %s, %s)", [SEQUENCE, max(max_id, 1), max_id > 0])
+        # The primary key has to include the partition key, so it becomes
+        # (id, ts); ids stay unique because they all come from one sequence.
+        cursor.execute(
+            f"""
+            CREATE TABLE {TABLE} (
+                id bigint NOT NULL DEFAULT nextval('{SEQUENCE}'),
+                ts timestamp with time zone NOT NULL,
+                ip inet NULL,
+                user_agent text NULL,
+                referrer text NULL,
+                country varchar(2) NULL,
+                link_id bigint NOT NULL
+                    REFERENCES shortener_link (id) DEFERRABLE INITIALLY DEFERRED,
+                PRIMARY KEY (id, ts)
+            ) PARTITION BY RANGE (ts)
+            """
+        )
+        first = date((oldest or today).year, (oldest or today).month, 1)
+        last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+        month = first
+        while month <= last:
+            following = _add_months(month, 1)
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_p{month:%Y%m} PARTITION OF {TABLE} "
+                "FOR VALUES FROM (%s) TO (%s)",
+                [f"{month.isoformat()} 00:00+00", f"{following.isoformat()} 00:00+00"],
+            )
+            month = following
+        cursor.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+        cursor.execute(f"INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {LEGACY}")
+        cursor.execute(f"DROP TABLE {LEGACY}")
+        cursor.execute(f"CREATE INDEX shortener_link_ts_idx ON {TABLE} (link_id, ts)")
+        cursor.execute(f"ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id")
+
+
+def unpartition_clicks(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        if not _is_partitioned(cursor):
+            return
+        cursor.execute(f"ALTER SEQUENCE {SEQUENCE} OWNED BY NONE")
+        _set_aside(cursor)
+        cursor.execute(
+            f"""
+            CREATE TABLE {TABLE} (
+                id bigint NOT NULL DEFAULT nextval('{SEQUENCE}') PRIMARY KEY,
+                ts timestamp with time zone NOT NULL,
+                ip inet NULL,
+                user_agent text NULL,
+                referrer text NULL,
+                country varchar(2) NULL,
+                link_id bigint NOT NULL
+                    REFERENCES shortener_link (id) DEFERRABLE INITIALLY DEFERRED
+            )
+            """
+        )
+        cursor.execute(f"INSERT INTO {TABLE} ({COLUMNS}) SELECT {COLUMNS} FROM {LEGACY}")
+        cursor.execute(f"DROP TABLE {LEGACY}")
+        cursor.execute(f"CREATE INDEX shortener_link_ts_idx ON {TABLE} (link_id, ts)")
+        cursor.execute(f"CREATE INDEX shortener_click_link_id_idx ON {TABLE} (link_id)")
+        cursor.execute(f"ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id")
+
+
+class Migration(migrations.Migration):
+    atomic = True
+
+    dependencies = [
+        ("shortener", "0007_click_rollups"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_clicks, unpartition_clicks, elidable=False),
+    ]
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0008_partition_clicks"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="link",
+            index=models.Index(fields=["owner", "created_at", "id"], name="shortener_link_owner_ts_idx"),
+        ),
+    ]
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import hashlib
+
+from django.db import migrations, models
+
+TRIGRAM_INDEXES = {
+    "shortener_link_target_trgm": "target_url",
+    "shortener_link_code_trgm": "code",
+}
+
+
+def backfill_target_hashes(apps, schema_editor):
+    Link = apps.get_model("shortener", "Link")
+    batch = []
+    for link in Link.objects.filter(target_url_hash="").only("id", "target_url").iterator(chunk_size=2000):
+        link.target_url_hash = hashlib.sha256(link.target_url.encode()).hexdigest()
+        batch.append(link)
+        if len(batch) >= 2000:
+            Link.objects.bulk_update(batch, ["target_url_hash"])
+            batch = []
+    if batch:
+        Link.objects.bulk_update(batch, ["target_url_hash"])
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON shortener_link USING gin ({column} gin_trgm_ops)")
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0009_link_owner_created_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="link",
+            name="target_url_hash",
+            field=models.CharField(blank=True, default="", editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_target_hashes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="link",
+            index=models.Index(fields=["owner", "target_url_hash"], name="shortener_link_target_idx"),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
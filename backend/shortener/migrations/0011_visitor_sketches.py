@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0010_link_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VisitorSketch",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField(blank=True, null=True)),
+                ("sketch", models.BinaryField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("link", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="visitor_sketches", to="shortener.link")),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="visitorsketch",
+            constraint=models.UniqueConstraint(fields=("link", "day"), name="shortener_visitor_sketch_unique"),
+        ),
+        migrations.AddConstraint(
+            model_name="visitorsketch",
+            constraint=models.UniqueConstraint(condition=models.Q(("day__isnull", True)), fields=("link",), name="shortener_visitor_sketch_total"),
+        ),
+    ]
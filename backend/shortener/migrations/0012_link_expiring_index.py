@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0011_visitor_sketches"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="link",
+            index=models.Index(condition=models.Q(("expires_at__isnull", False), ("is_active", True)), fields=["expires_at"], name="shortener_link_expiring_idx"),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0012_link_expiring_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserAgent",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("ua_hash", models.CharField(max_length=32, unique=True)),
+                ("raw", models.TextField()),
+                ("browser", models.CharField(blank=True, default="", max_length=64)),
+                ("os", models.CharField(blank=True, default="", max_length=64)),
+                ("device", models.CharField(choices=[("desktop", "Desktop"), ("mobile", "Mobile"), ("tablet", "Tablet"), ("bot", "Bot"), ("other", "Other")], default="other", max_length=16)),
+                ("is_bot", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyUserAgentRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("browser", models.CharField(blank=True, default="", max_length=64)),
+                ("os", models.CharField(blank=True, default="", max_length=64)),
+                ("device", models.CharField(blank=True, default="", max_length=16)),
+                ("clicks", models.PositiveBigIntegerField(default=0)),
+                ("link", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="user_agent_rollups", to="shortener.link")),
+            ],
+        ),
+        migrations.AddField(
+            model_name="click",
+            name="ua",
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name="clicks", to="shortener.useragent"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyuseragentrollup",
+            constraint=models.UniqueConstraint(fields=("link", "day", "browser", "os", "device"), name="shortener_user_agent_rollup_unique"),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0013_user_agents"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bulkjob",
+            name="claim_token",
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shortener", "0014_bulk_job_claim_token"),
+    ]
+
+    # Existing rows get the migration's time. A constant default is added
+    # without rewriting the table on PostgreSQL 11+.
+    operations = [
+        migrations.AddField(
+            model_name="click",
+            name="recorded_at",
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -1,32 +1,122 @@
 from __future__ import annotations
 
+import hashlib
+import uuid
 from urllib.parse import urlparse
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError, models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
-from .utils import generate_code
+from .cache import link_cache
 
 User = get_user_model()
 
 
+def hash_target_url(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+class LinkQuerySet(models.QuerySet):
+    def deactivate(self) -> int:
+        codes = list(self.filter(is_active=True).values_list("code", flat=True))
+        if not codes:
+            return 0
+        updated = self.model.objects.filter(code__in=codes).update(is_active=False, updated_at=timezone.now())
+        link_cache.invalidate_many(codes)
+        transaction.on_commit(lambda: link_cache.invalidate_many(codes))
+        return updated
+
+    def for_target(self, url: str) -> "LinkQuerySet":
+        # The hash is what the index covers; comparing the URL as well keeps
+        # the (theoretical) hash collision from leaking other links.
+        return self.filter(target_url_hash=hash_target_url(url), target_url=url)
+
+    def with_click_totals(self) -> "LinkQuerySet":
+        pending = (
+            LinkClickShard.objects.filter(link=models.OuterRef("pk"))
+            .order_by()
+            .values("link")
+            .annotate(total=models.Sum("count"))
+            .values("total")
+        )
+        return self.annotate(
+            click_total=models.F("click_count")
+            + Coalesce(models.Subquery(pending, output_field=models.BigIntegerField()), 0)
+        )
+
+
+class BulkJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        SUCCEEDED = "succeeded", "Succeeded"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bulk_jobs")
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)
+    target_url = models.TextField()
+    code_length = models.PositiveSmallIntegerField()
+    expires_at = models.DateTimeField(null=True, blank=True)
+    requested_count = models.PositiveIntegerField()
+    created_count = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    # Fresh on every claim; a worker only writes while the row still carries its token.
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "idempotency_key"], name="shortener_bulkjob_idempotency"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="shortener_bulkjob_queue_idx"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"BulkJob({self.id}:{self.status})"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.Status.SUCCEEDED, self.Status.FAILED)
+
+
 class Link(models.Model):
     owner = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    bulk_job = models.ForeignKey(BulkJob, null=True, blank=True, on_delete=models.SET_NULL, related_name="links")
     code = models.SlugField(max_length=16, unique=True, db_index=True)
     target_url = models.TextField()
+    target_url_hash = models.CharField(max_length=64, blank=True, default="", editable=False)
     is_active = models.BooleanField(default=True)
     expires_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     click_count = models.PositiveIntegerField(default=0)
 
+    objects = LinkQuerySet.as_manager()
+
     _desired_length: int | None = None
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["owner", "created_at", "id"], name="shortener_link_owner_ts_idx"),
+            models.Index(fields=["owner", "target_url_hash"], name="shortener_link_target_idx"),
+            models.Index(
+                fields=["expires_at"],
+                name="shortener_link_expiring_idx",
+                condition=models.Q(is_active=True, expires_at__isnull=False),
+            ),
+        ]
 
     def __str__(self) -> str:  # pragma: no cover - debug aid
         return self.code
@@ -41,31 +131,50 @@ class Link(models.Model):
         if scheme in settings.DENYLIST_SCHEMES:
             raise ValidationError("This URL scheme is not allowed.")
 
+    def refresh_target_hash(self) -> None:
+        self.target_url_hash = hash_target_url(self.target_url)
+
     def save(self, *args, **kwargs):
-        if not self.code:
-            length = self._desired_length or settings.DEFAULT_CODE_LENGTH
-            if not settings.MIN_CODE_LENGTH <= length <= settings.MAX_CODE_LENGTH:
-                raise ValidationError("Invalid code length requested.")
+        self.refresh_target_hash()
+        if self.code:
+            super().save(*args, **kwargs)
+            return
+        length = self._desired_length or settings.DEFAULT_CODE_LENGTH
+        if not settings.MIN_CODE_LENGTH <= length <= settings.MAX_CODE_LENGTH:
+            raise ValidationError("Invalid code length requested.")
+        for attempt in range(3):
             self.code = self._generate_unique_code(length)
-        super().save(*args, **kwargs)
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                # Only codes minted before the allocator (or chosen by hand)
+                # can occupy an allocated code; anything else is a real error.
+                if not Link.objects.filter(code=self.code).exists():
+                    raise
+                self.code = ""
+        raise IntegrityError("Could not generate unique code after multiple attempts")
 
     def _generate_unique_code(self, length: int) -> str:
-        for attempt in range(10):
-            candidate = generate_code(length)
-            if not Link.objects.filter(code=candidate).exists():
-                return candidate
-        raise IntegrityError("Could not generate unique code after multiple attempts")
+        from .code_pool import take_codes
+
+        return take_codes(length, 1)[0]
 
     def mark_clicked(self, ip: str | None, user_agent: str | None, referrer: str | None, country: str | None = None) -> None:
-        Click.objects.create(
-            link=self,
-            ip=ip,
-            user_agent=user_agent,
-            referrer=referrer,
-            country=country,
-        )
-        Link.objects.filter(pk=self.pk).update(click_count=models.F("click_count") + 1)
+        from .clicks import ClickEvent, flush_clicks
+
+        flush_clicks([ClickEvent(link_id=self.pk, ip=ip, user_agent=user_agent, referrer=referrer, country=country)])
         self.refresh_from_db(fields=["click_count"])
+        self.__dict__.pop("click_total", None)
+
+    @property
+    def total_clicks(self) -> int:
+        total = getattr(self, "click_total", None)
+        if total is None:
+            pending = self.click_shards.aggregate(total=models.Sum("count"))["total"] or 0
+            total = self.click_total = self.click_count + pending
+        return total
 
     @property
     def short_url(self) -> str:
@@ -75,19 +184,192 @@ class Link(models.Model):
         return bool(self.expires_at and timezone.now() >= self.expires_at)
 
 
+class CodeSequence(models.Model):
+    length = models.PositiveSmallIntegerField(unique=True)
+    next_value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"CodeSequence({self.length}:{self.next_value})"
+
+
+class CodePool(models.Model):
+    length = models.PositiveSmallIntegerField()
+    code = models.SlugField(max_length=16, unique=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["length", "id"], name="shortener_codepool_len_idx"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return self.code
+
+
+class LinkClickShard(models.Model):
+    link = models.ForeignKey(Link, on_delete=models.CASCADE, related_name="click_shards")
+    shard = models.PositiveSmallIntegerField()
+    count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["link", "shard"], name="shortener_click_shard_unique"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"LinkClickShard({self.link_id}:{self.shard})"
+
+
+class UserAgent(models.Model):
+    """A distinct user-agent string, parsed once and shared by every click that sent it."""
+
+    class Device(models.TextChoices):
+        DESKTOP = "desktop", "Desktop"
+        MOBILE = "mobile", "Mobile"
+        TABLET = "tablet", "Tablet"
+        BOT = "bot", "Bot"
+        OTHER = "other", "Other"
+
+    ua_hash = models.CharField(max_length=32, unique=True)
+    raw = models.TextField()
+    browser = models.CharField(max_length=64, blank=True, default="")
+    os = models.CharField(max_length=64, blank=True, default="")
+    device = models.CharField(max_length=16, choices=Device.choices, default=Device.OTHER)
+    is_bot = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"UserAgent({self.browser}/{self.os}/{self.device})"
+
+
 class Click(models.Model):
     link = models.ForeignKey(Link, on_delete=models.CASCADE, related_name="clicks")
-    ts = models.DateTimeField(auto_now_add=True)
+    # When the click happened; buffered clicks keep the redirect's time.
+    ts = models.DateTimeField(default=timezone.now)
+    # When the row was inserted. flush_clicks takes it from the database clock;
+    # the rollup safety lag is measured against it, not against ``ts``.
+    recorded_at = models.DateTimeField(default=timezone.now, editable=False)
     ip = models.GenericIPAddressField(null=True, blank=True)
+    # Raw text only for clicks recorded before the ``ua`` dimension existed;
+    # ``backfill_user_agents`` moves it over.
     user_agent = models.TextField(null=True, blank=True)
+    # No index: agents are never deleted, and one more index on the busiest table isn't free.
+    ua = models.ForeignKey(
+        UserAgent, null=True, blank=True, on_delete=models.PROTECT, related_name="clicks", db_index=False
+    )
     referrer = models.TextField(null=True, blank=True)
     country = models.CharField(max_length=2, null=True, blank=True)
 
     class Meta:
         indexes = [
-            models.Index(fields=["link", "ts"]),
+            models.Index(fields=["link", "ts"], name="shortener_link_ts_idx"),
         ]
         ordering = ("-ts",)
 
     def __str__(self) -> str:  # pragma: no cover
         return f"Click({self.link_id})"
+
+
+class HourlyClickRollup(models.Model):
+    link = models.ForeignKey(Link, on_delete=models.CASCADE, related_name="hourly_rollups")
+    bucket = models.DateTimeField()
+    clicks = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["link", "bucket"], name="shortener_hourly_rollup_unique"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"HourlyClickRollup({self.link_id}:{self.bucket:%Y-%m-%dT%H})"
+
+
+class DailyClickRollup(models.Model):
+    link = models.ForeignKey(Link, on_delete=models.CASCADE, related_name="daily_rollups")
+    day = models.DateField()
+    clicks = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["link", "day"], name="shortener_daily_rollup_unique"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"DailyClickRollup({self.link_id}:{self.day})"
+
+
+class DailyReferrerRollup(models.Model):
+    link = models.ForeignKey(Link, on_delete=models.CASCADE, related_name="referrer_rollups")
+    day = models.DateField()
+    host = models.CharField(max_length=255, blank=True, default="")
+    clicks = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["link", "day", "host"], name="shortener_referrer_rollup_unique"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"DailyReferrerRollup({self.link_id}:{self.day}:{self.host})"
+
+
+class DailyCountryRollup(models.Model):
+    link = models.ForeignKey(Link, on_delete=models.CASCADE, related_name="country_rollups")
+    day = models.DateField()
+    country = models.CharField(max_length=2, blank=True, default="")
+    clicks = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["link", "day", "country"], name="shortener_country_rollup_unique"),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"DailyCountryRollup({self.link_id}:{self.day}:{self.country})"
+
+
+class DailyUserAgentRollup(models.Model):
+    link = models.ForeignKey(Link, on_delete=models.CASCADE, related_name="user_agent_rollups")
+    day = models.DateField()
+    browser = models.CharField(max_length=64, blank=True, default="")
+    os = models.CharField(max_length=64, blank=True, default="")
+    device = models.CharField(max_length=16, blank=True, default="")
+    clicks = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["link", "day", "browser", "os", "device"], name="shortener_user_agent_rollup_unique"
+            ),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"DailyUserAgentRollup({self.link_id}:{self.day}:{self.browser}/{self.os}/{self.device})"
+
+
+class VisitorSketch(models.Model):
+    """HyperLogLog of visitor IPs for a link and UTC day; ``day`` is null for the all-time sketch."""
+
+    link = models.ForeignKey(Link, on_delete=models.CASCADE, related_name="visitor_sketches")
+    day = models.DateField(null=True, blank=True)
+    sketch = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["link", "day"], name="shortener_visitor_sketch_unique"),
+            models.UniqueConstraint(
+                fields=["link"], condition=models.Q(day__isnull=True), name="shortener_visitor_sketch_total"
+            ),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"VisitorSketch({self.link_id}:{self.day or 'total'})"
+
+
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=64, unique=True)
+    last_click_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"RollupWatermark({self.name}:{self.last_click_id})"
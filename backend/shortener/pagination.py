@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import base64
+import json
+from typing import List, Optional
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from rest_framework import exceptions, pagination, response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(created_at, pk: int) -> str:
+    raw = json.dumps([created_at.isoformat(), pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, pk = json.loads(raw)
+        created_at = parse_datetime(created_at)
+    except (TypeError, ValueError):
+        raise exceptions.NotFound("Invalid cursor.")
+    if created_at is None or not isinstance(pk, int):
+        raise exceptions.NotFound("Invalid cursor.")
+    return created_at, pk
+
+
+class LinkCursorPagination(pagination.BasePagination):
+    """Keyset pagination over ``(-created_at, -id)``.
+
+    The body stays a plain JSON array so existing clients keep working; the
+    next page is advertised in a ``Link: <...>; rel="next"`` header and in
+    ``X-Next-Cursor``.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, settings.LINK_LIST_PAGE_SIZE))
+        except ValueError:
+            size = settings.LINK_LIST_PAGE_SIZE
+        return max(1, min(size, settings.LINK_LIST_MAX_PAGE_SIZE))
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None) -> List:
+        self.request = request
+        self.next_cursor: Optional[str] = None
+        queryset = queryset.order_by("-created_at", "-id")
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            created_at, pk = decode_cursor(cursor)
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        page_size = self.get_page_size(request)
+        rows = list(queryset[: page_size + 1])
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_cursor = encode_cursor(rows[-1].created_at, rows[-1].pk)
+        return rows
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data) -> response.Response:
+        headers = {}
+        if self.next_cursor is not None:
+            headers["Link"] = f'<{self.get_next_link()}>; rel="next"'
+            headers["X-Next-Cursor"] = self.next_cursor
+        return response.Response(data, headers=headers)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import gzip
+import os
+import re
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Iterable, List
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Click
+
+PARENT = Click._meta.db_table
+DEFAULT_PARTITION = f"{PARENT}_default"
+_PARTITION_RE = re.compile(rf"^{PARENT}_p(\d{{4}})(\d{{2}})$")
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_p{month:%Y%m}"
+
+
+def partition_month(name: str) -> date | None:
+    match = _PARTITION_RE.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def retention_cutoff(retention_months: int, today: date | None = None) -> date:
+    """First month that is still retained; partitions ending on or before it expire."""
+    return add_months(month_start(today or timezone.now().date()), -retention_months)
+
+
+def expired_partitions(names: Iterable[str], retention_months: int, today: date | None = None) -> List[str]:
+    if retention_months <= 0:
+        return []
+    cutoff = retention_cutoff(retention_months, today)
+    expired = [(month, name) for name in names if (month := partition_month(name)) and add_months(month, 1) <= cutoff]
+    return [name for _, name in sorted(expired)]
+
+
+def is_supported() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def is_partitioned() -> bool:
+    if not is_supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [PARENT],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> List[str]:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s AND pg_table_is_visible(parent.oid) ORDER BY child.relname",
+            [PARENT],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def missing_partitions(months_ahead: int, today: date | None = None) -> List[date]:
+    """Months from the current one through ``months_ahead`` that have no partition yet."""
+    existing = set(list_partitions())
+    first = month_start(today or timezone.now().date())
+    months = (add_months(first, offset) for offset in range(months_ahead + 1))
+    return [month for month in months if partition_name(month) not in existing]
+
+
+def ensure_partitions(months_ahead: int, today: date | None = None) -> List[str]:
+    created = []
+    for month in missing_partitions(months_ahead, today):
+        create_partition(month)
+        created.append(partition_name(month))
+    return created
+
+
+def create_partition(month: date) -> None:
+    # Rows for this month may already sit in the default partition, which
+    # Postgres refuses to overlap. Move them across while it is detached.
+    name, start, end = partition_name(month), _bound(month), _bound(add_months(month, 1))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE ts >= %s AND ts < %s LIMIT 1", [start, end])
+        stranded = cursor.fetchone() is not None
+        if stranded:
+            cursor.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {DEFAULT_PARTITION}")
+        cursor.execute(f"CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES FROM (%s) TO (%s)", [start, end])
+        if stranded:
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE ts >= %s AND ts < %s RETURNING *) "
+                f"INSERT INTO {PARENT} SELECT * FROM moved",
+                [start, end],
+            )
+            cursor.execute(f"ALTER TABLE {PARENT} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+
+
+def archive_partition(name: str, directory: str) -> str:
+    """Write a partition to ``<directory>/<name>.csv.gz`` with a header row."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}.csv.gz")
+    partial = f"{path}.partial"
+    with gzip.open(partial, "wb") as handle, connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY (SELECT * FROM {name} ORDER BY ts, id) TO STDOUT WITH (FORMAT csv, HEADER)", handle)
+    os.replace(partial, path)
+    return path
+
+
+def drop_partition(name: str, *, detach_only: bool = False) -> None:
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+        if not detach_only:
+            cursor.execute(f"DROP TABLE {name}")
+
+
+def _bound(month: date) -> datetime:
+    return datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import RedirectView
+from .views import RedirectView, async_redirect_view
+
+redirect_view = async_redirect_view if settings.ASYNC_REDIRECTS else RedirectView.as_view()
 
 urlpatterns = [
-    path("<slug:code>", RedirectView.as_view(), name="link-redirect"),
+    path("<slug:code>", redirect_view, name="link-redirect"),
 ]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from django.http import Http404, HttpResponse, HttpResponseGone
+from django.shortcuts import redirect
+
+from .cache import LinkResolution
+from .clicks import record_click, schedule_click
+from .services import aresolve_link, resolve_link
+from .throttling import RateLimitResult, client_ip, rate_limiter
+
+
+def _click_details(request) -> dict:
+    return {
+        "ip": client_ip(request),
+        "user_agent": request.META.get("HTTP_USER_AGENT"),
+        "referrer": request.META.get("HTTP_REFERER"),
+    }
+
+
+def _unavailable_response(resolution: LinkResolution | None) -> HttpResponse | None:
+    if resolution is None:
+        raise Http404("No Link matches the given query.")
+    if not resolution.is_active:
+        return HttpResponseGone("Link is inactive")
+    if resolution.is_expired():
+        return HttpResponseGone("Link has expired")
+    return None
+
+
+def _throttled_response(result: RateLimitResult) -> HttpResponse:
+    response = HttpResponse("Too many requests", status=429, content_type="text/plain")
+    response["Retry-After"] = str(result.retry_after or 1)
+    return response
+
+
+def redirect_response(request, code: str) -> HttpResponse:
+    limited = rate_limiter.hit("redirect", client_ip(request))
+    if not limited.allowed:
+        return _throttled_response(limited)
+    resolution = resolve_link(code)
+    unavailable = _unavailable_response(resolution)
+    if unavailable is not None:
+        return unavailable
+    record_click(resolution.link_id, **_click_details(request))
+    return redirect(resolution.target_url)
+
+
+async def aredirect_response(request, code: str) -> HttpResponse:
+    limited = await rate_limiter.ahit("redirect", client_ip(request))
+    if not limited.allowed:
+        return _throttled_response(limited)
+    resolution = await aresolve_link(code)
+    unavailable = _unavailable_response(resolution)
+    if unavailable is not None:
+        return unavailable
+    schedule_click(resolution.link_id, **_click_details(request))
+    return redirect(resolution.target_url)
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Tuple
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import (
+    Click,
+    DailyClickRollup,
+    DailyCountryRollup,
+    DailyReferrerRollup,
+    DailyUserAgentRollup,
+    HourlyClickRollup,
+    Link,
+    RollupWatermark,
+)
+from .visitors import unique_visitors
+
+WATERMARK_NAME = "clicks"
+GRANULARITIES = ("hour", "day")
+AGENT_FIELDS = ("browser", "os", "device")
+ROLLUP_COLUMNS = (
+    "pk", "link_id", "ts", "referrer", "country", "ua__browser", "ua__os", "ua__device", "ua__is_bot", "recorded_at"
+)
+
+
+def referrer_host(referrer: str | None) -> str:
+    if not referrer:
+        return ""
+    host = urlparse(referrer).hostname or ""
+    return host[:255]
+
+
+def hour_bucket(ts: datetime) -> datetime:
+    return ts.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(ts: datetime) -> date:
+    return ts.astimezone(dt_timezone.utc).date()
+
+
+def rollup_batch(batch_size: int = 5000, lag_seconds: float | None = None) -> int:
+    """Fold the next batch of clicks past the watermark into the rollup tables.
+
+    Ids are handed out before commit, so a lower id can still commit
+    behind one we have already seen. The pass therefore only advances to the
+    highest id *inserted* (``Click.recorded_at``, from the database clock)
+    more than the safety lag ago: any lower id was handed out earlier still,
+    so its transaction has finished by now. The event time ``ts`` can't be
+    used for this, because buffered clicks carry the redirect's time. Newer
+    rows below that id are already committed and are included. The watermark
+    row lock keeps concurrent runs from double counting. With
+    ``CLICK_EXCLUDE_BOTS`` bot clicks only count towards the user-agent
+    breakdown.
+    """
+    lag = settings.ROLLUP_SAFETY_LAG_SECONDS if lag_seconds is None else lag_seconds
+    cutoff = timezone.now() - timedelta(seconds=lag)
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK_NAME)
+        rows = list(
+            Click.objects.filter(pk__gt=watermark.last_click_id)
+            .order_by("pk")
+            .values_list(*ROLLUP_COLUMNS)[:batch_size]
+        )
+        settled = [index for index, row in enumerate(rows) if row[-1] <= cutoff]
+        if not settled:
+            return 0
+        ready = rows[: settled[-1] + 1]
+        hourly: Counter = Counter()
+        daily: Counter = Counter()
+        referrers: Counter = Counter()
+        countries: Counter = Counter()
+        agents: Counter = Counter()
+        for _, link_id, ts, referrer, country, browser, os, device, is_bot, _ in ready:
+            day = day_bucket(ts)
+            agents[(link_id, day, browser or "", os or "", device or "")] += 1
+            if is_bot and settings.CLICK_EXCLUDE_BOTS:
+                continue
+            hourly[(link_id, hour_bucket(ts))] += 1
+            daily[(link_id, day)] += 1
+            referrers[(link_id, day, referrer_host(referrer))] += 1
+            countries[(link_id, day, (country or "").upper())] += 1
+        _merge(HourlyClickRollup, ("link_id", "bucket"), hourly)
+        _merge(DailyClickRollup, ("link_id", "day"), daily)
+        _merge(DailyReferrerRollup, ("link_id", "day", "host"), referrers)
+        _merge(DailyCountryRollup, ("link_id", "day", "country"), countries)
+        _merge(DailyUserAgentRollup, ("link_id", "day", *AGENT_FIELDS), agents)
+        watermark.last_click_id = ready[-1][0]
+        watermark.save(update_fields=["last_click_id", "updated_at"])
+    return len(ready)
+
+
+def _merge(model: type[models.Model], key_fields: Tuple[str, ...], counts: Counter) -> None:
+    lookup = {f"{field}__in": {key[index] for key in counts} for index, field in enumerate(key_fields)}
+    existing: Dict[tuple, models.Model] = {
+        tuple(getattr(row, field) for field in key_fields): row for row in model.objects.filter(**lookup)
+    }
+    changed, created = [], []
+    for key, amount in counts.items():
+        row = existing.get(key)
+        if row is None:
+            created.append(model(clicks=amount, **dict(zip(key_fields, key))))
+        else:
+            row.clicks += amount
+            changed.append(row)
+    if changed:
+        model.objects.bulk_update(changed, ["clicks"], batch_size=500)
+    if created:
+        model.objects.bulk_create(created, batch_size=500)
+
+
+def _reassign(model: type[models.Model], fields: Tuple[str, ...], counts: Counter) -> None:
+    """Move rolled-up clicks from the all-empty ``fields`` row to the values in ``(link_id, day, *values)``."""
+    if not counts:
+        return
+    unknown: Counter = Counter()
+    for (link_id, day, *_), amount in counts.items():
+        unknown[(link_id, day)] += amount
+    empty = {field: "" for field in fields}
+    for (link_id, day), amount in unknown.items():
+        model.objects.filter(link_id=link_id, day=day, **empty).update(clicks=models.F("clicks") - amount)
+    model.objects.filter(link_id__in={link_id for link_id, _ in unknown}, clicks=0, **empty).delete()
+    _merge(model, ("link_id", "day", *fields), counts)
+
+
+def reassign_countries(counts: Counter) -> None:
+    """Move already rolled-up clicks from the empty country to the one in ``(link_id, day, country)``."""
+    _reassign(DailyCountryRollup, ("country",), counts)
+
+
+def reassign_user_agents(counts: Counter) -> None:
+    """Same for the user-agent breakdown, keyed ``(link_id, day, browser, os, device)``."""
+    _reassign(DailyUserAgentRollup, AGENT_FIELDS, counts)
+
+
+def _subtract(model: type[models.Model], key_fields: Tuple[str, ...], counts: Counter) -> None:
+    for key, amount in counts.items():
+        model.objects.filter(**dict(zip(key_fields, key))).update(clicks=models.F("clicks") - amount)
+    if counts:
+        model.objects.filter(link_id__in={key[0] for key in counts}, clicks=0).delete()
+
+
+def discount_clicks(rows: Iterable[Tuple[int, datetime, str | None, str | None]]) -> None:
+    """Take already rolled-up ``(link_id, ts, referrer, country)`` clicks back out of the click rollups."""
+    hourly: Counter = Counter()
+    daily: Counter = Counter()
+    referrers: Counter = Counter()
+    countries: Counter = Counter()
+    for link_id, ts, referrer, country in rows:
+        day = day_bucket(ts)
+        hourly[(link_id, hour_bucket(ts))] += 1
+        daily[(link_id, day)] += 1
+        referrers[(link_id, day, referrer_host(referrer))] += 1
+        countries[(link_id, day, (country or "").upper())] += 1
+    _subtract(HourlyClickRollup, ("link_id", "bucket"), hourly)
+    _subtract(DailyClickRollup, ("link_id", "day"), daily)
+    _subtract(DailyReferrerRollup, ("link_id", "day", "host"), referrers)
+    _subtract(DailyCountryRollup, ("link_id", "day", "country"), countries)
+
+
+def rollup_clicks(batch_size: int = 5000, lag_seconds: float | None = None) -> int:
+    total = 0
+    while True:
+        processed = rollup_batch(batch_size=batch_size, lag_seconds=lag_seconds)
+        total += processed
+        if processed < batch_size:
+            return total
+
+
+def _bucket_range(start: datetime, end: datetime, granularity: str) -> List:
+    if granularity == "hour":
+        step, current, last = timedelta(hours=1), hour_bucket(start), hour_bucket(end)
+    else:
+        step, current, last = timedelta(days=1), day_bucket(start), day_bucket(end)
+    buckets = []
+    while current <= last:
+        buckets.append(current)
+        current += step
+    return buckets
+
+
+def bucket_count(start: datetime, end: datetime, granularity: str) -> int:
+    if granularity == "hour":
+        return int((hour_bucket(end) - hour_bucket(start)).total_seconds() // 3600) + 1
+    return (day_bucket(end) - day_bucket(start)).days + 1
+
+
+def _top(rows: Iterable[dict], field: str) -> List[dict]:
+    return [{field: row[field], "clicks": row["total"]} for row in rows]
+
+
+def _breakdown(rows: models.QuerySet, field: str) -> models.QuerySet:
+    return rows.values(field).annotate(total=models.Sum("clicks")).order_by("-total", field)
+
+
+def click_timeseries(link: Link, start: datetime, end: datetime, granularity: str, top: int = 10) -> dict:
+    """Clicks per bucket for ``[start, end]`` read from the rollup tables only.
+
+    Buckets are UTC and inclusive of the ones containing ``start`` and
+    ``end``; referrer, country, user-agent and unique-visitor figures have
+    daily resolution. The user-agent breakdown includes bots (device
+    ``bot``) even when ``CLICK_EXCLUDE_BOTS`` keeps them out of the totals.
+    """
+    buckets = _bucket_range(start, end, granularity)
+    if granularity == "hour":
+        rows = HourlyClickRollup.objects.filter(link=link, bucket__gte=buckets[0], bucket__lte=buckets[-1])
+        counts = dict(rows.values_list("bucket", "clicks"))
+    else:
+        rows = DailyClickRollup.objects.filter(link=link, day__gte=buckets[0], day__lte=buckets[-1])
+        counts = dict(rows.values_list("day", "clicks"))
+    first_day, last_day = day_bucket(start), day_bucket(end)
+    referrers = (
+        DailyReferrerRollup.objects.filter(link=link, day__gte=first_day, day__lte=last_day)
+        .values("host")
+        .annotate(total=models.Sum("clicks"))
+        .order_by("-total", "host")
+    )
+    countries = (
+        DailyCountryRollup.objects.filter(link=link, day__gte=first_day, day__lte=last_day)
+        .values("country")
+        .annotate(total=models.Sum("clicks"))
+        .order_by("-total", "country")
+    )
+    agents = DailyUserAgentRollup.objects.filter(link=link, day__gte=first_day, day__lte=last_day)
+    series = [
+        {
+            "bucket": (bucket if granularity == "hour" else datetime.combine(bucket, time.min, dt_timezone.utc)),
+            "clicks": counts.get(bucket, 0),
+        }
+        for bucket in buckets
+    ]
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).values_list("updated_at", flat=True).first()
+    return {
+        "granularity": granularity,
+        "from": start,
+        "to": end,
+        "total": sum(counts.values()),
+        "series": series,
+        "top_referrers": _top(referrers[:top], "host"),
+        "top_countries": _top(countries[:top], "country"),
+        "top_browsers": _top(_breakdown(agents, "browser")[:top], "browser"),
+        "top_os": _top(_breakdown(agents, "os")[:top], "os"),
+        "top_devices": _top(_breakdown(agents, "device")[:top], "device"),
+        "unique_visitors": unique_visitors(link, first_day, last_day),
+        "rolled_up_at": watermark,
+    }
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Dict, Protocol
+
+from django.conf import settings
+from django.db import connection, models
+from django.db.models.lookups import IContains
+
+
+@models.CharField.register_lookup
+@models.TextField.register_lookup
+class TrigramContains(IContains):
+    """Case-insensitive substring match that a ``gin_trgm_ops`` index can serve.
+
+    Django's ``icontains`` compiles to ``UPPER(col::text) LIKE UPPER(...)`` on
+    Postgres, which a trigram index on the bare column cannot answer; this
+    emits ``col ILIKE '%...%'`` instead and falls back to ``icontains``
+    elsewhere.
+    """
+
+    lookup_name = "trigram_contains"
+
+    def as_sql(self, compiler, connection):
+        return IContains(self.lhs, self.rhs).as_sql(compiler, connection)
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} ILIKE {rhs}", (*lhs_params, *rhs_params)
+
+
+class LinkSearchBackend(Protocol):
+    def filter(self, queryset: models.QuerySet, query: str) -> models.QuerySet: ...
+
+
+class IContainsSearch:
+    def filter(self, queryset: models.QuerySet, query: str) -> models.QuerySet:
+        return queryset.filter(models.Q(target_url__icontains=query) | models.Q(code__icontains=query))
+
+
+class TrigramSearch:
+    def filter(self, queryset: models.QuerySet, query: str) -> models.QuerySet:
+        return queryset.filter(
+            models.Q(target_url__trigram_contains=query) | models.Q(code__trigram_contains=query)
+        )
+
+
+SEARCH_BACKENDS: Dict[str, LinkSearchBackend] = {
+    "icontains": IContainsSearch(),
+    "trigram": TrigramSearch(),
+}
+
+
+def get_search_backend() -> LinkSearchBackend:
+    name = settings.LINK_SEARCH_BACKEND
+    if name == "auto":
+        name = "trigram" if connection.vendor == "postgresql" else "icontains"
+    return SEARCH_BACKENDS[name]
+
+
+def search_links(queryset: models.QuerySet, query: str) -> models.QuerySet:
+    return get_search_backend().filter(queryset, query)
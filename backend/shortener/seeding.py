@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import bisect
+import itertools
+import random
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Click, Link, hash_target_url
+from .user_agents import agent_cache
+from .utils import BASE62_ALPHABET
+
+
+@dataclass(frozen=True)
+class SeedPlan:
+    """What to generate. The same plan and ``seed`` always produce the same rows."""
+
+    links: int
+    clicks: int
+    days: int = 30
+    seed: int = 0
+    zipf_s: float = 1.1
+    prefix: str = "sd"
+    visitors: int | None = None
+    until: datetime | None = None
+
+    @property
+    def visitor_pool(self) -> int:
+        return self.visitors or max(1, self.clicks // 4)
+
+
+# Rough production mixes; weights need not sum to anything in particular.
+REFERRERS: Sequence[Tuple[str | None, float]] = (
+    (None, 45),
+    ("https://www.google.com/", 18),
+    ("https://t.co/", 9),
+    ("https://www.facebook.com/", 8),
+    ("https://www.linkedin.com/", 5),
+    ("https://news.ycombinator.com/", 3),
+    ("https://www.reddit.com/", 4),
+    ("https://mail.google.com/", 5),
+    ("https://duckduckgo.com/", 3),
+)
+COUNTRIES: Sequence[Tuple[str | None, float]] = (
+    ("US", 34), ("IN", 9), ("GB", 7), ("DE", 6), ("BR", 5), ("FR", 4), ("CA", 4), ("JP", 3),
+    ("NG", 3), ("GH", 3), ("AU", 2), ("NL", 2), ("ES", 2), ("MX", 2), ("ID", 2), (None, 12),
+)
+USER_AGENTS: Sequence[Tuple[str | None, float]] = (
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/124.0.0.0 Safari/537.36", 30),
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+     "Version/17.4 Mobile/15E148 Safari/604.1", 22),
+    ("Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) "
+     "Chrome/124.0.0.0 Mobile Safari/537.36", 18),
+    ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+     "Version/17.4 Safari/605.1.15", 10),
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0", 6),
+    ("Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)", 4),
+    ("Twitterbot/1.0", 2),
+    ("Slackbot-LinkExpanding 1.0 (+https://api.slack.com/robots)", 2),
+    ("curl/8.5.0", 1),
+    (None, 5),
+)
+# Share of a day's clicks per UTC hour: quiet overnight, peaking early evening.
+HOURLY_WEIGHTS: Sequence[float] = (
+    2, 1.5, 1, 1, 1, 1.5, 2.5, 4, 5, 5.5, 6, 6, 6, 6, 6, 6, 6.5, 7, 7.5, 7, 6, 5, 4, 3,
+)
+
+Progress = Callable[[str, int, int], None]
+
+
+def seed_code(prefix: str, number: int) -> str:
+    digits = []
+    while True:
+        number, digit = divmod(number, len(BASE62_ALPHABET))
+        digits.append(BASE62_ALPHABET[digit])
+        if number == 0:
+            break
+    return prefix + "".join(reversed(digits))
+
+
+def zipf_ranks(rng: random.Random, population: int, count: int, s: float) -> List[int]:
+    """``count`` draws from ``range(population)`` where rank ``k`` has weight ``1 / (k + 1) ** s``."""
+    cumulative = list(itertools.accumulate(1 / (rank + 1) ** s for rank in range(population)))
+    total = cumulative[-1]
+    return [bisect.bisect(cumulative, rng.random() * total) for _ in range(count)]
+
+
+def weighted_picker(rng: random.Random, choices: Sequence[Tuple[object, float]]) -> Callable[[], object]:
+    values = [value for value, _ in choices]
+    cumulative = list(itertools.accumulate(weight for _, weight in choices))
+    total = cumulative[-1]
+    return lambda: values[bisect.bisect(cumulative, rng.random() * total)]
+
+
+def seed_link_rows(plan: SeedPlan, owner_id: int | None, counts: Counter) -> Iterator[Link]:
+    for number in range(plan.links):
+        url = f"https://shop{number % 5000}.example.com/campaign/{number}"
+        yield Link(
+            owner_id=owner_id,
+            code=seed_code(plan.prefix, number),
+            target_url=url,
+            target_url_hash=hash_target_url(url),
+            click_count=counts.get(number, 0),
+        )
+
+
+def click_link_indexes(plan: SeedPlan) -> List[int]:
+    """Link index for each click; popularity ranks are shuffled across links."""
+    rng = random.Random(plan.seed)
+    popularity = list(range(plan.links))
+    rng.shuffle(popularity)
+    return [popularity[rank] for rank in zipf_ranks(rng, plan.links, plan.clicks, plan.zipf_s)]
+
+
+def click_times(plan: SeedPlan, now: datetime) -> Iterator[datetime]:
+    """Uniform over days, diurnal within a day, never later than ``now``."""
+    rng = random.Random(plan.seed + 1)
+    pick_hour = weighted_picker(rng, [(hour, weight) for hour, weight in enumerate(HOURLY_WEIGHTS)])
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(plan.clicks):
+        day = today - timedelta(days=rng.randrange(plan.days))
+        ts = day + timedelta(hours=pick_hour(), seconds=rng.random() * 3600)
+        yield ts if ts <= now else ts - timedelta(days=1)
+
+
+def seed_click_rows(
+    plan: SeedPlan, link_ids: List[int], indexes: List[int], now: datetime, agents: Dict[str, int] | None = None
+) -> Iterator[Click]:
+    """Clicks for the plan; with ``agents`` (raw string -> ``UserAgent`` id) they reference the dimension rows."""
+    rng = random.Random(plan.seed + 3)
+    referrer = weighted_picker(rng, REFERRERS)
+    country = weighted_picker(rng, COUNTRIES)
+    user_agent = weighted_picker(rng, USER_AGENTS)
+    visitors = zipf_ranks(rng, plan.visitor_pool, plan.clicks, 0.8) if plan.clicks else []
+    for index, ts, visitor in zip(indexes, click_times(plan, now), visitors):
+        raw = user_agent()
+        yield Click(
+            link_id=link_ids[index],
+            ts=ts,
+            ip=f"10.{visitor >> 16 & 255}.{visitor >> 8 & 255}.{visitor & 255}",
+            user_agent=None if agents is not None else raw,
+            ua_id=agents.get(raw) if agents is not None else None,
+            referrer=referrer(),
+            country=country(),
+        )
+
+
+def seed(
+    plan: SeedPlan,
+    *,
+    owner_id: int | None,
+    batch_size: int = 5000,
+    progress: Progress | None = None,
+    use_copy: bool | None = None,
+) -> List[int]:
+    """Insert the plan's links and clicks; returns the new link ids in creation order.
+
+    Postgres gets ``COPY FROM STDIN``; other backends fall back to batched ``bulk_create``.
+    """
+    if use_copy is None:
+        use_copy = connection.vendor == "postgresql"
+    now = plan.until or timezone.now()
+    indexes = click_link_indexes(plan)
+    links = _report(seed_link_rows(plan, owner_id, Counter(indexes)), "links", plan.links, batch_size, progress)
+    with transaction.atomic():
+        if use_copy:
+            copy_models(Link, links)
+            codes = _code_ids(plan.prefix)
+            link_ids = [codes[seed_code(plan.prefix, number)] for number in range(plan.links)]
+        else:
+            link_ids = [link.pk for link in _bulk_create(Link, links, batch_size)]
+        agents = {raw: agent.id for raw, agent in agent_cache.resolve(raw for raw, _ in USER_AGENTS).items()}
+        rows = seed_click_rows(plan, link_ids, indexes, now, agents)
+        clicks = _report(rows, "clicks", plan.clicks, batch_size, progress)
+        if use_copy:
+            copy_models(Click, clicks)
+        else:
+            for _ in _bulk_create(Click, clicks, batch_size):
+                pass
+    return link_ids
+
+
+def _report(rows: Iterable, label: str, total: int, every: int, progress: Progress | None) -> Iterator:
+    done = 0
+    for done, row in enumerate(rows, 1):
+        yield row
+        if progress and done % every == 0:
+            progress(label, done, total)
+    if progress and done % every:
+        progress(label, done, total)
+
+
+def _bulk_create(model, rows: Iterable, batch_size: int) -> Iterator:
+    rows = iter(rows)
+    while batch := list(itertools.islice(rows, batch_size)):
+        yield from model.objects.bulk_create(batch)
+
+
+def _code_ids(prefix: str) -> Dict[str, int]:
+    return dict(Link.objects.filter(code__startswith=prefix).values_list("code", "id").iterator(chunk_size=20_000))
+
+
+def copy_value(value) -> str:
+    """One field in Postgres' COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (
+        str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    )
+
+
+class CopyStream:
+    """File-like view over encoded COPY lines, read incrementally by ``copy_expert``."""
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines = iter(lines)
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        size = size if size and size > 0 else 1 << 16
+        while len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line.encode()
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def copy_models(model, instances: Iterable) -> None:
+    """Stream unsaved instances into ``model``'s table with ``COPY``.
+
+    Like ``bulk_create``, field defaults such as ``auto_now_add`` apply and primary keys are left
+    to the database.
+    """
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    lines = (
+        "\t".join(copy_value(field.pre_save(instance, True)) for field in fields) + "\n" for instance in instances
+    )
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN", CopyStream(lines)
+        )
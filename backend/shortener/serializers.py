@@ -1,16 +1,20 @@
 from __future__ import annotations
 
-from typing import Iterable
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from typing import Iterable, List
 
 from django.conf import settings
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import serializers
 
-from .models import Click, Link
+from .models import BulkJob, Click, Link
+from .rollups import GRANULARITIES, bucket_count
 
 
 class LinkSerializer(serializers.ModelSerializer):
     short_url = serializers.SerializerMethodField()
+    click_count = serializers.IntegerField(source="total_clicks", read_only=True)
 
     class Meta:
         model = Link
@@ -27,10 +31,43 @@ class LinkSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "code", "short_url", "click_count", "created_at", "updated_at"]
 
+    # Model columns each output field needs, for pushing ``fields=`` down to
+    # ``QuerySet.only()``.
+    source_columns = {
+        "short_url": ("code",),
+        "click_count": ("click_count",),
+    }
+
+    def __init__(self, *args, fields: Iterable[str] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def columns_for(cls, fields: Iterable[str]) -> List[str]:
+        columns = {"id", "created_at"}
+        for name in fields:
+            columns.update(cls.source_columns.get(name, (name,)))
+        return sorted(columns)
+
     def get_short_url(self, obj: Link) -> str:
         return obj.short_url
 
 
+def _validate_link_options(attrs):
+    code_length = attrs.get("code_length") or settings.DEFAULT_CODE_LENGTH
+    if not settings.MIN_CODE_LENGTH <= code_length <= settings.MAX_CODE_LENGTH:
+        raise serializers.ValidationError(
+            {"code_length": f"Code length must be between {settings.MIN_CODE_LENGTH} and {settings.MAX_CODE_LENGTH}."}
+        )
+    attrs["resolved_code_length"] = code_length
+    expires_at = attrs.get("expires_at")
+    if expires_at and expires_at <= timezone.now():
+        raise serializers.ValidationError({"expires_at": "Expiration must be in the future."})
+    return attrs
+
+
 class BulkCreateRequestSerializer(serializers.Serializer):
     url = serializers.URLField()
     size = serializers.IntegerField(required=False, min_value=1, max_value=settings.MAX_BULK_LINKS)
@@ -47,35 +84,135 @@ class BulkCreateRequestSerializer(serializers.Serializer):
                 {"size": f"Cannot generate more than {settings.MAX_BULK_LINKS} links per request."}
             )
         attrs["resolved_count"] = resolved_count
-        code_length = attrs.get("code_length") or settings.DEFAULT_CODE_LENGTH
-        if not settings.MIN_CODE_LENGTH <= code_length <= settings.MAX_CODE_LENGTH:
-            raise serializers.ValidationError(
-                {"code_length": f"Code length must be between {settings.MIN_CODE_LENGTH} and {settings.MAX_CODE_LENGTH}."}
-            )
-        attrs["resolved_code_length"] = code_length
-        expires_at = attrs.get("expires_at")
-        if expires_at and expires_at <= timezone.now():
-            raise serializers.ValidationError({"expires_at": "Expiration must be in the future."})
-        return attrs
+        return _validate_link_options(attrs)
+
+
+class BulkStreamRowSerializer(serializers.Serializer):
+    url = serializers.URLField()
+    code_length = serializers.IntegerField(required=False, allow_null=True)
+    expires_at = serializers.DateTimeField(required=False, allow_null=True)
+
+    def to_internal_value(self, data):
+        # CSV rows carry empty strings for omitted columns.
+        if isinstance(data, dict):
+            data = {key: value for key, value in data.items() if value not in ("", None)}
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        return _validate_link_options(attrs)
+
+
+class BulkJobRequestSerializer(serializers.Serializer):
+    url = serializers.URLField()
+    count = serializers.IntegerField(min_value=1, max_value=settings.BULK_JOB_MAX_LINKS)
+    code_length = serializers.IntegerField(required=False)
+    expires_at = serializers.DateTimeField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        return _validate_link_options(attrs)
+
+
+class BulkJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BulkJob
+        fields = [
+            "id",
+            "status",
+            "idempotency_key",
+            "target_url",
+            "code_length",
+            "expires_at",
+            "requested_count",
+            "created_count",
+            "progress",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj: BulkJob) -> float:
+        if not obj.requested_count:
+            return 1.0
+        return round(obj.created_count / obj.requested_count, 4)
 
 
 class ClickSerializer(serializers.ModelSerializer):
+    user_agent = serializers.SerializerMethodField()
+    browser = serializers.CharField(source="ua.browser", default=None, read_only=True)
+    os = serializers.CharField(source="ua.os", default=None, read_only=True)
+    device = serializers.CharField(source="ua.device", default=None, read_only=True)
+    is_bot = serializers.BooleanField(source="ua.is_bot", default=None, read_only=True)
+
     class Meta:
         model = Click
-        fields = ["ts", "ip", "user_agent", "referrer", "country"]
+        fields = ["ts", "ip", "user_agent", "browser", "os", "device", "is_bot", "referrer", "country"]
+
+    def get_user_agent(self, obj: Click) -> str | None:
+        return obj.ua.raw if obj.ua_id else obj.user_agent
+
+
+class UniqueVisitorsSerializer(serializers.Serializer):
+    estimate = serializers.IntegerField()
+    standard_error = serializers.FloatField()
 
 
 class LinkStatsSerializer(serializers.Serializer):
     link = LinkSerializer()
     total_clicks = serializers.IntegerField()
+    unique_visitors = UniqueVisitorsSerializer()
     recent_clicks = ClickSerializer(many=True)
 
     @classmethod
-    def from_link(cls, link: Link, clicks: Iterable[Click]) -> "LinkStatsSerializer":
+    def from_link(cls, link: Link, clicks: Iterable[Click], unique_visitors: dict) -> "LinkStatsSerializer":
         return cls(
             instance={
                 "link": link,
-                "total_clicks": link.click_count,
+                "total_clicks": link.total_clicks,
+                "unique_visitors": unique_visitors,
                 "recent_clicks": list(clicks),
             }
         )
+
+
+class DateOrDateTimeField(serializers.DateTimeField):
+    """Accepts a full ISO timestamp or a bare date (start or end of that UTC day)."""
+
+    def __init__(self, *args, end_of_day: bool = False, **kwargs):
+        self.end_of_day = end_of_day
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, value):
+        if isinstance(value, str) and len(value) == 10:
+            day = parse_date(value)
+            if day is not None:
+                return datetime.combine(day, time.max if self.end_of_day else time.min, dt_timezone.utc)
+        return super().to_internal_value(value)
+
+
+class TimeseriesQuerySerializer(serializers.Serializer):
+    granularity = serializers.ChoiceField(choices=GRANULARITIES, default="day")
+    to = DateOrDateTimeField(required=False, end_of_day=True)
+    top = serializers.IntegerField(required=False, min_value=1, max_value=100, default=10)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # "from" is a keyword, so it cannot be declared as a class attribute.
+        fields["from"] = DateOrDateTimeField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        end = attrs.get("to") or timezone.now()
+        default_span = timedelta(hours=24) if attrs["granularity"] == "hour" else timedelta(days=30)
+        start = attrs.get("from") or end - default_span
+        if start > end:
+            raise serializers.ValidationError({"from": "Must not be later than 'to'."})
+        if bucket_count(start, end, attrs["granularity"]) > settings.STATS_MAX_BUCKETS:
+            raise serializers.ValidationError(
+                {"detail": f"Requested range spans more than {settings.STATS_MAX_BUCKETS} buckets."}
+            )
+        attrs["from"], attrs["to"] = start, end
+        return attrs
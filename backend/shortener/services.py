@@ -1,27 +1,118 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Sequence, Tuple
+import csv
+import json
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from rest_framework import exceptions
 
-from .models import Link
+from .code_pool import take_codes
+from .cache import MISSING, LinkResolution, link_cache
+from .code_filter import code_filter
+from .db_router import use_primary
+from .metrics import LINK_CODE_COLLISIONS, LINK_INSERT_ATTEMPTS
+from .models import BulkJob, Click, Link
+from .serializers import BulkStreamRowSerializer
 from .throttling import rate_limiter
-from .utils import batch_generate_codes
+from .utils import chunked
 
 User = get_user_model()
 
 
 def enforce_bulk_rate_limit(ip_address: str) -> None:
-    result = rate_limiter.check(
-        key=f"bulk:{ip_address}",
-        limit=settings.BULK_RATE_LIMIT,
-        period=settings.BULK_RATE_PERIOD_SECONDS,
-    )
+    result = rate_limiter.hit("bulk", ip_address)
     if not result.allowed:
-        raise exceptions.Throttled(detail="Rate limit exceeded", wait=result.retry_after or settings.BULK_RATE_PERIOD_SECONDS)
+        raise exceptions.Throttled(detail="Rate limit exceeded", wait=result.retry_after)
+
+
+def recent_clicks(link: Link, limit: int = 50) -> List[Click]:
+    # A ts bound lets Postgres prune the query to the newest Click partitions;
+    # only links without enough recent traffic reach back into older ones.
+    since = timezone.now() - timedelta(days=settings.STATS_RECENT_CLICKS_WINDOW_DAYS)
+    rows = link.clicks.select_related("ua")
+    clicks = list(rows.filter(ts__gte=since)[:limit])
+    if len(clicks) < limit:
+        clicks += list(rows.filter(ts__lt=since)[: limit - len(clicks)])
+    return clicks
+
+
+def _resolution_query():
+    return Link.objects.order_by().values_list("id", "target_url", "is_active", "expires_at")
+
+
+def resolve_link(code: str) -> LinkResolution | None:
+    # Probed garbage codes stop here, before either cache tier or the database.
+    if not code_filter.might_exist(code):
+        return None
+    cached = link_cache.get(code)
+    if cached is not MISSING:
+        return cached
+    # The result is cached for LINK_CACHE_TTL_SECONDS, so read it from the
+    # primary: a lagging replica would refill a just-invalidated entry with the
+    # old target (or a miss for a brand-new link) long after the lag is gone.
+    with use_primary():
+        row = _resolution_query().filter(code=code).first()
+    resolution = LinkResolution(*row) if row else None
+    link_cache.set(code, resolution)
+    return resolution
+
+
+async def aresolve_link(code: str) -> LinkResolution | None:
+    if not await code_filter.amight_exist(code):
+        return None
+    cached = await link_cache.aget(code)
+    if cached is not MISSING:
+        return cached
+    with use_primary():
+        row = await _resolution_query().filter(code=code).afirst()
+    resolution = LinkResolution(*row) if row else None
+    await link_cache.aset(code, resolution)
+    return resolution
+
+
+def _swap_taken_codes(links: List[Link], codes: Iterable[str]) -> int:
+    taken = set(Link.objects.filter(code__in=list(codes)).values_list("code", flat=True))
+    if taken:
+        LINK_CODE_COLLISIONS.inc(len(taken))
+        for link in links:
+            if link.code in taken:
+                link.code = take_codes(len(link.code), 1)[0]
+    return len(taken)
+
+
+def _save_links(links: List[Link]) -> List[Link]:
+    for link in links:
+        link.refresh_target_hash()
+    # Only codes the filter cannot rule out need checking up front; usually none.
+    # Until it is loaded it rules nothing out, so leave clashes to the retry below.
+    if code_filter.loaded:
+        suspects = [link.code for link in links if code_filter.might_exist(link.code)]
+        if suspects:
+            _swap_taken_codes(links, suspects)
+    for _ in range(5):
+        LINK_INSERT_ATTEMPTS.inc()
+        try:
+            with transaction.atomic():
+                saved_links = Link.objects.bulk_create(links, batch_size=500)
+        except IntegrityError:
+            # Allocated codes are unique among themselves; a clash means a
+            # pre-existing or hand-picked code sits on one of them. Swap those
+            # for fresh allocations and try again.
+            if not _swap_taken_codes(links, [link.code for link in links]):
+                raise
+            continue
+        code_filter.add(link.code for link in saved_links)
+        for link in saved_links:
+            link.click_total = 0
+        return saved_links
+    raise IntegrityError("Could not place allocated codes after multiple attempts")
 
 
 def bulk_create_links(
@@ -31,29 +122,104 @@ def bulk_create_links(
     count: int,
     code_length: int,
     expires_at,
+    bulk_job: BulkJob | None = None,
 ) -> Tuple[List[Link], bool]:
-    created: List[Link] = []
-    attempts = 0
-    max_attempts = 5
-    desired_total = count
-    while len(created) < desired_total and attempts < max_attempts:
-        attempts += 1
-        remaining = desired_total - len(created)
-        candidate_count = max(remaining * 2, remaining)
-        candidates = batch_generate_codes(code_length, candidate_count)
-        existing_codes = set(Link.objects.filter(code__in=candidates).values_list("code", flat=True))
-        available_codes = list(candidates - existing_codes)
-        if not available_codes:
+    new_links = [
+        Link(owner=owner, code=code, target_url=target_url, expires_at=expires_at, bulk_job=bulk_job)
+        for code in take_codes(code_length, count)
+    ]
+    for link in new_links:
+        link.clean()
+    created = _save_links(new_links)
+    return created, len(created) < count
+
+
+BulkRow = Tuple[int, Optional[dict], Optional[str]]
+
+
+def iter_bulk_rows(stream: Iterable[bytes], *, csv_format: bool, max_rows: int) -> Iterator[BulkRow]:
+    """Parse an NDJSON or CSV body lazily into ``(line, row, parse_error)``."""
+    lines = (raw.decode("utf-8", errors="replace") for raw in stream)
+    if csv_format:
+        reader = csv.DictReader(lines)
+        rows: Iterator[Tuple[int, dict | None, str | None]] = (
+            (reader.line_num, {key.strip(): (value or "").strip() for key, value in row.items() if key}, None)
+            for row in reader
+        )
+    else:
+        rows = _iter_ndjson(lines)
+    for index, row in enumerate(rows):
+        if index >= max_rows:
+            yield row[0], None, f"Row limit of {max_rows} exceeded; remaining input ignored."
+            return
+        yield row
+
+
+def _iter_ndjson(lines: Iterable[str]) -> Iterator[BulkRow]:
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, None, "Invalid JSON."
             continue
-        selected_codes = available_codes[:remaining]
-        new_links = [
-            Link(owner=owner, code=code, target_url=target_url, expires_at=expires_at)
-            for code in selected_codes
-        ]
-        for link in new_links:
-            link.clean()
-        with transaction.atomic():
-            saved_links = Link.objects.bulk_create(new_links, batch_size=500)
-        created.extend(saved_links)
-    partial = len(created) < desired_total
-    return created, partial
+        if not isinstance(row, dict):
+            yield number, None, "Each line must be a JSON object."
+            continue
+        yield number, row, None
+
+
+def stream_bulk_create_links(
+    *,
+    owner: User | None,
+    rows: Iterable[BulkRow],
+    chunk_size: int,
+) -> Iterator[dict]:
+    """Create links chunk by chunk, yielding one result per input row.
+
+    Results come back in input order followed by a summary, so callers can
+    stream them without holding the whole batch in memory.
+    """
+    created = failed = 0
+    for chunk in chunked(rows, chunk_size):
+        results: List[dict] = []
+        pending: List[Tuple[int, Link]] = []
+        by_length: Dict[int, List[Tuple[int, dict]]] = defaultdict(list)
+        for line, row, error in chunk:
+            if error is not None:
+                results.append({"line": line, "error": error})
+                continue
+            serializer = BulkStreamRowSerializer(data=row)
+            if not serializer.is_valid():
+                results.append({"line": line, "error": serializer.errors})
+                continue
+            data = serializer.validated_data
+            by_length[data["resolved_code_length"]].append((line, data))
+        for length, entries in by_length.items():
+            for (line, data), code in zip(entries, take_codes(length, len(entries))):
+                link = Link(owner=owner, code=code, target_url=data["url"], expires_at=data.get("expires_at"))
+                try:
+                    link.clean()
+                except ValidationError as exc:
+                    results.append({"line": line, "error": exc.messages})
+                    continue
+                pending.append((line, link))
+        if pending:
+            _save_links([link for _, link in pending])
+        for line, link in pending:
+            results.append(
+                {
+                    "line": line,
+                    "code": link.code,
+                    "short_url": link.short_url,
+                    "target_url": link.target_url,
+                    "expires_at": link.expires_at.isoformat() if link.expires_at else None,
+                }
+            )
+        created += len(pending)
+        failed += len(results) - len(pending)
+        results.sort(key=lambda result: result["line"])
+        yield from results
+    yield {"summary": {"created": created, "failed": failed}}
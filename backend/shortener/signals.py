@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import link_cache
+from .code_filter import code_filter
+from .models import Link
+
+
+def _invalidate(code: str) -> None:
+    link_cache.invalidate(code)
+    transaction.on_commit(lambda: link_cache.invalidate(code))
+
+
+@receiver(post_save, sender=Link, dispatch_uid="shortener.link_saved")
+def link_saved(sender, instance: Link, **kwargs) -> None:
+    if kwargs.get("created"):
+        # Before commit is fine: a code that never commits is only a false positive.
+        code_filter.add([instance.code])
+    _invalidate(instance.code)
+
+
+@receiver(post_delete, sender=Link, dispatch_uid="shortener.link_deleted")
+def link_deleted(sender, instance: Link, **kwargs) -> None:
+    _invalidate(instance.code)
@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from shortener.allocator import CodeAllocator, CodePermutation, code_allocator, get_permutation, permutation_key
+from shortener.models import Link
+from shortener.services import bulk_create_links
+
+User = get_user_model()
+
+
+def test_permutation_is_a_bijection_over_the_code_space():
+    permutation = CodePermutation(b"k" * 32, length=2)
+    images = {permutation.permute(value) for value in range(permutation.size)}
+    assert images == set(range(permutation.size))
+
+
+def test_codes_have_requested_length_and_charset():
+    permutation = CodePermutation(b"k" * 32, length=7)
+    codes = [permutation.encode(value) for value in range(100)]
+    assert len(set(codes)) == 100
+    assert all(len(code) == 7 and code.isalnum() for code in codes)
+
+
+def test_permutation_depends_on_key():
+    first = CodePermutation(b"a" * 32, length=7)
+    second = CodePermutation(b"b" * 32, length=7)
+    assert [first.encode(value) for value in range(10)] != [second.encode(value) for value in range(10)]
+
+
+class CodeAllocatorTests(TestCase):
+    def test_workers_receive_disjoint_blocks(self):
+        first = CodeAllocator(block_size=5)
+        second = CodeAllocator(block_size=5)
+        codes = first.allocate(7, 3) + second.allocate(7, 3) + first.allocate(7, 4)
+        self.assertEqual(len(set(codes)), 10)
+
+    def test_save_uses_allocator_without_existence_checks(self):
+        code_allocator.allocate(7, 1)  # make sure a block is already reserved
+        with self.assertNumQueries(3):  # savepoint, insert, release
+            link = Link.objects.create(target_url="https://example.com")
+        self.assertEqual(len(link.code), 7)
+
+    def test_save_skips_codes_already_taken_by_legacy_links(self):
+        start, end = code_allocator._blocks.get(7, (0, 0))
+        if start >= end:
+            code_allocator.allocate(7, 1)
+            start, _ = code_allocator._blocks[7]
+        legacy_code = get_permutation(permutation_key(), 7).encode(start)
+        Link.objects.create(code=legacy_code, target_url="https://example.com/legacy")
+        link = Link.objects.create(target_url="https://example.com/new")
+        self.assertNotEqual(link.code, legacy_code)
+
+    @override_settings(CODE_BLOCK_SIZE=3)
+    def test_bulk_create_never_returns_partial_result(self):
+        user = User.objects.create_user(username="erin", password="password123")
+        code_allocator.reset()
+        links, partial = bulk_create_links(
+            owner=user, target_url="https://example.com", count=20, code_length=4, expires_at=None
+        )
+        self.assertFalse(partial)
+        self.assertEqual(len({link.code for link in links}), 20)
+        code_allocator.reset()
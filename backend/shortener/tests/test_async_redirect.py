@@ -0,0 +1,35 @@
+from django.http import Http404
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from shortener.cache import link_cache
+from shortener.clicks import local_click_buffer, wait_for_scheduled_clicks
+from shortener.models import Link
+from shortener.views import async_redirect_view
+
+
+@override_settings(CLICK_BUFFER_BACKEND="local")
+class AsyncRedirectViewTests(TestCase):
+    def setUp(self):
+        link_cache.clear_local()
+        local_click_buffer.pop_batch(len(local_click_buffer))
+        self.factory = AsyncRequestFactory()
+        self.link = Link.objects.create(code="async12", target_url="https://example.com/async")
+
+    async def test_redirects_and_schedules_click(self):
+        response = await async_redirect_view(self.factory.get(f"/{self.link.code}"), code=self.link.code)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], "https://example.com/async")
+        await wait_for_scheduled_clicks()
+        events = local_click_buffer.pop_batch(10)
+        self.assertEqual([event.link_id for event in events], [self.link.pk])
+
+    async def test_unknown_code_raises_not_found(self):
+        with self.assertRaises(Http404):
+            await async_redirect_view(self.factory.get("/nothing1"), code="nothing1")
+
+    async def test_expired_link_returns_gone(self):
+        self.link.expires_at = timezone.now() - timezone.timedelta(minutes=1)
+        await self.link.asave()
+        response = await async_redirect_view(self.factory.get(f"/{self.link.code}"), code=self.link.code)
+        self.assertEqual(response.status_code, 410)
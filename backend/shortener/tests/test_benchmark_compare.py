@@ -0,0 +1,24 @@
+from benchmarks.compare import compare
+
+
+def report(**cases):
+    return {
+        "meta": {},
+        "results": [{"scenario": "redirect", "case": case, "metrics": metrics} for case, metrics in cases.items()],
+    }
+
+
+def test_flags_slower_latency_and_lower_throughput():
+    baseline = report(warm={"p50_ms": 1.0, "ops_per_sec": 1000}, cold={"p50_ms": 2.0, "ops_per_sec": 500})
+    candidate = report(warm={"p50_ms": 1.05, "ops_per_sec": 850}, cold={"p50_ms": 1.5, "ops_per_sec": 500})
+    rows = compare(baseline, candidate, threshold=0.1, metrics=("p50_ms", "ops_per_sec"))
+    rows = {(row["case"], row["metric"]): row for row in rows}
+    assert not rows["warm", "p50_ms"]["regression"]
+    assert rows["warm", "ops_per_sec"]["regression"]
+    assert rows["cold", "p50_ms"]["improvement"]
+    assert not rows["cold", "ops_per_sec"]["regression"]
+
+
+def test_ignores_cases_missing_from_either_report():
+    rows = compare(report(old={"p50_ms": 1.0}), report(new={"p50_ms": 9.0}), threshold=0.1)
+    assert rows == []
@@ -4,12 +4,14 @@ from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
 from shortener.models import Link
+from shortener.throttling import rate_limiter
 
 User = get_user_model()
 
 
 class BulkCreateLinksTests(APITestCase):
     def setUp(self):
+        rate_limiter.reset()
         self.user = User.objects.create_user(username="alice", password="password123")
         self.client = APIClient()
         self.client.force_authenticate(self.user)
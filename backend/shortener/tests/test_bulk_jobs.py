@@ -0,0 +1,167 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from shortener import services
+from shortener.bulk_jobs import claim_job, run_job
+from shortener.models import BulkJob, Link
+from shortener.throttling import rate_limiter
+
+User = get_user_model()
+
+
+class BulkJobApiTests(APITestCase):
+    def setUp(self):
+        rate_limiter.reset()
+        self.user = User.objects.create_user(username="alice", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def submit(self, payload, key=None):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.client.post(reverse("link-bulk-job-create"), payload, format="json", **headers)
+
+    def test_submit_returns_job_immediately(self):
+        response = self.submit({"url": "https://example.com", "count": 500, "code_length": 8})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        data = response.json()
+        self.assertEqual(data["status"], "pending")
+        self.assertEqual(data["requested_count"], 500)
+        self.assertEqual(data["progress"], 0)
+        self.assertEqual(response["Location"], reverse("link-bulk-job", kwargs={"job_id": data["id"]}))
+        self.assertEqual(Link.objects.count(), 0)
+
+    def test_idempotency_key_replays_the_same_job(self):
+        payload = {"url": "https://example.com", "count": 10}
+        first = self.submit(payload, key="campaign-1")
+        second = self.submit(payload, key="campaign-1")
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.json()["id"], second.json()["id"])
+        self.assertEqual(BulkJob.objects.count(), 1)
+
+        conflict = self.submit({"url": "https://example.com", "count": 11}, key="campaign-1")
+        self.assertEqual(conflict.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("idempotency_key", conflict.json())
+
+    def test_resubmitting_a_failed_job_queues_it_again(self):
+        payload = {"url": "https://example.com", "count": 10}
+        job_id = self.submit(payload, key="campaign-2").json()["id"]
+        BulkJob.objects.filter(pk=job_id).update(status=BulkJob.Status.FAILED, error="boom", created_count=4)
+        retried = self.submit(payload, key="campaign-2")
+        self.assertEqual(retried.status_code, status.HTTP_200_OK)
+        self.assertEqual((retried.json()["status"], retried.json()["error"]), ("pending", ""))
+        self.assertEqual(retried.json()["created_count"], 4)
+
+    def test_idempotency_keys_are_scoped_per_user(self):
+        self.submit({"url": "https://example.com", "count": 10}, key="shared")
+        other = User.objects.create_user(username="bob", password="password")
+        self.client.force_authenticate(other)
+        response = self.submit({"url": "https://example.com", "count": 10}, key="shared")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(BulkJob.objects.count(), 2)
+
+    def test_detail_reports_progress_and_pages_through_links(self):
+        job_id = self.submit({"url": "https://example.com", "count": 5}).json()["id"]
+        run_job(claim_job(), chunk_size=2)
+        url = reverse("link-bulk-job", kwargs={"job_id": job_id})
+
+        first = self.client.get(url, {"limit": 3}).json()
+        self.assertEqual(first["status"], "succeeded")
+        self.assertEqual(first["created_count"], 5)
+        self.assertEqual(first["progress"], 1.0)
+        self.assertEqual(len(first["links"]), 3)
+        self.assertIsNotNone(first["next"])
+
+        second = self.client.get(url, {"limit": 3, "after": first["next"]}).json()
+        self.assertEqual(len(second["links"]), 2)
+        self.assertIsNone(second["next"])
+        codes = {link["code"] for link in first["links"] + second["links"]}
+        self.assertEqual(len(codes), 5)
+
+    def test_detail_is_owner_scoped(self):
+        job_id = self.submit({"url": "https://example.com", "count": 1}).json()["id"]
+        other = User.objects.create_user(username="bob", password="password")
+        self.client.force_authenticate(other)
+        response = self.client.get(reverse("link-bulk-job", kwargs={"job_id": job_id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkJobWorkerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="password123")
+
+    def make_job(self, **kwargs):
+        params = {"owner": self.user, "target_url": "https://example.com", "code_length": 7, "requested_count": 5}
+        params.update(kwargs)
+        return BulkJob.objects.create(**params)
+
+    def test_claim_takes_oldest_pending_job_once(self):
+        job = self.make_job()
+        claimed = claim_job()
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.status, BulkJob.Status.RUNNING)
+        self.assertIsNone(claim_job())
+
+    def test_worker_resumes_from_committed_progress(self):
+        job = self.make_job()
+        claimed = claim_job()
+        calls = {"n": 0}
+        real = services._save_links
+
+        def flaky(links):
+            calls["n"] += 1
+            if calls["n"] == 2:
+                raise RuntimeError("worker died")
+            return real(links)
+
+        with mock.patch.object(services, "_save_links", side_effect=flaky):
+            run_job(claimed, chunk_size=2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BulkJob.Status.FAILED)
+        self.assertEqual(job.created_count, 2)
+        self.assertEqual(job.links.count(), 2)
+
+        BulkJob.objects.filter(pk=job.pk).update(
+            status=BulkJob.Status.RUNNING, heartbeat_at=timezone.now() - timedelta(hours=1)
+        )
+        run_job(claim_job(), chunk_size=2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BulkJob.Status.SUCCEEDED)
+        self.assertEqual(job.created_count, 5)
+        self.assertEqual(job.links.count(), 5)
+
+    def test_stalled_worker_stops_once_its_job_is_reclaimed(self):
+        job = self.make_job()
+        stalled = claim_job()
+        BulkJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        current = claim_job()
+        self.assertNotEqual(current.claim_token, stalled.claim_token)
+
+        run_job(stalled, chunk_size=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.created_count, job.links.count()), (BulkJob.Status.RUNNING, 0, 0))
+
+        run_job(current, chunk_size=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.created_count, job.links.count()), (BulkJob.Status.SUCCEEDED, 5, 5))
+
+    def test_fresh_running_job_is_not_reclaimed(self):
+        self.make_job(status=BulkJob.Status.RUNNING, heartbeat_at=timezone.now())
+        self.assertIsNone(claim_job())
+
+    def test_command_drains_queue(self):
+        self.make_job(requested_count=3)
+        self.make_job(requested_count=2)
+        out = StringIO()
+        call_command("run_bulk_jobs", "--once", stdout=out)
+        self.assertIn("Processed 2 jobs.", out.getvalue())
+        self.assertEqual(Link.objects.count(), 5)
+        self.assertFalse(BulkJob.objects.exclude(status=BulkJob.Status.SUCCEEDED).exists())
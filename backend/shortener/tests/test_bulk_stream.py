@@ -0,0 +1,105 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+
+from shortener.models import Link
+from shortener.throttling import rate_limiter
+
+User = get_user_model()
+
+
+def read_ndjson(response):
+    body = b"".join(response.streaming_content).decode()
+    return [json.loads(line) for line in body.splitlines()]
+
+
+class StreamingBulkCreateTests(APITestCase):
+    def setUp(self):
+        rate_limiter.reset()
+        self.user = User.objects.create_user(username="alice", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, body, content_type="application/x-ndjson"):
+        return self.client.generic("POST", reverse("link-bulk-stream"), body, content_type=content_type)
+
+    def test_ndjson_rows_create_links_and_stream_results(self):
+        body = "\n".join(
+            [
+                json.dumps({"url": "https://example.com/a"}),
+                json.dumps({"url": "https://example.com/b", "code_length": 9}),
+                "",
+                json.dumps({"url": "https://example.com/c", "expires_at": "2999-01-01T00:00:00Z"}),
+            ]
+        )
+        response = self.post(body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        results = read_ndjson(response)
+        self.assertEqual(results[-1], {"summary": {"created": 3, "failed": 0}})
+        self.assertEqual([row["line"] for row in results[:-1]], [1, 2, 4])
+        self.assertEqual(len(results[1]["code"]), 9)
+        self.assertIsNotNone(results[2]["expires_at"])
+        self.assertEqual(Link.objects.filter(owner=self.user).count(), 3)
+        self.assertTrue(Link.objects.filter(code=results[0]["code"], target_url="https://example.com/a").exists())
+
+    def test_csv_rows_with_blank_optional_columns(self):
+        body = "url,code_length,expires_at\nhttps://example.com/a,,\nhttps://example.com/b,8,\n"
+        response = self.post(body, content_type="text/csv")
+        results = read_ndjson(response)
+        self.assertEqual(results[-1]["summary"], {"created": 2, "failed": 0})
+        self.assertEqual([row["line"] for row in results[:-1]], [2, 3])
+        self.assertEqual(len(results[1]["code"]), 8)
+
+    def test_invalid_rows_are_reported_without_failing_the_batch(self):
+        body = "\n".join(
+            [
+                "not json",
+                json.dumps(["https://example.com"]),
+                json.dumps({"url": "nope"}),
+                json.dumps({"url": "https://example.com/ok", "code_length": 1}),
+                json.dumps({"url": "https://example.com/past", "expires_at": "2000-01-01T00:00:00Z"}),
+                json.dumps({"url": "https://example.com/ok"}),
+            ]
+        )
+        results = read_ndjson(self.post(body))
+        errors = [row["line"] for row in results if "error" in row]
+        self.assertEqual(errors, [1, 2, 3, 4, 5])
+        self.assertIn("code", results[-2])
+        self.assertEqual(results[-1]["summary"], {"created": 1, "failed": 5})
+        self.assertEqual(Link.objects.count(), 1)
+
+    @override_settings(BULK_STREAM_CHUNK_SIZE=2, BULK_STREAM_MAX_ROWS=5)
+    def test_rows_are_written_in_chunks_up_to_the_row_limit(self):
+        body = "\n".join(json.dumps({"url": f"https://example.com/{index}"}) for index in range(7))
+        response = self.post(body)
+        stream = iter(response.streaming_content)
+        first = json.loads(next(stream))
+        self.assertEqual(first["line"], 1)
+        # Only the first chunk has been written when its results start flowing.
+        self.assertEqual(Link.objects.count(), 2)
+        results = [first] + [json.loads(line) for line in stream]
+        self.assertEqual(Link.objects.count(), 5)
+        self.assertIn("Row limit", results[-2]["error"])
+        self.assertEqual(results[-1]["summary"], {"created": 5, "failed": 1})
+
+    def test_body_without_content_length_is_rejected(self):
+        body = json.dumps({"url": "https://example.com/a"})
+        response = self.client.generic(
+            "POST",
+            reverse("link-bulk-stream"),
+            body,
+            content_type="application/x-ndjson",
+            CONTENT_LENGTH="",
+            HTTP_TRANSFER_ENCODING="chunked",
+        )
+        self.assertEqual(response.status_code, 411)
+        self.assertFalse(Link.objects.exists())
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        response = self.post(json.dumps({"url": "https://example.com"}))
+        self.assertEqual(response.status_code, 401)
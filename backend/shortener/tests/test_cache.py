@@ -0,0 +1,66 @@
+import time
+
+from django.test import TestCase
+
+from shortener.cache import MISSING, LocalTTLCache, link_cache
+from shortener.models import Link
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalTTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_local_cache_expires_entries():
+    cache = LocalTTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is MISSING
+
+
+class RedirectCacheTests(TestCase):
+    def setUp(self):
+        link_cache.clear_local()
+        self.link = Link.objects.create(code="cache123", target_url="https://example.com/original")
+
+    def test_redirect_serves_cached_target(self):
+        self.client.get(f"/{self.link.code}")
+        Link.objects.filter(pk=self.link.pk).update(target_url="https://example.com/changed")
+        response = self.client.get(f"/{self.link.code}")
+        self.assertEqual(response["Location"], "https://example.com/original")
+
+    def test_save_invalidates_cached_entry(self):
+        self.client.get(f"/{self.link.code}")
+        self.link.target_url = "https://example.com/changed"
+        self.link.save()
+        response = self.client.get(f"/{self.link.code}")
+        self.assertEqual(response["Location"], "https://example.com/changed")
+
+    def test_deactivate_invalidates_cached_entry(self):
+        self.client.get(f"/{self.link.code}")
+        Link.objects.filter(pk=self.link.pk).deactivate()
+        response = self.client.get(f"/{self.link.code}")
+        self.assertEqual(response.status_code, 410)
+
+    def test_delete_invalidates_cached_entry(self):
+        self.client.get(f"/{self.link.code}")
+        self.link.delete()
+        response = self.client.get(f"/{self.link.code}")
+        self.assertEqual(response.status_code, 404)
+
+    def test_unknown_code_is_cached_negatively(self):
+        self.assertEqual(self.client.get("/missing1").status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/missing1").status_code, 404)
+
+    def test_creating_link_clears_negative_entry(self):
+        self.client.get("/later123")
+        Link.objects.create(code="later123", target_url="https://example.com/later")
+        response = self.client.get("/later123")
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,106 @@
+import os
+import signal
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from shortener.clicks import ClickEvent, flush_buffered, flush_clicks, local_click_buffer
+from shortener.models import Link
+
+
+@override_settings(CLICK_BUFFER_BACKEND="local")
+class BufferedClickTests(TestCase):
+    def setUp(self):
+        local_click_buffer.pop_batch(len(local_click_buffer))
+        self.link = Link.objects.create(code="buf1234", target_url="https://example.com")
+
+    def test_redirect_does_not_write_clicks_synchronously(self):
+        self.client.get(f"/{self.link.code}")
+        with self.assertNumQueries(0):
+            response = self.client.get(f"/{self.link.code}")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(local_click_buffer), 2)
+        self.assertEqual(self.link.clicks.count(), 0)
+
+    @override_settings(CLICK_FLUSH_BATCH_SIZE=2)
+    def test_web_process_drains_the_local_buffer_when_due(self):
+        for _ in range(3):
+            self.client.get(f"/{self.link.code}")
+        self.assertEqual(self.link.clicks.count(), 2)
+        self.assertEqual(len(local_click_buffer), 1)
+
+    def test_sigterm_stops_the_drain_and_flushes_what_was_popped(self):
+        self.client.get(f"/{self.link.code}")
+        pop_batch = local_click_buffer.pop_batch
+        handler = signal.getsignal(signal.SIGTERM)
+
+        def pop_then_stop(max_items):
+            events = pop_batch(max_items)
+            os.kill(os.getpid(), signal.SIGTERM)
+            return events
+
+        with mock.patch.object(local_click_buffer, "pop_batch", side_effect=pop_then_stop):
+            call_command("drain_clicks", batch_size=10, flush_interval=60, stdout=open("/dev/null", "w"))
+        self.assertEqual(self.link.clicks.count(), 1)
+        self.assertEqual(signal.getsignal(signal.SIGTERM), handler)
+
+    def test_drain_command_writes_buffered_clicks(self):
+        for _ in range(3):
+            self.client.get(f"/{self.link.code}", HTTP_REFERER="https://referrer.example")
+        call_command("drain_clicks", once=True, batch_size=2, stdout=open("/dev/null", "w"))
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.total_clicks, 3)
+        self.assertEqual(self.link.clicks.filter(referrer="https://referrer.example").count(), 3)
+        self.assertEqual(len(local_click_buffer), 0)
+
+
+class FlushClicksTests(TestCase):
+    def test_flush_aggregates_counter_updates_per_link(self):
+        first = Link.objects.create(code="first12", target_url="https://example.com/1")
+        second = Link.objects.create(code="second1", target_url="https://example.com/2")
+        events = [ClickEvent(link_id=first.pk) for _ in range(4)] + [ClickEvent(link_id=second.pk)]
+        with CaptureQueriesContext(connection) as queries:
+            flushed = flush_clicks(events)
+        self.assertEqual(flushed, 5)
+        updates = [query for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.total_clicks, 4)
+        self.assertEqual(second.total_clicks, 1)
+
+    def test_flush_skips_clicks_for_deleted_links(self):
+        link = Link.objects.create(code="gone123", target_url="https://example.com")
+        link_id = link.pk
+        link.delete()
+        self.assertEqual(flush_clicks([ClickEvent(link_id=link_id)]), 0)
+
+    def test_unparseable_ips_are_dropped_when_the_event_is_created(self):
+        self.assertIsNone(ClickEvent(link_id=1, ip="junk").ip)
+        self.assertIsNone(ClickEvent(link_id=1, ip="unknown").ip)
+        self.assertEqual(ClickEvent(link_id=1, ip=" 2001:DB8::1 ").ip, "2001:db8::1")
+        self.assertEqual(ClickEvent(link_id=1, ip="fe80::1%eth0").ip, "fe80::1")
+
+    def test_bad_events_are_dead_lettered_instead_of_blocking_the_batch(self):
+        link = Link.objects.create(code="dead123", target_url="https://example.com")
+        bad = ClickEvent(link_id=link.pk, ts=None)
+        local_click_buffer.dead.clear()
+        flushed = flush_buffered(local_click_buffer, [ClickEvent(link_id=link.pk), bad, ClickEvent(link_id=link.pk)])
+        self.assertEqual(flushed, 2)
+        self.assertEqual(local_click_buffer.dead, [bad])
+        self.assertEqual(link.clicks.count(), 2)
+
+    def test_database_outages_requeue_the_batch(self):
+        local_click_buffer.pop_batch(len(local_click_buffer))
+        events = [ClickEvent(link_id=1), ClickEvent(link_id=2)]
+        with mock.patch("shortener.clicks.flush_clicks", side_effect=OperationalError("gone")):
+            with self.assertRaises(OperationalError):
+                flush_buffered(local_click_buffer, events)
+        self.assertEqual(local_click_buffer.pop_batch(10), events)
+
+    def test_event_round_trips_through_serialization(self):
+        event = ClickEvent(link_id=7, ip="127.0.0.1", user_agent="agent", referrer=None)
+        self.assertEqual(ClickEvent.loads(event.dumps()), event)
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from shortener.cache import link_cache
+from shortener.code_filter import BloomFilter, CodeFilter, code_filter
+from shortener.models import Link
+from shortener.services import _save_links, resolve_link
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(10_000, 0.01)
+    bloom.update(f"code{i}" for i in range(10_000))
+    assert all(f"code{i}" in bloom for i in range(10_000))
+    false_positives = sum(f"other{i}" in bloom for i in range(20_000))
+    assert false_positives / 20_000 < 0.02
+
+
+def test_bloom_filter_round_trips_through_bytes():
+    bloom = BloomFilter(100, 0.001)
+    bloom.update(["abc", "def"])
+    restored, watermark = BloomFilter.from_bytes(bloom.to_bytes(watermark=42))
+    assert watermark == 42
+    assert (restored.size, restored.hashes, restored.count) == (bloom.size, bloom.hashes, 2)
+    assert "abc" in restored and "zzz" not in restored
+
+
+class CodeFilterTests(TestCase):
+    def setUp(self):
+        link_cache.clear_local()
+        code_filter.reset()
+        self.addCleanup(code_filter.reset)
+        Link.objects.create(code="known12", target_url="https://example.com")
+
+    def test_requests_do_not_build_the_filter(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(code_filter.might_exist("nope9999"))
+        self.assertEqual(len(queries), 0)
+        self.assertIsNone(code_filter.bloom)
+
+    def test_start_loads_in_the_background(self):
+        # The real build needs its own connection, which can't see this test's transaction.
+        built = BloomFilter(10, 0.001)
+        with mock.patch.object(code_filter, "load", side_effect=lambda: setattr(code_filter, "bloom", built)):
+            code_filter.start()
+            code_filter._thread.join(5)
+        self.assertIs(code_filter.bloom, built)
+        self.assertFalse(code_filter._thread.is_alive())
+
+    def test_unknown_codes_skip_the_database(self):
+        code_filter.load()
+        self.assertTrue(code_filter.might_exist("known12"))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNone(resolve_link("nope9999"))
+            self.assertIsNone(resolve_link("nope8888"))
+        self.assertEqual(len(queries), 0)
+
+    def test_links_created_here_are_added_immediately(self):
+        code_filter.load()
+        Link.objects.create(code="brandnew", target_url="https://example.com")
+        self.assertIsNotNone(resolve_link("brandnew"))
+
+    def test_links_created_elsewhere_are_synced_before_answering_absent(self):
+        code_filter.load()
+        Link.objects.bulk_create([Link(code="elsewhere", target_url="https://example.com")])
+        with override_settings(CODE_FILTER_SYNC_SECONDS=3600):
+            self.assertFalse(code_filter.might_exist("elsewhere"))
+        code_filter.synced_at = time.monotonic() - 10
+        with override_settings(CODE_FILTER_SYNC_SECONDS=1):
+            self.assertTrue(code_filter.might_exist("elsewhere"))
+
+    def test_bulk_insert_checks_only_codes_the_filter_cannot_rule_out(self):
+        code_filter.load()
+        links = [
+            Link(code="known12", target_url="https://example.com/a"),
+            Link(code="free1234", target_url="https://example.com/b"),
+        ]
+        with mock.patch("shortener.services.take_codes", return_value=["swapped1"]):
+            saved = _save_links(links)
+        self.assertEqual(sorted(link.code for link in saved), ["free1234", "swapped1"])
+        self.assertTrue(code_filter.might_exist("swapped1"))
+
+    def test_inserts_skip_the_collision_check_until_the_filter_is_loaded(self):
+        links = [Link(code=f"fresh{index:03d}", target_url="https://example.com") for index in range(50)]
+        with CaptureQueriesContext(connection) as queries:
+            _save_links(links)
+        self.assertFalse([query for query in queries if '"code" IN (' in query["sql"]])
+
+    def test_unloaded_filter_leaves_clashes_to_the_insert_retry(self):
+        links = [
+            Link(code="known12", target_url="https://example.com/a"),
+            Link(code="free1234", target_url="https://example.com/b"),
+        ]
+        with mock.patch("shortener.services.take_codes", return_value=["swapped1"]):
+            saved = _save_links(links)
+        self.assertEqual(sorted(link.code for link in saved), ["free1234", "swapped1"])
+
+    def test_warm_start_from_saved_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "codes.bloom")
+            with override_settings(CODE_FILTER_PATH=path):
+                code_filter.save()
+                warm = CodeFilter()
+                with CaptureQueriesContext(connection) as queries:
+                    warm.load()
+                self.assertTrue(warm.might_exist("known12"))
+        # Only the catch-up sync, not a full build.
+        self.assertEqual(len(queries), 1)
+
+    def test_overflow_rebuilds_off_the_request_path(self):
+        code_filter.load()
+        full = BloomFilter(1, 0.001, bits=10_000)
+        full.update(["known12", "other123"])
+        code_filter.bloom = full
+        code_filter.synced_at = 0.0
+        with mock.patch.object(code_filter, "_in_background") as background:
+            self.assertFalse(code_filter.might_exist("nope9999"))
+        self.assertIs(code_filter.bloom, full)
+        background.assert_called_once_with(code_filter.build)
+        code_filter.build()
+        self.assertGreater(code_filter.bloom.capacity, 1)
+        self.assertTrue(code_filter.might_exist("known12"))
+
+    @override_settings(CODE_FILTER_ENABLED=False)
+    def test_disabled_filter_always_defers_to_the_database(self):
+        self.assertTrue(code_filter.might_exist("nope9999"))
+        self.assertIsNone(code_filter.bloom)
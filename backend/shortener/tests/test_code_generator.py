@@ -1,4 +1,6 @@
-from shortener.utils import batch_generate_codes, generate_code
+from collections import Counter
+
+from shortener.utils import BASE62_ALPHABET, batch_generate_codes, generate_code, generate_codes, random_base62
 
 
 def test_generate_code_length_and_charset():
@@ -11,3 +13,16 @@ def test_batch_generate_codes_uniqueness():
     codes = batch_generate_codes(6, 200)
     assert len(codes) == 200
     assert all(code.isalnum() for code in codes)
+
+
+def test_generate_codes_returns_requested_count_and_length():
+    codes = generate_codes(32, 500)
+    assert len(codes) == 500
+    assert all(len(code) == 32 and set(code) <= set(BASE62_ALPHABET) for code in codes)
+
+
+def test_random_base62_covers_alphabet_evenly():
+    sample = random_base62(62 * 2000)
+    counts = Counter(sample)
+    assert set(counts) == set(BASE62_ALPHABET)
+    assert max(counts.values()) < 2 * min(counts.values())
@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shortener.code_pool import pool_status, refill, take_codes
+from shortener.models import CodePool, Link
+
+User = get_user_model()
+
+
+@override_settings(CODE_POOL_SIZES={6: 10}, CODE_POOL_LOW_WATERMARK=0.5)
+class CodePoolTests(TestCase):
+    def test_refill_tops_pool_up_to_target(self):
+        added = refill(6, 10)
+        self.assertEqual(added, 10)
+        self.assertEqual(CodePool.objects.filter(length=6).count(), 10)
+        self.assertEqual(refill(6, 10), 0)
+
+    def test_refill_does_not_count_skipped_codes_towards_the_target(self):
+        Link.objects.create(code="taken1", target_url="https://example.com")
+        CodePool.objects.create(length=6, code="pool01")
+        batches = [["taken1", "fresh1"], ["pool01"], ["fresh2"]]
+        with mock.patch("shortener.code_pool.code_allocator.allocate", side_effect=batches):
+            added = refill(6, 3)
+        self.assertEqual(added, 2)
+        self.assertEqual(set(CodePool.objects.values_list("code", flat=True)), {"pool01", "fresh1", "fresh2"})
+
+    def test_links_pop_codes_from_pool(self):
+        refill(6, 10)
+        pooled = set(CodePool.objects.values_list("code", flat=True))
+        link = Link(target_url="https://example.com")
+        link._desired_length = 6
+        link.save()
+        self.assertIn(link.code, pooled)
+        self.assertFalse(CodePool.objects.filter(code=link.code).exists())
+
+    def test_take_falls_back_to_allocator_when_pool_runs_dry(self):
+        refill(6, 3)
+        codes = take_codes(6, 5)
+        self.assertEqual(len(set(codes)), 5)
+        self.assertFalse(CodePool.objects.exists())
+
+    def test_status_reports_watermarks(self):
+        refill(6, 4)
+        [row] = pool_status()
+        self.assertEqual(row["available"], 4)
+        self.assertEqual(row["low_watermark"], 5)
+        self.assertTrue(row["below_low_watermark"])
+
+    def test_refill_command_only_tops_up_pools_below_watermark(self):
+        refill(6, 8)
+        call_command("refill_code_pool", stdout=open("/dev/null", "w"))
+        self.assertEqual(CodePool.objects.count(), 8)
+        CodePool.objects.filter(pk__in=CodePool.objects.values("pk")[:5]).delete()
+        call_command("refill_code_pool", stdout=open("/dev/null", "w"))
+        self.assertEqual(CodePool.objects.count(), 10)
+
+    def test_status_endpoint_requires_staff(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="frank", password="password123"))
+        self.assertEqual(client.get(reverse("code-pool-status")).status_code, 403)
+        client.force_authenticate(User.objects.create_user(username="gina", password="password123", is_staff=True))
+        response = client.get(reverse("code-pool-status"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["pools"][0]["length"], 6)
@@ -0,0 +1,96 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.test import APIClient
+
+from shortener import connections
+from shortener.connections import get_async_redis, get_redis, redact_url, redis_pool_stats, reset_pools
+
+User = get_user_model()
+
+REDIS_URL = "redis://127.0.0.1:1/0"
+
+
+@pytest.fixture(autouse=True)
+def fresh_pools():
+    reset_pools()
+    yield
+    reset_pools()
+
+
+def test_clients_for_the_same_url_share_one_pool():
+    first = get_redis(REDIS_URL)
+    second = get_redis(REDIS_URL)
+    other = get_redis("redis://127.0.0.1:1/1")
+    assert first.connection_pool is second.connection_pool
+    assert other.connection_pool is not first.connection_pool
+
+
+@override_settings(
+    REDIS_MAX_CONNECTIONS=7,
+    REDIS_POOL_TIMEOUT_SECONDS=0.5,
+    REDIS_SOCKET_TIMEOUT_SECONDS=0.25,
+    REDIS_HEALTH_CHECK_INTERVAL_SECONDS=15,
+)
+def test_pool_uses_configured_limits():
+    pool = get_redis(REDIS_URL).connection_pool
+    assert pool.max_connections == 7
+    assert pool.timeout == 0.5
+    assert pool.connection_kwargs["socket_timeout"] == 0.25
+    assert pool.connection_kwargs["health_check_interval"] == 15
+
+
+@override_settings(REDIS_MAX_CONNECTIONS=2, REDIS_POOL_TIMEOUT_SECONDS=0.01)
+def test_pool_reports_saturation():
+    pool = get_redis(REDIS_URL).connection_pool
+    with mock.patch("redis.connection.Connection.connect"), mock.patch(
+        "redis.connection.Connection.can_read", return_value=False
+    ):
+        held = [pool.get_connection("GET"), pool.get_connection("GET")]
+        with pytest.raises(RedisConnectionError):
+            pool.get_connection("GET")
+        pool.release(held.pop())
+    assert pool.usage() == {"max": 2, "created": 2, "in_use": 1, "idle": 1, "exhausted": 1}
+
+
+def test_async_pools_are_per_event_loop():
+    async def pool_for_loop():
+        return get_async_redis(REDIS_URL).connection_pool
+
+    first = asyncio.run(pool_for_loop())
+    second = asyncio.run(pool_for_loop())
+    assert first is not second
+
+
+def test_stats_redact_passwords():
+    get_redis("redis://:secret@127.0.0.1:1/0")
+    [entry] = redis_pool_stats()
+    assert entry["url"] == "redis://:***@127.0.0.1:1/0"
+    assert entry["kind"] == "sync"
+    assert redact_url(REDIS_URL) == REDIS_URL
+
+
+class ConnectionStatusViewTests(TestCase):
+    def test_requires_staff_and_reports_pools(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="frank", password="password123"))
+        self.assertEqual(client.get(reverse("connection-status")).status_code, 403)
+
+        get_redis(REDIS_URL)
+        client.force_authenticate(User.objects.create_user(username="gina", password="password123", is_staff=True))
+        body = client.get(reverse("connection-status")).json()
+        self.assertIn(REDIS_URL, [entry["url"] for entry in body["redis"]])
+        self.assertEqual(body["databases"][0]["alias"], "default")
+        self.assertEqual(body["databases"][0]["pool_mode"], "persistent")
+
+    @override_settings(DATABASE_POOL_MODE="pgbouncer")
+    def test_reports_server_side_cursor_setting(self):
+        with mock.patch.dict(connections.connections["default"].settings_dict, DISABLE_SERVER_SIDE_CURSORS=True):
+            [entry] = connections.database_stats()
+        self.assertEqual(entry["pool_mode"], "pgbouncer")
+        self.assertFalse(entry["server_side_cursors"])
@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shortener.counters import increment_click_counts, reconcile_click_counts
+from shortener.models import Link, LinkClickShard
+
+User = get_user_model()
+
+
+@override_settings(CLICK_COUNTER_SHARDS=4)
+class StripedCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="dora", password="password123")
+        self.link = Link.objects.create(owner=self.user, code="count12", target_url="https://example.com")
+
+    def test_increments_land_in_shards_not_on_link_row(self):
+        for _ in range(10):
+            increment_click_counts({self.link.pk: 1})
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.click_count, 0)
+        self.assertLessEqual(LinkClickShard.objects.filter(link=self.link).count(), 4)
+        self.assertEqual(Link.objects.with_click_totals().get(pk=self.link.pk).click_total, 10)
+
+    def test_reconcile_folds_shards_into_link(self):
+        increment_click_counts({self.link.pk: 7})
+        reconcile_click_counts()
+        link = Link.objects.get(pk=self.link.pk)
+        self.assertEqual(link.click_count, 7)
+        self.assertEqual(link.total_clicks, 7)
+        increment_click_counts({self.link.pk: 2})
+        self.assertEqual(Link.objects.get(pk=self.link.pk).total_clicks, 9)
+
+    def test_serializers_report_summed_counts(self):
+        Link.objects.filter(pk=self.link.pk).update(click_count=5)
+        increment_click_counts({self.link.pk: 3})
+        client = APIClient()
+        client.force_authenticate(self.user)
+        listing = client.get(reverse("link-list")).json()
+        self.assertEqual(listing[0]["click_count"], 8)
+        stats = client.get(reverse("link-stats", kwargs={"code": self.link.code})).json()
+        self.assertEqual(stats["total_clicks"], 8)
+        self.assertEqual(stats["link"]["click_count"], 8)
+
+    @override_settings(CLICK_COUNTER_SHARDS=1)
+    def test_single_shard_updates_link_row_directly(self):
+        increment_click_counts({self.link.pk: 2})
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.click_count, 2)
+        self.assertFalse(LinkClickShard.objects.exists())
@@ -0,0 +1,163 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from shortener import db_router, services
+from shortener.cache import link_cache
+from shortener.db_router import (
+    PrimaryReplicaRouter,
+    probe_replica,
+    recent_writes,
+    replica_set,
+    routing_request,
+    use_primary,
+)
+from shortener.middleware import ReplicaRoutingMiddleware
+from shortener.models import Link
+from shortener.services import aresolve_link, resolve_link
+
+REPLICAS = ["replica_1", "replica_2"]
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, DATABASE_REPLICA_STICKY_REDIS_URL="redis://127.0.0.1:1/0")
+class RouterTests(SimpleTestCase):
+    """SimpleTestCase: TestCase would wrap every test in a transaction, which pins reads to the primary."""
+
+    def setUp(self):
+        replica_set.reset()
+        recent_writes.clear_local()
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        probe = mock.patch.object(db_router, "probe_replica", return_value=True)
+        self.probe = probe.start()
+        self.addCleanup(probe.stop)
+
+    def read_alias(self, request=None):
+        with routing_request(request or self.factory.get("/api/links/")):
+            return self.router.db_for_read(Link)
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Link), "default")
+        self.assertEqual(self.router.db_for_write(Link), "default")
+
+    def test_reads_rotate_across_replicas(self):
+        aliases = {self.read_alias() for _ in range(4)}
+        self.assertEqual(aliases, set(REPLICAS))
+
+    def test_unhealthy_replicas_are_skipped(self):
+        self.probe.side_effect = lambda alias: alias == "replica_2"
+        self.assertEqual({self.read_alias() for _ in range(4)}, {"replica_2"})
+        self.probe.side_effect = None
+        self.probe.return_value = False
+        replica_set.reset()
+        self.assertEqual(self.read_alias(), "default")
+
+    def test_health_is_probed_once_per_interval(self):
+        for _ in range(5):
+            self.read_alias()
+        self.assertEqual(self.probe.call_count, len(REPLICAS))
+
+    def test_unsafe_methods_transactions_and_pins_use_the_primary(self):
+        self.assertEqual(self.read_alias(self.factory.post("/api/links/bulk/")), "default")
+        with routing_request(self.factory.get("/api/links/")):
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Link), "default")
+            with mock.patch.object(connection, "in_atomic_block", True):
+                self.assertEqual(self.router.db_for_read(Link), "default")
+
+    def test_recent_writer_reads_from_the_primary(self):
+        user = SimpleNamespace(pk=1, is_authenticated=True)
+        other = SimpleNamespace(pk=2, is_authenticated=True)
+        recent_writes.mark(user.pk)
+
+        request = self.factory.get("/api/links/")
+        request.user = user
+        self.assertEqual(self.read_alias(request), "default")
+
+        request = self.factory.get("/api/links/")
+        request.user = other
+        self.assertIn(self.read_alias(request), REPLICAS)
+
+    def test_middleware_remembers_successful_writes(self):
+        user = SimpleNamespace(pk=1, is_authenticated=True)
+
+        def view(request):
+            request.user = user
+            self.assertEqual(self.router.db_for_read(Link), "default")
+            return HttpResponse(status=201)
+
+        ReplicaRoutingMiddleware(view)(self.factory.post("/api/links/bulk/"))
+        self.assertTrue(recent_writes.recent(user.pk))
+
+    def test_failed_writes_do_not_pin(self):
+        user = SimpleNamespace(pk=1, is_authenticated=True)
+
+        def view(request):
+            request.user = user
+            return HttpResponse(status=400)
+
+        ReplicaRoutingMiddleware(view)(self.factory.post("/api/links/bulk/"))
+        self.assertFalse(recent_writes.recent(user.pk))
+
+
+class ReplicaProbeTests(TestCase):
+    def test_probe_reports_reachable_database(self):
+        self.assertTrue(probe_replica("default"))
+
+    def test_probe_reports_broken_database(self):
+        with mock.patch.object(connection, "cursor", side_effect=db_router.DatabaseError):
+            self.assertFalse(probe_replica("default"))
+
+
+# "default" doubles as the replica so the queries can run in the test database.
+# The code filter would answer the miss without any query.
+@override_settings(DATABASE_REPLICAS=["default"], CODE_FILTER_ENABLED=False)
+class ReplicaResolutionTests(TestCase):
+    def setUp(self):
+        link_cache.clear_local()
+        self.addCleanup(link_cache.clear_local)
+        self.link = Link.objects.create(code="moved123", target_url="https://old.example.com")
+
+    def stale_mirror(self):
+        """Answer resolution reads with the pre-edit row unless they are pinned to the primary."""
+        real_query = services._resolution_query
+        stale_row = (self.link.pk, "https://old.example.com", True, None)
+
+        def query():
+            if db_router._primary_pinned.get():
+                return real_query()
+            stale = mock.MagicMock()
+            stale.filter.return_value.first.return_value = stale_row
+            stale.filter.return_value.afirst = mock.AsyncMock(return_value=stale_row)
+            return stale
+
+        return mock.patch.object(services, "_resolution_query", side_effect=query)
+
+    def edit_link(self):
+        self.link.target_url = "https://new.example.com"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.link.save()
+
+    def test_cache_is_refilled_from_the_primary_after_invalidation(self):
+        self.assertEqual(resolve_link(self.link.code).target_url, "https://old.example.com")
+        self.edit_link()
+        with self.stale_mirror():
+            self.assertEqual(resolve_link(self.link.code).target_url, "https://new.example.com")
+        self.assertEqual(link_cache.get(self.link.code).target_url, "https://new.example.com")
+
+    async def test_async_cache_is_refilled_from_the_primary(self):
+        await sync_to_async(self.edit_link)()
+        with self.stale_mirror():
+            self.assertEqual((await aresolve_link(self.link.code)).target_url, "https://new.example.com")
+        self.assertEqual((await link_cache.aget(self.link.code)).target_url, "https://new.example.com")
+
+    def test_hits_and_misses_cost_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNotNone(resolve_link(self.link.code))
+            self.assertIsNone(resolve_link("missing1"))
+        self.assertEqual(len(queries), 2)
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from shortener.cache import LinkResolution, link_cache
+from shortener.expiry import deactivate_expired_links, expired_active_links, purge_expired_links
+from shortener.models import Click, DailyClickRollup, Link
+
+
+class ExpirySweepTests(TestCase):
+    def setUp(self):
+        link_cache.clear_local()
+        self.now = timezone.now()
+        self.expired = [self.link(f"old{i}", -timedelta(hours=i + 1)) for i in range(5)]
+        self.future = self.link("later1", timedelta(days=1))
+        self.forever = self.link("forever1", None)
+
+    def link(self, code, expires_in):
+        expires_at = self.now + expires_in if expires_in is not None else None
+        return Link.objects.create(code=code, target_url="https://example.com", expires_at=expires_at)
+
+    def test_deactivates_only_expired_links_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(deactivate_expired_links(batch_size=2, now=self.now), 5)
+        updates = [query for query in queries if query["sql"].startswith('UPDATE "shortener_link"')]
+        self.assertEqual(len(updates), 3)
+        self.assertFalse(Link.objects.filter(code__startswith="old", is_active=True).exists())
+        self.assertTrue(Link.objects.get(pk=self.future.pk).is_active)
+        self.assertTrue(Link.objects.get(pk=self.forever.pk).is_active)
+        self.assertEqual(deactivate_expired_links(now=self.now), 0)
+
+    def test_deactivation_invalidates_cached_resolutions(self):
+        link = self.expired[0]
+        link_cache.local.set(link.code, LinkResolution(link_id=link.pk, target_url=link.target_url, is_active=True))
+        with mock.patch.object(link_cache, "invalidate_many", wraps=link_cache.invalidate_many) as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                deactivate_expired_links(now=self.now)
+        invalidated = {code for call in invalidate.call_args_list for code in call.args[0]}
+        self.assertEqual(invalidated, {link.code for link in self.expired})
+        self.assertIsNone(link_cache.local.get(link.code, None))
+
+    def test_query_uses_the_partial_index_predicate(self):
+        sql = str(expired_active_links(self.now).query)
+        self.assertIn('"is_active"', sql)
+        self.assertIn('"expires_at" IS NOT NULL', sql)
+        index = next(index for index in Link._meta.indexes if index.name == "shortener_link_expiring_idx")
+        self.assertEqual(index.fields, ["expires_at"])
+
+    def test_purge_deletes_links_and_clicks_past_grace_period(self):
+        deactivate_expired_links(now=self.now)
+        old = self.expired[4]
+        Link.objects.filter(pk=old.pk).update(expires_at=self.now - timedelta(days=40))
+        for _ in range(7):
+            Click.objects.create(link=old, ts=self.now - timedelta(days=41))
+        Click.objects.create(link=self.expired[0], ts=self.now)
+        DailyClickRollup.objects.create(link=old, day=self.now.date(), clicks=7)
+        links, clicks = purge_expired_links(timedelta(days=30), click_chunk_size=3, now=self.now)
+        self.assertEqual((links, clicks), (1, 7))
+        self.assertFalse(Link.objects.filter(pk=old.pk).exists())
+        self.assertFalse(DailyClickRollup.objects.exists())
+        self.assertEqual(Click.objects.count(), 1)
+        self.assertEqual(Link.objects.filter(code__startswith="old").count(), 4)
+
+    def test_command(self):
+        out = StringIO()
+        call_command("sweep_expired_links", "--dry-run", stdout=out)
+        self.assertIn("Would deactivate 5", out.getvalue())
+        self.assertEqual(Link.objects.filter(is_active=False).count(), 0)
+        out = StringIO()
+        call_command("sweep_expired_links", "--purge-after-days", "30", stdout=out)
+        self.assertIn("Deactivated 5 expired links.", out.getvalue())
+        self.assertIn("Deleted 0 links and 0 clicks", out.getvalue())
@@ -0,0 +1,44 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from shortener.cache import link_cache
+from shortener.models import Link
+
+
+@override_settings(CLICK_BUFFER_BACKEND="local")
+class RedirectFastPathTests(TestCase):
+    def setUp(self):
+        link_cache.clear_local()
+        self.link = Link.objects.create(code="fast123", target_url="https://example.com/fast")
+
+    def test_redirect_is_answered_before_session_and_csrf_middleware(self):
+        response = self.client.get(f"/{self.link.code}")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], "https://example.com/fast")
+        self.assertFalse(hasattr(response.wsgi_request, "session"))
+        self.assertFalse(hasattr(response.wsgi_request, "user"))
+
+    def test_redirect_keeps_security_headers(self):
+        response = self.client.get(f"/{self.link.code}")
+        self.assertEqual(response["Referrer-Policy"], "same-origin")
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+
+    def test_head_is_served(self):
+        self.assertEqual(self.client.head(f"/{self.link.code}").status_code, 302)
+
+    def test_gone_links_are_answered_on_fast_path(self):
+        self.link.expires_at = timezone.now() - timezone.timedelta(minutes=1)
+        self.link.save()
+        response = self.client.get(f"/{self.link.code}")
+        self.assertEqual(response.status_code, 410)
+        self.assertFalse(hasattr(response.wsgi_request, "session"))
+
+    def test_unknown_codes_fall_through_to_full_stack(self):
+        response = self.client.get("/unknown1")
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(hasattr(response.wsgi_request, "session"))
+
+    def test_non_get_methods_fall_through(self):
+        response = self.client.post(f"/{self.link.code}")
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,129 @@
+import os
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from shortener.clicks import ClickEvent, flush_clicks
+from shortener.geoip import GeoIPDatabase, compile_ranges, parse_range_rows
+from shortener.models import Click, DailyCountryRollup, Link, UserAgent
+from shortener.rollups import rollup_clicks
+
+RANGES_CSV = """network,country
+8.8.8.0/24,US
+81.2.69.0/24,GB
+2a02:ec0::/29,SE
+"""
+RANGE_ROWS = [
+    ["first_ip", "last_ip", "country"],
+    ["1.0.0.0", "1.0.0.255", "au"],
+    ["5.0.0.0", "5.255.255.255", "DE"],
+    ["5.10.0.0", "5.10.255.255", "NL"],
+    ["9.9.9.9", "9.9.9.9", "not-a-country"],
+]
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "geo.bin"
+    path.write_bytes(compile_ranges(parse_range_rows(RANGE_ROWS)))
+    database = GeoIPDatabase(str(path))
+    yield database
+    database.close()
+
+
+def test_lookups_bisect_the_range_table(database):
+    assert len(database) == 3
+    assert database.country("1.0.0.1") == "AU"
+    assert database.country("1.0.1.0") is None
+    assert database.country("5.9.255.255") == "DE"
+    assert database.country("5.10.3.4") == "NL"
+    assert database.country("9.9.9.9") is None
+    assert database.country("0.0.0.1") is None
+
+
+def test_private_and_malformed_addresses_are_unknown(database):
+    assert database.country("10.0.0.1") is None
+    assert database.country("not an ip") is None
+    assert database.country("::ffff:1.0.0.7") == "AU"
+
+
+def test_repeat_lookups_hit_the_lru_cache(database):
+    database.country("5.1.1.1")
+    database.country("5.1.1.1")
+    assert database.country.cache_info().hits == 1
+
+
+def test_rejects_files_that_are_not_range_tables(tmp_path):
+    path = tmp_path / "junk.bin"
+    path.write_bytes(b"nope" * 10)
+    with pytest.raises(ValueError):
+        GeoIPDatabase(str(path))
+
+
+class GeoIPEnrichmentTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        source = os.path.join(directory.name, "ranges.csv")
+        with open(source, "w") as handle:
+            handle.write(RANGES_CSV)
+        self.path = os.path.join(directory.name, "geo.bin")
+        call_command("compile_geoip", source, output=self.path, stdout=StringIO())
+        self.link = Link.objects.create(code="geo1234", target_url="https://example.com")
+
+    def test_flush_fills_in_the_country(self):
+        with override_settings(GEOIP_DATABASE_PATH=self.path):
+            flush_clicks(
+                [
+                    ClickEvent(link_id=self.link.pk, ip="8.8.8.8"),
+                    ClickEvent(link_id=self.link.pk, ip="2a02:ec0::1"),
+                    ClickEvent(link_id=self.link.pk, ip="192.168.1.1"),
+                    ClickEvent(link_id=self.link.pk, ip="8.8.8.8", country="CA"),
+                ]
+            )
+        countries = sorted(Click.objects.values_list("country", flat=True), key=lambda country: country or "")
+        self.assertEqual(countries, [None, "CA", "SE", "US"])
+
+    def test_without_a_database_countries_stay_empty(self):
+        flush_clicks([ClickEvent(link_id=self.link.pk, ip="8.8.8.8")])
+        self.assertIsNone(Click.objects.get().country)
+
+    def test_backfill_sets_countries_and_fixes_rolled_up_counts(self):
+        ts = datetime(2024, 3, 1, 12, tzinfo=dt_timezone.utc)
+        for ip in ("8.8.8.8", "8.8.8.9", "81.2.69.1", "10.0.0.1"):
+            Click.objects.create(link=self.link, ts=ts, ip=ip)
+        rollup_clicks(lag_seconds=0)
+        late = Click.objects.create(link=self.link, ts=ts, ip="81.2.69.2")
+        with override_settings(GEOIP_DATABASE_PATH=self.path):
+            call_command("backfill_click_countries", batch_size=2, stdout=StringIO())
+        self.assertEqual(Click.objects.get(pk=late.pk).country, "GB")
+        rollups = dict(DailyCountryRollup.objects.filter(link=self.link).values_list("country", "clicks"))
+        # The late click was not rolled up yet; the rollup worker counts it under GB later.
+        self.assertEqual(rollups, {"US": 2, "GB": 1, "": 1})
+        rollup_clicks(lag_seconds=0)
+        rollups = dict(DailyCountryRollup.objects.filter(link=self.link).values_list("country", "clicks"))
+        self.assertEqual(rollups, {"US": 2, "GB": 2, "": 1})
+
+    @override_settings(CLICK_EXCLUDE_BOTS=True)
+    def test_backfill_leaves_excluded_bots_out_of_the_rollups(self):
+        ts = datetime(2024, 3, 1, 12, tzinfo=dt_timezone.utc)
+        bot = UserAgent.objects.create(
+            ua_hash="b" * 32, raw="Googlebot/2.1", browser="Googlebot", os="Other", device="bot", is_bot=True
+        )
+        Click.objects.create(link=self.link, ts=ts, ip="8.8.8.8")
+        crawl = Click.objects.create(link=self.link, ts=ts, ip="8.8.8.9", ua=bot)
+        rollup_clicks(lag_seconds=0)
+        with override_settings(GEOIP_DATABASE_PATH=self.path):
+            call_command("backfill_click_countries", stdout=StringIO())
+        self.assertEqual(Click.objects.get(pk=crawl.pk).country, "US")
+        rollups = dict(DailyCountryRollup.objects.filter(link=self.link).values_list("country", "clicks"))
+        self.assertEqual(rollups, {"US": 1})
+
+    def test_backfill_requires_a_database(self):
+        with self.assertRaises(CommandError):
+            call_command("backfill_click_countries", stdout=StringIO())
@@ -0,0 +1,80 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from shortener.models import Link
+from shortener.pagination import decode_cursor, encode_cursor
+
+User = get_user_model()
+
+
+def test_cursor_round_trip():
+    now = timezone.now()
+    assert decode_cursor(encode_cursor(now, 42)) == (now, 42)
+
+
+class LinkListPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        base = timezone.now()
+        links = [
+            Link(owner=self.user, code=f"page{index:03d}", target_url=f"https://example.com/{index}")
+            for index in range(7)
+        ]
+        Link.objects.bulk_create(links)
+        # Two links share a timestamp so the id tiebreak matters.
+        for index, link in enumerate(Link.objects.filter(owner=self.user).order_by("id")):
+            Link.objects.filter(pk=link.pk).update(created_at=base - timedelta(minutes=index // 2))
+
+    def test_pages_follow_the_next_cursor_without_gaps_or_repeats(self):
+        seen = []
+        url = reverse("link-list")
+        params = {"limit": 3}
+        while True:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIsInstance(response.json(), list)
+            seen += [item["code"] for item in response.json()]
+            cursor = response.get("X-Next-Cursor")
+            if not cursor:
+                self.assertNotIn("Link", response)
+                break
+            self.assertIn('rel="next"', response["Link"])
+            params = {"limit": 3, "cursor": cursor}
+        expected = list(
+            Link.objects.filter(owner=self.user).order_by("-created_at", "-id").values_list("code", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse("link-list"), {"cursor": "garbage"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_fields_projection_limits_output_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("link-list"), {"fields": "code,short_url", "limit": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.json()[0]), {"code", "short_url"})
+        select = next(query["sql"] for query in queries if "FROM \"shortener_link\"" in query["sql"])
+        self.assertNotIn("target_url", select.split("FROM")[0])
+        self.assertNotIn("shortener_linkclickshard", select)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse("link-list"), {"fields": "code,password"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ndjson_export_streams_every_link(self):
+        response = self.client.get(reverse("link-list"), {"export": "ndjson", "fields": "code,click_count", "limit": 2})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(set(rows[0]), {"code", "click_count"})
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from shortener import services
+from shortener.cache import link_cache
+from shortener.code_filter import code_filter
+from shortener.models import Link
+from shortener.throttling import rate_limiter
+
+User = get_user_model()
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        link_cache.clear_local()
+        rate_limiter.reset()
+        self.link = Link.objects.create(code="metric12", target_url="https://example.com")
+
+    def test_redirect_latency_and_status_are_recorded(self):
+        before = sample("http_requests_total", route="<slug:code>", method="GET", status="302")
+        count_before = sample("http_request_duration_seconds_count", route="<slug:code>", method="GET")
+        self.client.get(f"/{self.link.code}")
+        self.assertEqual(sample("http_requests_total", route="<slug:code>", method="GET", status="302"), before + 1)
+        self.assertEqual(
+            sample("http_request_duration_seconds_count", route="<slug:code>", method="GET"), count_before + 1
+        )
+
+    def test_query_count_per_route(self):
+        user = User.objects.create_user(username="alice", password="password123")
+        client = APIClient()
+        client.force_authenticate(user)
+        before = sample("http_request_db_queries_sum", route="api/links/")
+        count_before = sample("http_request_db_queries_count", route="api/links/")
+        client.get("/api/links/")
+        self.assertEqual(sample("http_request_db_queries_count", route="api/links/"), count_before + 1)
+        self.assertGreater(sample("http_request_db_queries_sum", route="api/links/"), before)
+
+    def test_cache_and_rate_limit_outcomes(self):
+        local_hits = sample("link_cache_lookups_total", tier="local", result="hit")
+        allowed = sample("rate_limit_decisions_total", policy="redirect", outcome="allowed")
+        self.client.get(f"/{self.link.code}")
+        self.client.get(f"/{self.link.code}")
+        self.assertEqual(sample("link_cache_lookups_total", tier="local", result="hit"), local_hits + 1)
+        self.assertEqual(sample("rate_limit_decisions_total", policy="redirect", outcome="allowed"), allowed + 2)
+
+    def test_collisions_are_counted(self):
+        Link.objects.create(code="taken12", target_url="https://example.com")
+        code_filter.load()
+        self.addCleanup(code_filter.reset)
+        collisions = sample("link_code_collisions_total")
+        attempts = sample("link_insert_attempts_total")
+        services._save_links([Link(code="taken12", target_url="https://example.com/new")])
+        self.assertEqual(sample("link_code_collisions_total"), collisions + 1)
+        # The code filter flags the clash before the insert, so one attempt is enough.
+        self.assertEqual(sample("link_insert_attempts_total"), attempts + 1)
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_metrics_endpoint_serves_prometheus_text(self):
+        self.client.get(f"/{self.link.code}")
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(b"http_request_duration_seconds_bucket", response.content)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_metrics_endpoint_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        self.assertEqual(self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_endpoint_needs_a_token_or_staff_by_default(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        self.client.force_login(User.objects.create_user(username="ops", password="password123", is_staff=True))
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_scrapes_skip_the_redirect_path(self):
+        allowed = sample("rate_limit_decisions_total", policy="redirect", outcome="allowed")
+        self.client.get(reverse("metrics"))
+        self.assertEqual(sample("rate_limit_decisions_total", policy="redirect", outcome="allowed"), allowed)
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
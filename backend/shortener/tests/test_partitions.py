@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from shortener.models import Click, Link
+from shortener.partitions import (
+    add_months,
+    expired_partitions,
+    partition_month,
+    partition_name,
+    retention_cutoff,
+)
+from shortener.services import recent_clicks
+
+
+def test_month_arithmetic_crosses_years():
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_partition_names_round_trip():
+    assert partition_name(date(2024, 3, 1)) == "shortener_click_p202403"
+    assert partition_month("shortener_click_p202403") == date(2024, 3, 1)
+    assert partition_month("shortener_click_default") is None
+
+
+def test_expired_partitions_respect_retention():
+    names = [partition_name(date(2024, month, 1)) for month in range(1, 7)] + ["shortener_click_default"]
+    today = date(2024, 6, 15)
+    assert retention_cutoff(3, today) == date(2024, 3, 1)
+    assert expired_partitions(names, 3, today) == ["shortener_click_p202401", "shortener_click_p202402"]
+    assert expired_partitions(names, 0, today) == []
+
+
+class PartitionCommandTests(TestCase):
+    def test_command_is_a_no_op_without_postgres(self):
+        out = StringIO()
+        call_command("manage_click_partitions", "--retention-months", "1", stdout=out)
+        self.assertIn("nothing to do", out.getvalue())
+
+
+class RecentClicksTests(TestCase):
+    def test_recent_clicks_fall_back_to_older_rows(self):
+        link = Link.objects.create(code="recent1", target_url="https://example.com")
+        now = timezone.now()
+        old = Click.objects.create(link=link, ts=now - timedelta(days=90))
+        new = Click.objects.create(link=link, ts=now - timedelta(hours=1))
+        newest = Click.objects.create(link=link, ts=now)
+        self.assertEqual(recent_clicks(link, limit=2), [newest, new])
+        self.assertEqual(recent_clicks(link, limit=5), [newest, new, old])
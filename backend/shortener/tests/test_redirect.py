@@ -12,7 +12,7 @@ class RedirectViewTests(TestCase):
         response = self.client.get(f"/{self.link.code}")
         self.assertEqual(response.status_code, 302)
         refreshed = Link.objects.get(pk=self.link.pk)
-        self.assertEqual(refreshed.click_count, 1)
+        self.assertEqual(refreshed.total_clicks, 1)
         self.assertEqual(refreshed.clicks.count(), 1)
 
     def test_expired_link_returns_gone(self):
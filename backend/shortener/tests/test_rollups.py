@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from shortener.models import Click, DailyClickRollup, HourlyClickRollup, Link, RollupWatermark
+from shortener.rollups import referrer_host, rollup_batch, rollup_clicks
+
+User = get_user_model()
+
+
+def at(day, hour=0, minute=0):
+    return datetime(2024, 3, day, hour, minute, tzinfo=dt_timezone.utc)
+
+
+def test_referrer_host_normalises_urls():
+    assert referrer_host("https://News.Example.com/a?b=1") == "news.example.com"
+    assert referrer_host(None) == ""
+    assert referrer_host("not a url") == ""
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.link = Link.objects.create(code="roll123", target_url="https://example.com")
+        self.other = Link.objects.create(code="roll456", target_url="https://example.com/other")
+
+    def click(self, ts, link=None, referrer=None, country=None):
+        return Click.objects.create(link=link or self.link, ts=ts, referrer=referrer, country=country)
+
+    def test_rollup_buckets_by_hour_day_referrer_and_country(self):
+        self.click(at(1, 9, 5), referrer="https://t.co/x", country="us")
+        self.click(at(1, 9, 55), referrer="https://t.co/y", country="US")
+        self.click(at(1, 10), country="DE")
+        self.click(at(2, 0), link=self.other)
+        self.assertEqual(rollup_clicks(lag_seconds=0), 4)
+
+        hourly = dict(HourlyClickRollup.objects.filter(link=self.link).values_list("bucket", "clicks"))
+        self.assertEqual(hourly, {at(1, 9): 2, at(1, 10): 1})
+        self.assertEqual(DailyClickRollup.objects.get(link=self.link).clicks, 3)
+        self.assertEqual(dict(self.link.referrer_rollups.values_list("host", "clicks")), {"t.co": 2, "": 1})
+        self.assertEqual(dict(self.link.country_rollups.values_list("country", "clicks")), {"US": 2, "DE": 1})
+
+    def test_rollup_only_processes_clicks_past_the_watermark(self):
+        self.click(at(1, 9))
+        rollup_clicks(lag_seconds=0)
+        self.click(at(1, 9, 30))
+        self.assertEqual(rollup_clicks(lag_seconds=0), 1)
+        self.assertEqual(HourlyClickRollup.objects.get(link=self.link, bucket=at(1, 9)).clicks, 2)
+        self.assertEqual(rollup_clicks(lag_seconds=0), 0)
+        self.assertEqual(RollupWatermark.objects.get().last_click_id, Click.objects.order_by("-pk").first().pk)
+
+    def age(self, click, seconds):
+        Click.objects.filter(pk=click.pk).update(recorded_at=timezone.now() - timedelta(seconds=seconds))
+
+    def test_recently_inserted_clicks_wait_for_the_safety_lag(self):
+        first, second, third = self.click(at(1, 9)), self.click(at(1, 9)), self.click(at(1, 10))
+        self.age(first, 120)
+        self.age(third, 120)
+        # The highest settled id decides; the young row below it is already committed.
+        self.assertEqual(rollup_batch(lag_seconds=60), 3)
+        # An old event time doesn't make a freshly inserted (e.g. buffered) click settled.
+        self.click(at(1, 11))
+        self.assertEqual(rollup_batch(lag_seconds=60), 0)
+        self.assertEqual(rollup_batch(lag_seconds=0), 1)
+
+    def test_a_lower_id_committing_late_is_not_skipped(self):
+        late_id = self.click(at(1, 9)).pk
+        Click.objects.filter(pk=late_id).delete()
+        # A higher id, inserted just now, is visible before the lower one commits.
+        higher = Click.objects.create(link=self.link, ts=at(1, 9), pk=late_id + 1)
+        self.assertEqual(rollup_batch(lag_seconds=60), 0)
+        Click.objects.create(link=self.link, ts=at(1, 9), pk=late_id)
+        self.age(higher, 120)
+        self.assertEqual(rollup_batch(lag_seconds=60), 2)
+        self.assertEqual(DailyClickRollup.objects.get(link=self.link).clicks, 2)
+
+    def test_batches_resume_where_the_previous_one_stopped(self):
+        for minute in range(5):
+            self.click(at(1, 9, minute))
+        self.assertEqual(rollup_batch(batch_size=2, lag_seconds=0), 2)
+        self.assertEqual(rollup_clicks(batch_size=2, lag_seconds=0), 3)
+        self.assertEqual(HourlyClickRollup.objects.get(link=self.link).clicks, 5)
+
+    def test_command_runs_a_single_pass(self):
+        self.click(at(1, 9))
+        out = StringIO()
+        call_command("rollup_clicks", "--lag", "0", stdout=out)
+        self.assertIn("Rolled up 1 clicks.", out.getvalue())
+
+
+class TimeseriesApiTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.link = Link.objects.create(owner=self.user, code="series1", target_url="https://example.com")
+        for ts, referrer, country in [
+            (at(1, 9), "https://t.co/a", "US"),
+            (at(1, 9, 30), "https://news.ycombinator.com/", "US"),
+            (at(3, 12), "https://t.co/b", "FR"),
+        ]:
+            Click.objects.create(link=self.link, ts=ts, referrer=referrer, country=country)
+        rollup_clicks(lag_seconds=0)
+        self.url = reverse("link-stats-timeseries", kwargs={"code": self.link.code})
+
+    def test_daily_series_is_zero_filled(self):
+        response = self.client.get(self.url, {"from": "2024-03-01", "to": "2024-03-03"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual([point["clicks"] for point in data["series"]], [2, 0, 1])
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(data["top_referrers"][0], {"host": "t.co", "clicks": 2})
+        self.assertEqual(data["top_countries"], [{"country": "US", "clicks": 2}, {"country": "FR", "clicks": 1}])
+
+    def test_hourly_series(self):
+        response = self.client.get(
+            self.url, {"from": "2024-03-01T08:00:00Z", "to": "2024-03-01T10:00:00Z", "granularity": "hour"}
+        )
+        data = response.json()
+        self.assertEqual([point["clicks"] for point in data["series"]], [0, 2, 0])
+        self.assertEqual(data["series"][1]["bucket"], "2024-03-01T09:00:00Z")
+
+    def test_reads_only_rollups(self):
+        Click.objects.create(link=self.link, ts=at(1, 11))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {"from": "2024-03-01", "to": "2024-03-01"})
+        # The click that has not been rolled up yet is not visible.
+        self.assertEqual(response.json()["total"], 2)
+        self.assertFalse([query for query in queries if '"shortener_click"' in query["sql"]])
+
+    def test_rejects_bad_ranges(self):
+        response = self.client.get(self.url, {"from": "2024-03-05", "to": "2024-03-01"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {"from": "2000-01-01", "to": "2024-03-01", "granularity": "hour"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {"granularity": "week"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_links_are_hidden(self):
+        other = User.objects.create_user(username="bob", password="password")
+        self.client.force_authenticate(other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.db.backends.postgresql.base import DatabaseWrapper
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+
+from shortener.models import Link, hash_target_url
+from shortener.search import IContainsSearch, get_search_backend
+from shortener.services import bulk_create_links
+
+User = get_user_model()
+
+
+def test_trigram_lookup_compiles_to_ilike_on_postgres():
+    postgres = DatabaseWrapper(
+        {
+            "NAME": "unused",
+            "USER": "",
+            "PASSWORD": "",
+            "HOST": "",
+            "PORT": "",
+            "OPTIONS": {},
+            "TIME_ZONE": None,
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": False,
+            "AUTOCOMMIT": True,
+        },
+        alias="postgres-compile-only",
+    )
+    queryset = Link.objects.filter(target_url__trigram_contains="50%_off")
+    sql, params = queryset.query.get_compiler(connection=postgres).as_sql()
+    assert '"shortener_link"."target_url" ILIKE %s' in sql
+    assert "UPPER" not in sql
+    assert params == ("%50\\%\\_off%",)
+
+
+class TargetHashTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="password123")
+
+    def test_hash_is_kept_in_sync_on_save_and_bulk_create(self):
+        link = Link.objects.create(owner=self.user, code="hash001", target_url="https://example.com/a")
+        self.assertEqual(link.target_url_hash, hash_target_url("https://example.com/a"))
+        link.target_url = "https://example.com/b"
+        link.save()
+        link.refresh_from_db()
+        self.assertEqual(link.target_url_hash, hash_target_url("https://example.com/b"))
+
+        created, _ = bulk_create_links(
+            owner=self.user, target_url="https://example.com/c", count=3, code_length=7, expires_at=None
+        )
+        self.assertEqual(Link.objects.for_target("https://example.com/c").count(), 3)
+        self.assertEqual(Link.objects.for_target("https://example.com/").count(), 0)
+
+    def test_default_backend_falls_back_to_icontains_off_postgres(self):
+        self.assertIsInstance(get_search_backend(), IContainsSearch)
+
+
+class SearchApiTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Link.objects.create(owner=self.user, code="match12", target_url="https://example.com/Landing")
+        Link.objects.create(owner=self.user, code="other90", target_url="https://different.com/page")
+
+    def test_both_backends_match_case_insensitively_on_code_and_target(self):
+        for backend in ("icontains", "trigram"):
+            with self.subTest(backend=backend), override_settings(LINK_SEARCH_BACKEND=backend):
+                response = self.client.get(reverse("link-list"), {"q": "landing"})
+                self.assertEqual([item["code"] for item in response.json()], ["match12"])
+                response = self.client.get(reverse("link-list"), {"q": "OTHER"})
+                self.assertEqual([item["code"] for item in response.json()], ["other90"])
@@ -0,0 +1,138 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from shortener.models import Click, Link
+from shortener.seeding import (
+    CopyStream,
+    SeedPlan,
+    click_link_indexes,
+    click_times,
+    copy_models,
+    copy_value,
+    seed_click_rows,
+    seed_code,
+    zipf_ranks,
+)
+
+UNTIL = datetime(2024, 5, 1, 12, tzinfo=dt_timezone.utc)
+
+
+def test_seed_codes_are_unique_and_short():
+    codes = {seed_code("sd", number) for number in range(10_000)}
+    assert len(codes) == 10_000
+    assert seed_code("sd", 0) == "sd0"
+    assert max(len(code) for code in codes) <= 5
+
+
+def test_zipf_ranks_are_skewed():
+    counts = Counter(zipf_ranks(random.Random(1), population=100, count=20_000, s=1.1))
+    assert counts[0] > counts[1] > counts[10]
+    assert set(counts) <= set(range(100))
+
+
+def test_click_plan_is_deterministic():
+    plan = SeedPlan(links=50, clicks=500, seed=7)
+    assert click_link_indexes(plan) == click_link_indexes(plan)
+    assert click_link_indexes(plan) != click_link_indexes(SeedPlan(links=50, clicks=500, seed=8))
+
+
+def test_click_times_follow_the_day_and_stay_in_window():
+    plan = SeedPlan(links=1, clicks=20_000, days=7)
+    times = list(click_times(plan, UNTIL))
+    assert min(times) >= UNTIL - timedelta(days=8)
+    assert max(times) <= UNTIL
+    hours = Counter(ts.hour for ts in times)
+    assert hours[18] > 3 * hours[3]
+
+
+def test_click_rows_mix_referrers_countries_and_visitors():
+    plan = SeedPlan(links=10, clicks=5000, seed=2, visitors=500)
+    rows = list(seed_click_rows(plan, list(range(100, 110)), click_link_indexes(plan), UNTIL))
+    referrers = Counter(row.referrer for row in rows)
+    assert referrers[None] > referrers["https://www.google.com/"] > referrers["https://duckduckgo.com/"]
+    assert Counter(row.country for row in rows).most_common(1)[0][0] == "US"
+    assert 100 < len({row.ip for row in rows}) <= 500
+    again = list(seed_click_rows(plan, list(range(100, 110)), click_link_indexes(plan), UNTIL))
+    def key(row):
+        return row.link_id, row.ts, row.ip, row.user_agent
+
+    assert [key(row) for row in rows] == [key(row) for row in again]
+
+
+def test_copy_value_escapes_text_format():
+    assert copy_value(None) == "\\N"
+    assert copy_value(True) == "t"
+    assert copy_value("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+    assert copy_value(UNTIL) == "2024-05-01T12:00:00+00:00"
+
+
+def test_copy_stream_reads_in_chunks():
+    stream = CopyStream(f"row{number}\n" for number in range(1000))
+    chunks = iter(lambda: stream.read(100), b"")
+    data = b"".join(chunks)
+    assert data.count(b"\n") == 1000
+    assert data.startswith(b"row0\nrow1\n")
+
+
+def test_copy_models_streams_rows():
+    cursor = mock.MagicMock()
+    captured = {}
+    cursor.__enter__.return_value.copy_expert.side_effect = lambda sql, stream: captured.update(
+        sql=sql, body=stream.read(1 << 20)
+    )
+    with mock.patch("shortener.seeding.connection.cursor", return_value=cursor):
+        copy_models(Click, [Click(link_id=5, ts=UNTIL, recorded_at=UNTIL, referrer="x\ty", country=None)])
+    assert captured["sql"].startswith('COPY "shortener_click" ("link_id", "ts", "recorded_at", "ip", ')
+    assert captured["sql"].endswith("FROM STDIN")
+    assert captured["body"] == b"5\t2024-05-01T12:00:00+00:00\t2024-05-01T12:00:00+00:00\t\\N\t\\N\t\\N\tx\\ty\t\\N\n"
+
+
+class SeedLinksCommandTests(TestCase):
+    def test_seeds_links_clicks_and_counts(self):
+        out = StringIO()
+        call_command("seed_links", links=40, clicks=300, prefix="tt", owner="seeder", stdout=out)
+        links = Link.objects.filter(code__startswith="tt")
+        self.assertEqual(links.count(), 40)
+        self.assertEqual(Click.objects.count(), 300)
+        self.assertEqual(sum(links.values_list("click_count", flat=True)), 300)
+        self.assertTrue(all(link.owner.username == "seeder" for link in links[:5]))
+        self.assertTrue(all(link.target_url_hash for link in links))
+        self.assertIn("Seeded 40 links", out.getvalue())
+        self.assertIn("clicks: 300/300", out.getvalue())
+        self.assertTrue(Click.objects.filter(referrer__isnull=False).exists())
+
+    def test_fixed_until_gives_identical_clicks(self):
+        args = {"links": 10, "clicks": 100, "seed": 4, "until": "2024-05-01T12:00:00", "stdout": StringIO()}
+        call_command("seed_links", prefix="aa", **args)
+        call_command("seed_links", prefix="bb", **args)
+
+        def rows(prefix):
+            return list(
+                Click.objects.filter(link__code__startswith=prefix)
+                .order_by("ts", "ip")
+                .values_list("link__code", "ts", "ip", "referrer", "country")
+            )
+
+        first, second = rows("aa"), rows("bb")
+        self.assertEqual([(code[2:], *rest) for code, *rest in first], [(code[2:], *rest) for code, *rest in second])
+        self.assertTrue(all(ts <= UNTIL for _, ts, *_ in first))
+
+    def test_same_seed_gives_same_distribution(self):
+        call_command("seed_links", links=20, clicks=200, prefix="aa", seed=3, stdout=StringIO())
+        call_command("seed_links", links=20, clicks=200, prefix="bb", seed=3, stdout=StringIO())
+        first = dict(Link.objects.filter(code__startswith="aa").values_list("code", "click_count"))
+        second = dict(Link.objects.filter(code__startswith="bb").values_list("code", "click_count"))
+        by_number = {code[2:]: total for code, total in first.items()}
+        self.assertEqual(by_number, {code[2:]: total for code, total in second.items()})
+
+    def test_refuses_prefix_in_use(self):
+        Link.objects.create(code="zz1", target_url="https://example.com")
+        with self.assertRaises(CommandError):
+            call_command("seed_links", links=5, clicks=0, prefix="zz", stdout=StringIO())
@@ -0,0 +1,182 @@
+import asyncio
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.test import APIClient, APITestCase
+
+from shortener.models import Link
+from shortener.throttling import (
+    LocalTokenBucket,
+    RateLimitPolicy,
+    RedisRateLimiter,
+    client_ip,
+    get_policy,
+    rate_limiter,
+)
+
+User = get_user_model()
+
+POLICIES = {
+    "bulk": {"limit": 2, "period": 60, "algorithm": "sliding_log"},
+    "redirect": {"limit": 2, "period": 60, "algorithm": "gcra"},
+    "api": {"limit": 3, "period": 60, "algorithm": "gcra"},
+}
+
+
+def test_local_bucket_refills_over_time():
+    bucket = LocalTokenBucket(max_keys=10)
+    with mock.patch("shortener.throttling.time.monotonic", return_value=100.0):
+        assert bucket.consume("k", capacity=2, period=10) == (True, 0.0)
+        assert bucket.consume("k", capacity=2, period=10)[0] is True
+        allowed, wait = bucket.consume("k", capacity=2, period=10)
+    assert allowed is False
+    assert wait == 5.0
+    with mock.patch("shortener.throttling.time.monotonic", return_value=105.0):
+        assert bucket.consume("k", capacity=2, period=10)[0] is True
+
+
+def test_local_bucket_refund_and_eviction():
+    bucket = LocalTokenBucket(max_keys=1)
+    bucket.consume("a", capacity=1, period=60)
+    bucket.refund("a", capacity=1)
+    assert bucket.consume("a", capacity=1, period=60)[0] is True
+    bucket.consume("b", capacity=1, period=60)
+    # "a" was evicted, so it starts over with a full bucket.
+    assert bucket.consume("a", capacity=1, period=60)[0] is True
+
+
+def test_disabled_policy_allows_everything():
+    limiter = RedisRateLimiter(redis_url="redis://127.0.0.1:1/0", failure_mode="closed")
+    result = limiter.hit(RateLimitPolicy("off", limit=0, period=60), "1.2.3.4")
+    assert result.allowed
+
+
+def test_client_ip_trusts_only_the_configured_proxies():
+    request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="6.6.6.6, 1.2.3.4, 5.6.7.8")
+    with override_settings(NUM_PROXIES=0):
+        assert client_ip(request) == "10.0.0.1"
+    with override_settings(NUM_PROXIES=1):
+        assert client_ip(request) == "5.6.7.8"
+    with override_settings(NUM_PROXIES=2):
+        assert client_ip(request) == "1.2.3.4"
+    with override_settings(NUM_PROXIES=5):
+        assert client_ip(request) == "6.6.6.6"
+    junk = RequestFactory().get("/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="not-an-ip")
+    with override_settings(NUM_PROXIES=1):
+        assert client_ip(junk) == "10.0.0.1"
+
+
+@override_settings(RATE_LIMIT_POLICIES=POLICIES)
+def test_get_policy_reads_settings():
+    assert get_policy("bulk") == RateLimitPolicy("bulk", 2, 60.0, "sliding_log")
+    assert not get_policy("unknown").enabled
+
+
+class RedisUnavailableTests(TestCase):
+    """Redis at this URL refuses connections, so only the failure modes run."""
+
+    redis_url = "redis://127.0.0.1:1/0"
+    policy = RateLimitPolicy("test", limit=2, period=60)
+
+    def test_local_mode_enforces_per_process(self):
+        limiter = RedisRateLimiter(redis_url=self.redis_url, failure_mode="local")
+        results = [limiter.hit(self.policy, "a").allowed for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertTrue(limiter.hit(self.policy, "b").allowed)
+
+    def test_open_mode_allows_within_local_bucket(self):
+        limiter = RedisRateLimiter(redis_url=self.redis_url, failure_mode="open")
+        result = limiter.hit(self.policy, "a")
+        self.assertTrue(result.allowed)
+
+    def test_closed_mode_rejects(self):
+        limiter = RedisRateLimiter(redis_url=self.redis_url, failure_mode="closed")
+        result = limiter.hit(self.policy, "a")
+        self.assertFalse(result.allowed)
+        self.assertEqual(result.retry_after, 30)
+
+    def test_failure_skips_redis_until_retry(self):
+        limiter = RedisRateLimiter(redis_url=self.redis_url, failure_mode="open")
+        script = mock.Mock(side_effect=RedisConnectionError("down"))
+        with mock.patch.object(limiter, "_script", return_value=script):
+            limiter.hit(self.policy, "a")
+            limiter.hit(self.policy, "b")
+        self.assertEqual(script.call_count, 1)
+
+    def test_async_check_degrades(self):
+        limiter = RedisRateLimiter(redis_url=self.redis_url, failure_mode="closed")
+        result = asyncio.run(limiter.ahit(self.policy, "a"))
+        self.assertFalse(result.allowed)
+
+    def test_denied_by_redis_refunds_local_token(self):
+        limiter = RedisRateLimiter(redis_url=self.redis_url)
+        script = mock.Mock(return_value=[0, 0, 1500])
+        with mock.patch.object(limiter, "_script", return_value=script):
+            result = limiter.hit(self.policy, "a")
+            limiter.hit(self.policy, "a")
+            limiter.hit(self.policy, "a")
+        self.assertEqual(result.retry_after, 2)
+        # Every call reached Redis because rejected calls gave their token back.
+        self.assertEqual(script.call_count, 3)
+        self.assertEqual(script.call_args.kwargs["keys"], ["rl:test:a"])
+
+
+@override_settings(RATE_LIMIT_POLICIES=POLICIES, RATE_LIMIT_FAILURE_MODE="local")
+class RedirectRateLimitTests(TestCase):
+    def setUp(self):
+        rate_limiter.reset()
+        self.link = Link.objects.create(code="limit123", target_url="https://example.com")
+
+    def test_redirect_returns_429_with_retry_after(self):
+        statuses = [self.client.get(f"/{self.link.code}").status_code for _ in range(2)]
+        response = self.client.get(f"/{self.link.code}")
+        self.assertEqual(statuses, [302, 302])
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+
+    @override_settings(NUM_PROXIES=1)
+    def test_redirect_limit_is_per_ip(self):
+        for _ in range(2):
+            self.client.get(f"/{self.link.code}", HTTP_X_FORWARDED_FOR="10.0.0.8")
+        response = self.client.get(f"/{self.link.code}", HTTP_X_FORWARDED_FOR="10.0.0.9")
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(NUM_PROXIES=1)
+    def test_spoofed_forwarded_for_does_not_get_a_fresh_bucket(self):
+        statuses = [
+            self.client.get(f"/{self.link.code}", HTTP_X_FORWARDED_FOR=f"192.0.2.{n}, 10.0.0.8").status_code
+            for n in range(3)
+        ]
+        self.assertEqual(statuses, [302, 302, 429])
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        statuses = [
+            self.client.get(f"/{self.link.code}", HTTP_X_FORWARDED_FOR=f"192.0.2.{n}").status_code for n in range(3)
+        ]
+        self.assertEqual(statuses, [302, 302, 429])
+
+
+@override_settings(RATE_LIMIT_POLICIES=POLICIES, RATE_LIMIT_FAILURE_MODE="local")
+class ApiRateLimitTests(APITestCase):
+    def setUp(self):
+        rate_limiter.reset()
+        self.alice = User.objects.create_user(username="alice", password="password123")
+        self.bob = User.objects.create_user(username="bob", password="password123")
+        self.client = APIClient()
+
+    def test_api_is_limited_per_user(self):
+        self.client.force_authenticate(self.alice)
+        statuses = [self.client.get(reverse("link-list")).status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.client.force_authenticate(self.bob)
+        self.assertEqual(self.client.get(reverse("link-list")).status_code, 200)
+
+    def test_bulk_policy_uses_sliding_log_limit(self):
+        self.client.force_authenticate(self.alice)
+        payload = {"url": "https://example.com", "count": 1}
+        statuses = [self.client.post(reverse("link-bulk-create"), payload, format="json").status_code for _ in range(3)]
+        self.assertEqual(statuses[-1], 429)
+        self.assertNotIn(429, statuses[:-1])
@@ -0,0 +1,127 @@
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shortener.clicks import ClickEvent, flush_clicks
+from shortener.models import Click, DailyClickRollup, DailyUserAgentRollup, Link, UserAgent
+from shortener.rollups import rollup_clicks
+from shortener.user_agents import agent_cache, parse_user_agent
+
+User = get_user_model()
+
+CHROME = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+IPHONE = (
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+    "Version/17.4 Mobile/15E148 Safari/604.1"
+)
+GOOGLEBOT = "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
+
+
+def at(day, hour=12):
+    return datetime(2024, 3, day, hour, tzinfo=dt_timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        (CHROME, ("Chrome", "Windows", "desktop", False)),
+        (IPHONE, ("Safari", "iOS", "mobile", False)),
+        ("Mozilla/5.0 (Linux; Android 14; SM-X910) AppleWebKit/537.36 Chrome/124.0 Safari/537.36",
+         ("Chrome", "Android", "tablet", False)),
+        ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36 Edg/124.0",
+         ("Edge", "Linux", "desktop", False)),
+        (GOOGLEBOT, ("Googlebot", "Other", "bot", True)),
+        ("curl/8.4.0", ("curl", "Other", "bot", True)),
+        ("something odd", ("Other", "Other", "other", False)),
+    ],
+)
+def test_parse_user_agent(raw, expected):
+    info = parse_user_agent(raw)
+    assert (info.browser, info.os, info.device, info.is_bot) == expected
+
+
+class UserAgentTests(TestCase):
+    def setUp(self):
+        agent_cache.clear()
+        self.user = User.objects.create_user(username="alice", password="password123")
+        self.link = Link.objects.create(owner=self.user, code="agent12", target_url="https://example.com")
+
+    def tearDown(self):
+        agent_cache.clear()
+
+    def flush(self, *agents, ts=None):
+        flush_clicks(ClickEvent(link_id=self.link.pk, user_agent=agent, ts=ts or at(1)) for agent in agents)
+
+    def test_resolve_dedups_rows_and_caches_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            refs = agent_cache.resolve([CHROME, CHROME, f"  {GOOGLEBOT} ", "", None])
+        self.assertEqual(set(refs), {CHROME, GOOGLEBOT})
+        self.assertTrue(refs[GOOGLEBOT].is_bot)
+        self.assertEqual(UserAgent.objects.count(), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(agent_cache.resolve([CHROME]), {CHROME: refs[CHROME]})
+
+    def test_flush_references_the_dimension_instead_of_raw_text(self):
+        self.flush(CHROME, CHROME, IPHONE, None)
+        clicks = Click.objects.filter(link=self.link)
+        self.assertEqual(clicks.filter(user_agent__isnull=False).count(), 0)
+        self.assertEqual(clicks.filter(ua__browser="Chrome").count(), 2)
+        self.assertEqual(UserAgent.objects.count(), 2)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        recent = client.get(reverse("link-stats", kwargs={"code": self.link.code})).json()["recent_clicks"]
+        fields = ("user_agent", "browser", "os", "device", "is_bot")
+        rows = [tuple(click[key] for key in fields) for click in recent]
+        self.assertIn((IPHONE, "Safari", "iOS", "mobile", False), rows)
+        self.assertIn((None, None, None, None, None), rows)
+
+    @override_settings(CLICK_EXCLUDE_BOTS=True, CLICK_COUNTER_SHARDS=1)
+    def test_bots_are_excluded_from_counts_and_rollups(self):
+        self.flush(CHROME, GOOGLEBOT, GOOGLEBOT)
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.click_count, 1)
+        rollup_clicks(lag_seconds=0)
+        self.assertEqual(DailyClickRollup.objects.get(link=self.link).clicks, 1)
+        devices = dict(DailyUserAgentRollup.objects.filter(link=self.link).values_list("device", "clicks"))
+        self.assertEqual(devices, {"desktop": 1, "bot": 2})
+
+    def test_timeseries_reports_browsers_and_devices(self):
+        self.flush(CHROME, IPHONE, IPHONE)
+        rollup_clicks(lag_seconds=0)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse("link-stats-timeseries", kwargs={"code": self.link.code})
+        series = client.get(url, {"from": "2024-03-01", "to": "2024-03-01"}).json()
+        browsers = [{"browser": "Safari", "clicks": 2}, {"browser": "Chrome", "clicks": 1}]
+        self.assertEqual(series["top_browsers"], browsers)
+        self.assertEqual(series["top_devices"], [{"device": "mobile", "clicks": 2}, {"device": "desktop", "clicks": 1}])
+
+    @override_settings(CLICK_EXCLUDE_BOTS=True, CLICK_COUNTER_SHARDS=1)
+    def test_backfill_moves_raw_text_and_corrects_rolled_up_clicks(self):
+        for agent in (CHROME, GOOGLEBOT, GOOGLEBOT):
+            Click.objects.create(link=self.link, ts=at(2), user_agent=agent)
+        Link.objects.filter(pk=self.link.pk).update(click_count=3)
+        rollup_clicks(lag_seconds=0)
+        Click.objects.create(link=self.link, ts=at(2), user_agent=IPHONE)
+        Link.objects.filter(pk=self.link.pk).update(click_count=4)
+
+        out = StringIO()
+        call_command("backfill_user_agents", "--batch-size", "2", stdout=out)
+        self.assertIn("Scanned 4 clicks; 2 came from bots.", out.getvalue())
+        self.assertFalse(Click.objects.filter(user_agent__isnull=False).exists())
+        self.assertFalse(Click.objects.filter(ua__isnull=True).exists())
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.click_count, 2)
+        self.assertEqual(DailyClickRollup.objects.get(link=self.link).clicks, 1)
+        agents = dict(DailyUserAgentRollup.objects.filter(link=self.link).values_list("browser", "clicks"))
+        self.assertEqual(agents, {"Chrome": 1, "Googlebot": 2})
+
+        rollup_clicks(lag_seconds=0)
+        self.assertEqual(DailyClickRollup.objects.get(link=self.link).clicks, 2)
+        self.assertEqual(DailyUserAgentRollup.objects.get(link=self.link, browser="Safari").clicks, 1)
@@ -0,0 +1,96 @@
+from datetime import date, datetime, timezone as dt_timezone
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from shortener.clicks import ClickEvent, flush_clicks
+from shortener.hll import STANDARD_ERROR, HyperLogLog
+from shortener.models import Click, Link, VisitorSketch
+from shortener.visitors import record_visitors, unique_visitors, visitor_keys
+
+User = get_user_model()
+
+
+def at(day, hour=12):
+    return datetime(2024, 3, day, hour, tzinfo=dt_timezone.utc)
+
+
+@pytest.mark.parametrize("n", [0, 1, 50, 2_000, 30_000])
+def test_estimate_is_within_error_bound(n):
+    sketch = HyperLogLog().update(f"198.51.{i}" for i in range(n))
+    assert abs(sketch.count() - n) <= max(1, 4 * STANDARD_ERROR * n)
+
+
+def test_duplicates_do_not_count():
+    sketch = HyperLogLog().update(["a", "b", "a", "a"])
+    assert sketch.count() == 2
+    assert not sketch.add("b")
+
+
+def test_merge_is_a_union():
+    first = HyperLogLog().update(str(i) for i in range(3000))
+    second = HyperLogLog().update(str(i) for i in range(2000, 5000))
+    assert abs(first.merge(second).count() - 5000) <= 4 * STANDARD_ERROR * 5000
+
+
+def test_serialization_round_trips_and_is_compact():
+    sketch = HyperLogLog().update(["10.0.0.1", "10.0.0.2"])
+    data = sketch.to_bytes()
+    assert len(data) < 100
+    assert HyperLogLog.from_bytes(data).registers == sketch.registers
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(b"X" + data[1:])
+
+
+def test_visitor_keys_group_by_day_and_total():
+    keys = visitor_keys([(1, at(1), "a"), (1, at(1, 23), "b"), (1, at(2), "a"), (2, at(1), None)])
+    assert keys == {(1, date(2024, 3, 1)): {"a", "b"}, (1, date(2024, 3, 2)): {"a"}, (1, None): {"a", "b"}}
+
+
+@override_settings(CLICK_COUNTER_SHARDS=1)
+class VisitorSketchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", password="password123")
+        self.link = Link.objects.create(owner=self.user, code="uniq123", target_url="https://example.com")
+
+    def flush(self, *clicks):
+        flush_clicks(ClickEvent(link_id=self.link.pk, ip=ip, ts=ts) for ts, ip in clicks)
+
+    def test_flush_updates_daily_and_total_sketches(self):
+        self.flush((at(1), "10.0.0.1"), (at(1), "10.0.0.1"), (at(1), "10.0.0.2"), (at(2), "10.0.0.1"), (at(2), None))
+        self.flush((at(2), "10.0.0.3"))
+        self.assertEqual(VisitorSketch.objects.filter(link=self.link).count(), 3)
+        self.assertEqual(unique_visitors(self.link)["estimate"], 3)
+        self.assertEqual(unique_visitors(self.link, date(2024, 3, 1), date(2024, 3, 1))["estimate"], 2)
+        self.assertEqual(unique_visitors(self.link, date(2024, 3, 2), date(2024, 3, 2))["estimate"], 2)
+        self.assertEqual(unique_visitors(self.link, date(2024, 3, 1), date(2024, 3, 2))["estimate"], 3)
+
+    def test_replaying_visitors_is_idempotent(self):
+        keys = visitor_keys([(self.link.pk, at(1), "10.0.0.1"), (self.link.pk, at(1), "10.0.0.2")])
+        record_visitors(keys)
+        before = [bytes(data) for data in VisitorSketch.objects.order_by("pk").values_list("sketch", flat=True)]
+        record_visitors(keys)
+        after = [bytes(data) for data in VisitorSketch.objects.order_by("pk").values_list("sketch", flat=True)]
+        self.assertEqual(after, before)
+
+    def test_stats_and_timeseries_report_unique_visitors(self):
+        self.flush((at(1), "10.0.0.1"), (at(3), "10.0.0.2"), (at(3), "10.0.0.1"))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        stats = client.get(reverse("link-stats", kwargs={"code": self.link.code})).json()
+        self.assertEqual(stats["unique_visitors"], {"estimate": 2, "standard_error": round(STANDARD_ERROR, 4)})
+        url = reverse("link-stats-timeseries", kwargs={"code": self.link.code})
+        series = client.get(url, {"from": "2024-03-02", "to": "2024-03-03"}).json()
+        self.assertEqual(series["unique_visitors"]["estimate"], 2)
+
+    def test_backfill_command_builds_sketches_from_clicks(self):
+        for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.2", None):
+            Click.objects.create(link=self.link, ts=at(5), ip=ip)
+        call_command("backfill_visitor_sketches", stdout=StringIO())
+        self.assertEqual(unique_visitors(self.link)["estimate"], 2)
+        self.assertEqual(unique_visitors(self.link, date(2024, 3, 5), date(2024, 3, 5))["estimate"], 2)
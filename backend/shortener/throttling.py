@@ -1,12 +1,69 @@
 from __future__ import annotations
 
+import asyncio
+import ipaddress
+import math
+import threading
 import time
+import uuid
+import weakref
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, Optional, Tuple
 
 import redis
-from redis.exceptions import RedisError
 from django.conf import settings
+from redis.commands.core import AsyncScript, Script
+from redis.exceptions import RedisError
+from rest_framework.throttling import BaseThrottle
+
+from .connections import get_async_redis, get_redis
+from .metrics import RATE_LIMIT_DECISIONS, RATE_LIMIT_REDIS_ERRORS
+
+ALGORITHMS = ("gcra", "sliding_log")
+
+# Both scripts read the clock from Redis so every worker agrees on "now",
+# and work in microseconds, which a Lua double still represents exactly.
+_CLOCK = """
+if redis.replicate_commands then redis.replicate_commands() end
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000000 + tonumber(clock[2])
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+"""
+
+GCRA_SCRIPT = (
+    _CLOCK
+    + """
+local interval = period / limit
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+  return {0, 0, math.ceil((allow_at - now) / 1000)}
+end
+redis.call('SET', KEYS[1], string.format('%.0f', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+return {1, math.floor((now - allow_at) / interval), 0}
+"""
+)
+
+SLIDING_LOG_SCRIPT = (
+    _CLOCK
+    + """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', string.format('%.0f', now - period))
+local count = redis.call('ZCARD', KEYS[1])
+if count >= limit then
+  local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+  return {0, 0, math.ceil((tonumber(oldest[2]) + period - now) / 1000)}
+end
+redis.call('ZADD', KEYS[1], string.format('%.0f', now), ARGV[3])
+redis.call('PEXPIRE', KEYS[1], math.ceil(period / 1000))
+return {1, limit - count - 1, 0}
+"""
+)
+
+SCRIPTS = {"gcra": GCRA_SCRIPT, "sliding_log": SLIDING_LOG_SCRIPT}
 
 
 @dataclass
@@ -16,33 +73,234 @@ class RateLimitResult:
     retry_after: Optional[int] = None
 
 
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    name: str
+    limit: int
+    period: float
+    algorithm: str = "gcra"
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0 and self.period > 0
+
+
+def get_policy(name: str) -> RateLimitPolicy:
+    config = settings.RATE_LIMIT_POLICIES.get(name, {})
+    return RateLimitPolicy(
+        name=name,
+        limit=int(config.get("limit", 0)),
+        period=float(config.get("period", 60)),
+        algorithm=config.get("algorithm", "gcra"),
+    )
+
+
+class LocalTokenBucket:
+    """Per-process token buckets, bounded to ``max_keys`` most recent keys."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, Tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: float, period: float) -> Tuple[bool, float]:
+        """Take one token; returns ``(allowed, seconds_until_next_token)``."""
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def refund(self, key: str, capacity: float) -> None:
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry is not None:
+                self._buckets[key] = (min(capacity, entry[0] + 1), entry[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+def _record(policy: RateLimitPolicy, result: RateLimitResult) -> None:
+    RATE_LIMIT_DECISIONS.labels(policy.name, "allowed" if result.allowed else "rejected").inc()
+
+
 class RedisRateLimiter:
-    def __init__(self, redis_url: str | None = None):
+    """Policy-driven limiter: an in-process pre-filter in front of Lua scripts.
+
+    The local token bucket is sized like the policy, so a single process only
+    rejects what the shared limit would reject anyway, without the round trip.
+    ``RATE_LIMIT_FAILURE_MODE`` decides what happens while Redis is down:
+    ``open`` allows, ``closed`` rejects, ``local`` keeps enforcing the policy
+    per process with the pre-filter alone.
+    """
+
+    key_prefix = "rl:"
+
+    def __init__(self, redis_url: str | None = None, failure_mode: str | None = None):
         self.redis_url = redis_url or settings.RATE_LIMIT_REDIS_URL
+        self._failure_mode = failure_mode
+        self.local = LocalTokenBucket(max_keys=settings.RATE_LIMIT_LOCAL_MAX_KEYS)
         self._client: redis.Redis | None = None
+        self._scripts: Dict[str, Script] = {}
+        self._async_scripts: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncScript]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._redis_down_until = 0.0
+
+    @property
+    def failure_mode(self) -> str:
+        return self._failure_mode or settings.RATE_LIMIT_FAILURE_MODE
 
     @property
     def client(self) -> redis.Redis:
         if self._client is None:
-            self._client = redis.Redis.from_url(self.redis_url)
+            self._client = get_redis(self.redis_url)
         return self._client
 
-    def check(self, key: str, limit: int, period: int) -> RateLimitResult:
-        now = int(time.time())
-        window_key = f"rl:{key}:{now // period}"
+    def _script(self, algorithm: str) -> Script:
+        script = self._scripts.get(algorithm)
+        if script is None:
+            script = self._scripts[algorithm] = self.client.register_script(SCRIPTS[algorithm])
+        return script
+
+    def _async_script(self, algorithm: str) -> AsyncScript:
+        loop = asyncio.get_running_loop()
+        scripts = self._async_scripts.get(loop)
+        if scripts is None:
+            client = get_async_redis(self.redis_url)
+            scripts = self._async_scripts[loop] = {
+                name: client.register_script(source) for name, source in SCRIPTS.items()
+            }
+        return scripts[algorithm]
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _mark_redis_down(self) -> None:
+        self._redis_down_until = time.monotonic() + settings.RATE_LIMIT_REDIS_RETRY_SECONDS
+
+    def _prefilter(self, key: str, limit: int, period: float) -> RateLimitResult | None:
+        allowed, wait = self.local.consume(key, limit * settings.RATE_LIMIT_LOCAL_MULTIPLIER, period)
+        if allowed:
+            return None
+        return RateLimitResult(allowed=False, remaining=0, retry_after=max(1, math.ceil(wait)))
+
+    def _script_args(self, limit: int, period: float) -> list:
+        return [limit, int(period * 1_000_000), uuid.uuid4().hex]
+
+    def _result(self, key: str, limit: int, reply) -> RateLimitResult:
+        allowed, remaining, retry_ms = (int(value) for value in reply)
+        if not allowed:
+            self.local.refund(key, limit * settings.RATE_LIMIT_LOCAL_MULTIPLIER)
+            return RateLimitResult(allowed=False, remaining=0, retry_after=max(1, math.ceil(retry_ms / 1000)))
+        return RateLimitResult(allowed=True, remaining=remaining)
+
+    def _degraded(self, limit: int, period: float) -> RateLimitResult:
+        if self.failure_mode == "closed":
+            return RateLimitResult(allowed=False, remaining=0, retry_after=max(1, math.ceil(period / limit)))
+        # "open" allows outright; "local" already passed the per-process bucket.
+        return RateLimitResult(allowed=True, remaining=limit)
+
+    def check(self, key: str, limit: int, period: float, algorithm: str = "gcra") -> RateLimitResult:
+        if limit <= 0:
+            return RateLimitResult(allowed=True, remaining=0)
+        rejected = self._prefilter(key, limit, period)
+        if rejected is not None:
+            return rejected
+        if not self._redis_available():
+            return self._degraded(limit, period)
         try:
-            with self.client.pipeline() as pipe:
-                pipe.incr(window_key)
-                pipe.expire(window_key, period, nx=True)
-                current, _ = pipe.execute()
+            reply = self._script(algorithm)(keys=[self.key_prefix + key], args=self._script_args(limit, period))
         except RedisError:
-            return RateLimitResult(allowed=True, remaining=limit)
-        remaining = max(limit - current, 0)
-        allowed = current <= limit
-        retry_after = None
-        if not allowed:
-            retry_after = period - (now % period)
-        return RateLimitResult(allowed=allowed, remaining=remaining, retry_after=retry_after)
+            RATE_LIMIT_REDIS_ERRORS.inc()
+            self._mark_redis_down()
+            return self._degraded(limit, period)
+        return self._result(key, limit, reply)
+
+    async def acheck(self, key: str, limit: int, period: float, algorithm: str = "gcra") -> RateLimitResult:
+        if limit <= 0:
+            return RateLimitResult(allowed=True, remaining=0)
+        rejected = self._prefilter(key, limit, period)
+        if rejected is not None:
+            return rejected
+        if not self._redis_available():
+            return self._degraded(limit, period)
+        try:
+            reply = await self._async_script(algorithm)(
+                keys=[self.key_prefix + key], args=self._script_args(limit, period)
+            )
+        except RedisError:
+            RATE_LIMIT_REDIS_ERRORS.inc()
+            self._mark_redis_down()
+            return self._degraded(limit, period)
+        return self._result(key, limit, reply)
+
+    def hit(self, policy: RateLimitPolicy | str, identity: str) -> RateLimitResult:
+        policy = get_policy(policy) if isinstance(policy, str) else policy
+        if not policy.enabled:
+            return RateLimitResult(allowed=True, remaining=0)
+        result = self.check(f"{policy.name}:{identity}", policy.limit, policy.period, policy.algorithm)
+        _record(policy, result)
+        return result
+
+    async def ahit(self, policy: RateLimitPolicy | str, identity: str) -> RateLimitResult:
+        policy = get_policy(policy) if isinstance(policy, str) else policy
+        if not policy.enabled:
+            return RateLimitResult(allowed=True, remaining=0)
+        result = await self.acheck(f"{policy.name}:{identity}", policy.limit, policy.period, policy.algorithm)
+        _record(policy, result)
+        return result
+
+    def reset(self) -> None:
+        self.local.clear()
+        self._redis_down_until = 0.0
 
 
 rate_limiter = RedisRateLimiter()
+
+
+def client_ip(request) -> str:
+    """The client's address, trusting ``X-Forwarded-For`` only as far as ``NUM_PROXIES`` hops.
+
+    Each trusted proxy appends the address it got the request from, so the
+    client is the ``NUM_PROXIES``-th entry from the right. Anything further
+    left is whatever the client chose to send, which is the same rule as
+    DRF's ``get_ident``. Without trusted proxies, or when that entry isn't an
+    IP address, ``REMOTE_ADDR`` is used.
+    """
+    remote_addr = request.META.get("REMOTE_ADDR") or "unknown"
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    proxies = settings.NUM_PROXIES
+    if not proxies or not forwarded:
+        return remote_addr
+    addresses = forwarded.split(",")
+    candidate = addresses[-min(proxies, len(addresses))].strip()
+    try:
+        return str(ipaddress.ip_address(candidate))
+    except ValueError:
+        return remote_addr
+
+
+class PolicyRateThrottle(BaseThrottle):
+    """DRF throttle backed by ``rate_limiter``: per user, or per IP (``client_ip``) when anonymous."""
+
+    policy = "api"
+
+    def allow_request(self, request, view) -> bool:
+        user = getattr(request, "user", None)
+        identity = f"user:{user.pk}" if user is not None and user.is_authenticated else f"ip:{client_ip(request)}"
+        self.result = rate_limiter.hit(self.policy, identity)
+        return self.result.allowed
+
+    def wait(self) -> Optional[float]:
+        return self.result.retry_after
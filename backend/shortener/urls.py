@@ -1,10 +1,29 @@
 from django.urls import path
 
-from .views import BulkCreateLinksView, LinkDetailView, LinkListView, LinkStatsView
+from .metrics import metrics_view
+from .views import (
+    BulkCreateLinksView,
+    BulkJobCreateView,
+    BulkJobDetailView,
+    CodePoolStatusView,
+    ConnectionStatusView,
+    LinkDetailView,
+    LinkListView,
+    LinkStatsView,
+    LinkTimeseriesView,
+    StreamingBulkCreateLinksView,
+)
 
 urlpatterns = [
     path("links/", LinkListView.as_view(), name="link-list"),
     path("links/bulk/", BulkCreateLinksView.as_view(), name="link-bulk-create"),
+    path("links/bulk/stream/", StreamingBulkCreateLinksView.as_view(), name="link-bulk-stream"),
+    path("links/bulk/jobs/", BulkJobCreateView.as_view(), name="link-bulk-job-create"),
+    path("links/bulk/<uuid:job_id>/", BulkJobDetailView.as_view(), name="link-bulk-job"),
     path("links/<slug:code>/", LinkDetailView.as_view(), name="link-detail"),
     path("links/<slug:code>/stats/", LinkStatsView.as_view(), name="link-stats"),
+    path("links/<slug:code>/stats/timeseries/", LinkTimeseriesView.as_view(), name="link-stats-timeseries"),
+    path("ops/code-pool/", CodePoolStatusView.as_view(), name="code-pool-status"),
+    path("ops/connections/", ConnectionStatusView.as_view(), name="connection-status"),
+    path("ops/metrics/", metrics_view, name="metrics"),
 ]
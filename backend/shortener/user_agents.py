@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from .counters import discount_click_counts
+from .db_router import use_primary
+from .models import Click, RollupWatermark, UserAgent
+from .rollups import WATERMARK_NAME, day_bucket, discount_clicks, reassign_user_agents
+
+# Longer strings are cut before hashing so junk headers can't bloat the dimension table.
+MAX_LENGTH = 1024
+
+_BOT = re.compile(
+    r"bot\b|bot/|crawl|spider|slurp|archiver|preview|monitor|scan|fetch|headless|lighthouse|"
+    r"facebookexternalhit|curl/|wget/|python-|httpclient|go-http-client|okhttp|java/|libwww|axios/|node-fetch",
+    re.IGNORECASE,
+)
+_BOT_NAME = re.compile(r"([A-Za-z][\w.\-]*?(?:bot|crawler|spider))\b", re.IGNORECASE)
+_CLIENT_NAME = re.compile(r"^([A-Za-z][\w.\-]*)/")
+# First match wins, so the more specific tokens come before the ones they embed.
+_BROWSERS: List[Tuple[str, re.Pattern]] = [
+    ("Edge", re.compile(r"Edg(?:e|A|iOS)?/")),
+    ("Opera", re.compile(r"OPR/|Opera")),
+    ("Samsung Internet", re.compile(r"SamsungBrowser/")),
+    ("Firefox", re.compile(r"Firefox/|FxiOS/")),
+    ("Chrome", re.compile(r"Chrome/|CriOS/|Chromium/")),
+    ("Safari", re.compile(r"Version/[\d.]+.*Safari/")),
+    ("Internet Explorer", re.compile(r"MSIE |Trident/")),
+]
+_SYSTEMS: List[Tuple[str, re.Pattern]] = [
+    ("Windows", re.compile(r"Windows")),
+    ("iOS", re.compile(r"iPhone|iPad|iPod")),
+    ("Android", re.compile(r"Android")),
+    ("ChromeOS", re.compile(r"CrOS")),
+    ("macOS", re.compile(r"Macintosh|Mac OS X")),
+    ("Linux", re.compile(r"Linux|X11")),
+]
+_TABLET = re.compile(r"iPad|Tablet|Kindle|Silk/")
+_MOBILE = re.compile(r"Mobi|iPhone|iPod|Android|Windows Phone")
+_DESKTOP_SYSTEMS = {"Windows", "macOS", "Linux", "ChromeOS"}
+
+
+@dataclass(frozen=True)
+class AgentInfo:
+    browser: str
+    os: str
+    device: str
+    is_bot: bool
+
+
+class AgentRef(NamedTuple):
+    id: int
+    is_bot: bool
+
+
+def clean(raw: str | None) -> str:
+    return (raw or "").strip()[:MAX_LENGTH]
+
+
+def ua_hash(raw: str) -> str:
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _first(rules: List[Tuple[str, re.Pattern]], raw: str) -> str:
+    return next((name for name, pattern in rules if pattern.search(raw)), "Other")
+
+
+@lru_cache(maxsize=4096)
+def parse_user_agent(raw: str) -> AgentInfo:
+    """Browser family, OS, device type and bot flag from a handful of ordered regex rules."""
+    system = _first(_SYSTEMS, raw)
+    if _BOT.search(raw):
+        name = _BOT_NAME.search(raw) or _CLIENT_NAME.search(raw)
+        return AgentInfo(name.group(1)[:64] if name else "Other", system, UserAgent.Device.BOT, True)
+    if _TABLET.search(raw) or (system == "Android" and "Mobile" not in raw):
+        device = UserAgent.Device.TABLET
+    elif _MOBILE.search(raw):
+        device = UserAgent.Device.MOBILE
+    elif system in _DESKTOP_SYSTEMS:
+        device = UserAgent.Device.DESKTOP
+    else:
+        device = UserAgent.Device.OTHER
+    return AgentInfo(_first(_BROWSERS, raw), system, device, False)
+
+
+class AgentCache:
+    """Per-process LRU of ``ua_hash`` -> ``UserAgent`` row, so hot agents never hit the database.
+
+    Misses are read by hash and the unknown ones inserted with
+    ``ON CONFLICT DO NOTHING``, so concurrent workers converge on one row per
+    string. Looked-up rows are only cached once the surrounding transaction
+    commits, so a rollback can't leave a dangling id behind.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, AgentRef] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, raws: Iterable[str | None]) -> Dict[str, AgentRef]:
+        """Map each non-empty (cleaned) user-agent string to its row."""
+        wanted = {clean(raw): None for raw in raws}
+        wanted.pop("", None)
+        hashes = {ua_hash(raw): raw for raw in wanted}
+        found: Dict[str, AgentRef] = {}
+        with self._lock:
+            for digest in hashes:
+                ref = self._entries.get(digest)
+                if ref is not None:
+                    self._entries.move_to_end(digest)
+                    found[digest] = ref
+        missing = [digest for digest in hashes if digest not in found]
+        if missing:
+            with use_primary():
+                stored = self._fetch(missing)
+                new = [digest for digest in missing if digest not in stored]
+                if new:
+                    UserAgent.objects.bulk_create(
+                        [self._build(digest, hashes[digest]) for digest in new], batch_size=500, ignore_conflicts=True
+                    )
+                    stored.update(self._fetch(new))
+            transaction.on_commit(lambda: self._remember(stored))
+            found.update(stored)
+        return {hashes[digest]: ref for digest, ref in found.items()}
+
+    @staticmethod
+    def _fetch(digests: List[str]) -> Dict[str, AgentRef]:
+        rows = UserAgent.objects.filter(ua_hash__in=digests).values_list("ua_hash", "pk", "is_bot")
+        return {digest: AgentRef(pk, is_bot) for digest, pk, is_bot in rows}
+
+    @staticmethod
+    def _build(digest: str, raw: str) -> UserAgent:
+        info = parse_user_agent(raw)
+        return UserAgent(
+            ua_hash=digest, raw=raw, browser=info.browser, os=info.os, device=info.device, is_bot=info.is_bot
+        )
+
+    def _remember(self, refs: Dict[str, AgentRef]) -> None:
+        with self._lock:
+            self._entries.update(refs)
+            for digest in refs:
+                self._entries.move_to_end(digest)
+            while len(self._entries) > settings.USER_AGENT_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+agent_cache = AgentCache()
+
+
+def backfill_user_agents(batch_size: int = 5000, since: date | None = None) -> Tuple[int, int]:
+    """Move raw ``Click.user_agent`` text onto ``UserAgent`` rows; returns ``(scanned, bots)``.
+
+    Runs in keyset-ordered chunks under the rollup watermark lock. Clicks the
+    rollup worker already counted are moved out of the unknown user-agent
+    bucket and, with ``CLICK_EXCLUDE_BOTS``, bots are taken back out of
+    ``click_count`` and the click rollups. Unique-visitor sketches can't
+    forget a visitor, so those keep any bots already folded in.
+    """
+    clicks = Click.objects.filter(ua__isnull=True, user_agent__isnull=False)
+    if since is not None:
+        clicks = clicks.filter(ts__date__gte=since)
+    last_id = scanned = bots = 0
+    while True:
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK_NAME)
+            batch = clicks.filter(pk__gt=last_id).order_by("pk")
+            rows = list(batch.values_list("pk", "link_id", "ts", "referrer", "country", "user_agent")[:batch_size])
+            if not rows:
+                return scanned, bots
+            agents = agent_cache.resolve(row[5] for row in rows)
+            details = UserAgent.objects.in_bulk({agent.id for agent in agents.values()})
+            by_agent: Dict[int | None, List[int]] = defaultdict(list)
+            rolled_up: Counter = Counter()
+            excluded: Counter = Counter()
+            discounted = []
+            for pk, link_id, ts, referrer, country, raw in rows:
+                agent = agents.get(clean(raw))
+                by_agent[agent.id if agent else None].append(pk)
+                if agent is None:
+                    continue
+                bots += agent.is_bot
+                if agent.is_bot and settings.CLICK_EXCLUDE_BOTS:
+                    excluded[link_id] += 1
+                if pk <= watermark.last_click_id:
+                    row = details[agent.id]
+                    rolled_up[(link_id, day_bucket(ts), row.browser, row.os, row.device)] += 1
+                    if agent.is_bot and settings.CLICK_EXCLUDE_BOTS:
+                        discounted.append((link_id, ts, referrer, country))
+            for agent_id, pks in by_agent.items():
+                Click.objects.filter(pk__in=pks).update(ua_id=agent_id, user_agent=None)
+            reassign_user_agents(rolled_up)
+            discount_clicks(discounted)
+            discount_click_counts(excluded)
+        scanned += len(rows)
+        last_id = rows[-1][0]
@@ -2,22 +2,44 @@ from __future__ import annotations
 
 import secrets
 import string
-from typing import Iterable, Iterator, Set, TypeVar
+from typing import Iterable, Iterator, List, Set, TypeVar
 
 BASE62_ALPHABET = string.digits + string.ascii_letters
 T = TypeVar("T")
 
+# Bytes below 248 (= 4 * 62) map uniformly onto the alphabet via ``b % 62``;
+# the top 8 values are rejected so no character is favoured.
+_ACCEPTED_BYTES = 256 - 256 % len(BASE62_ALPHABET)
+_BYTE_TO_BASE62 = bytes(ord(BASE62_ALPHABET[value % len(BASE62_ALPHABET)]) for value in range(256))
+_REJECTED_BYTES = bytes(range(_ACCEPTED_BYTES, 256))
+
+
+def random_base62(size: int) -> str:
+    chars = bytearray()
+    while len(chars) < size:
+        missing = size - len(chars)
+        raw = secrets.token_bytes(missing * 256 // _ACCEPTED_BYTES + 8)
+        chars += raw.translate(_BYTE_TO_BASE62, _REJECTED_BYTES)
+    return chars[:size].decode("ascii")
+
 
 def generate_code(length: int) -> str:
     if length <= 0:
         raise ValueError("length must be positive")
-    return "".join(secrets.choice(BASE62_ALPHABET) for _ in range(length))
+    return random_base62(length)
+
+
+def generate_codes(length: int, count: int) -> List[str]:
+    if length <= 0:
+        raise ValueError("length must be positive")
+    blob = random_base62(length * count)
+    return [blob[start : start + length] for start in range(0, len(blob), length)]
 
 
 def batch_generate_codes(length: int, count: int) -> Set[str]:
     codes: Set[str] = set()
     while len(codes) < count:
-        codes.add(generate_code(length))
+        codes.update(generate_codes(length, count - len(codes)))
     return codes
 
 
@@ -1,42 +1,102 @@
 from __future__ import annotations
 
+import json
 from typing import List
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Q
-from django.http import HttpResponseGone
-from django.shortcuts import get_object_or_404, redirect
-from rest_framework import generics, permissions, response, status, views
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from rest_framework import exceptions, generics, permissions, response, status, views
 
-from .models import Link
-from .serializers import BulkCreateRequestSerializer, LinkSerializer, LinkStatsSerializer
-from .services import bulk_create_links, enforce_bulk_rate_limit
+from .bulk_jobs import submit_job
+from .code_pool import pool_status
+from .connections import database_stats, redis_pool_stats
+from .models import BulkJob, Link
+from .pagination import LinkCursorPagination
+from .redirects import aredirect_response, redirect_response
+from .rollups import click_timeseries
+from .search import search_links
+from .serializers import (
+    BulkCreateRequestSerializer,
+    BulkJobRequestSerializer,
+    BulkJobSerializer,
+    LinkSerializer,
+    LinkStatsSerializer,
+    TimeseriesQuerySerializer,
+)
+from .services import (
+    bulk_create_links,
+    enforce_bulk_rate_limit,
+    iter_bulk_rows,
+    recent_clicks,
+    stream_bulk_create_links,
+)
+from .throttling import client_ip
+from .visitors import unique_visitors
 
 User = get_user_model()
 
 
-def _client_ip(request) -> str:
-    x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
-    if x_forwarded_for:
-        return x_forwarded_for.split(",")[0].strip()
-    return request.META.get("REMOTE_ADDR", "unknown")
+class LinkListView(generics.ListAPIView):
+    """The caller's links, newest first, keyset-paginated.
 
+    ``?fields=code,short_url`` limits both the output and the columns loaded;
+    ``?export=ndjson`` streams every matching link instead of one page.
+    """
 
-class LinkListView(generics.ListAPIView):
     serializer_class = LinkSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = LinkCursorPagination
+
+    def requested_fields(self) -> List[str] | None:
+        raw = self.request.query_params.get("fields")
+        if not raw:
+            return None
+        fields = [name.strip() for name in raw.split(",") if name.strip()]
+        unknown = sorted(set(fields) - set(LinkSerializer.Meta.fields))
+        if unknown:
+            raise exceptions.ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}."})
+        return fields
 
     def get_queryset(self):
-        queryset = Link.objects.filter(owner=self.request.user).order_by("-created_at")
+        fields = self.requested_fields()
+        queryset = Link.objects.filter(owner=self.request.user).order_by("-created_at", "-id")
+        if fields is None or "click_count" in fields:
+            queryset = queryset.with_click_totals()
+        if fields is not None:
+            queryset = queryset.only(*LinkSerializer.columns_for(fields))
         params = self.request.query_params
         target = params.get("target")
         if target:
-            queryset = queryset.filter(target_url=target)
+            queryset = queryset.for_target(target)
         query = params.get("q") or params.get("search")
         if query:
-            queryset = queryset.filter(Q(target_url__icontains=query) | Q(code__icontains=query))
+            queryset = search_links(queryset, query)
         return queryset
 
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("export") == "ndjson":
+            return self.export(request)
+        return super().list(request, *args, **kwargs)
+
+    def export(self, request):
+        queryset = self.get_queryset()
+        fields = self.requested_fields()
+
+        def rows():
+            for link in queryset.iterator(chunk_size=2000):
+                yield json.dumps(LinkSerializer(link, fields=fields).data, default=str) + "\n"
+
+        export = StreamingHttpResponse(rows(), content_type="application/x-ndjson")
+        export["Content-Disposition"] = 'attachment; filename="links.ndjson"'
+        return export
+
 
 class LinkDetailView(generics.DestroyAPIView):
     serializer_class = LinkSerializer
@@ -51,7 +111,7 @@ class BulkCreateLinksView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        enforce_bulk_rate_limit(_client_ip(request))
+        enforce_bulk_rate_limit(client_ip(request))
         serializer = BulkCreateRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
@@ -73,28 +133,131 @@ class BulkCreateLinksView(views.APIView):
         return response.Response(payload, status=status_code)
 
 
+class StreamingBulkCreateLinksView(views.APIView):
+    """Create links from an NDJSON or CSV body, streaming NDJSON results back.
+
+    Rows are ``{url, expires_at, code_length}``; the body is read line by line
+    and written in chunks of ``BULK_STREAM_CHUNK_SIZE``.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if not request.META.get("CONTENT_LENGTH"):
+            # Django exposes no body without a length, so a chunked upload would
+            # read as empty and come back as "0 created".
+            return response.Response(
+                {"detail": "Content-Length is required; chunked request bodies are not supported."},
+                status=status.HTTP_411_LENGTH_REQUIRED,
+            )
+        enforce_bulk_rate_limit(client_ip(request))
+        rows = iter_bulk_rows(
+            request.stream or [],
+            csv_format=request.content_type.split(";")[0].strip() == "text/csv",
+            max_rows=settings.BULK_STREAM_MAX_ROWS,
+        )
+        results = stream_bulk_create_links(
+            owner=request.user,
+            rows=rows,
+            chunk_size=settings.BULK_STREAM_CHUNK_SIZE,
+        )
+        return StreamingHttpResponse(
+            (json.dumps(result, default=str) + "\n" for result in results),
+            content_type="application/x-ndjson",
+        )
+
+
+class BulkJobCreateView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = BulkJobRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        idempotency_key = request.headers.get("Idempotency-Key", "").strip() or None
+        if idempotency_key and len(idempotency_key) > 255:
+            raise exceptions.ValidationError({"idempotency_key": "Idempotency-Key must be at most 255 characters."})
+        if not (idempotency_key and BulkJob.objects.filter(owner=request.user, idempotency_key=idempotency_key).exists()):
+            enforce_bulk_rate_limit(client_ip(request))
+        job, created = submit_job(
+            owner=request.user,
+            target_url=data["url"],
+            count=data["count"],
+            code_length=data["resolved_code_length"],
+            expires_at=data.get("expires_at"),
+            idempotency_key=idempotency_key,
+        )
+        status_code = status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+        headers = {"Location": reverse("link-bulk-job", kwargs={"job_id": job.pk})}
+        return response.Response(BulkJobSerializer(job).data, status=status_code, headers=headers)
+
+
+class BulkJobDetailView(views.APIView):
+    """Job progress plus one page of its links, keyed on link id (``?after=``)."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_object_or_404(BulkJob, pk=job_id, owner=request.user)
+        try:
+            after = int(request.query_params.get("after", 0))
+            limit = int(request.query_params.get("limit", settings.BULK_JOB_PAGE_SIZE))
+        except ValueError:
+            raise exceptions.ValidationError({"detail": "after and limit must be integers."})
+        limit = max(1, min(limit, 1000))
+        links = list(job.links.filter(pk__gt=after).with_click_totals().order_by("pk")[: limit + 1])
+        has_more = len(links) > limit
+        links = links[:limit]
+        payload = BulkJobSerializer(job).data
+        payload["links"] = LinkSerializer(links, many=True).data
+        payload["next"] = links[-1].pk if has_more else None
+        return response.Response(payload)
+
+
 class LinkStatsView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, code: str):
-        link = get_object_or_404(Link, code=code, owner=request.user)
-        recent_clicks = list(link.clicks.all()[:50])
-        stats = LinkStatsSerializer.from_link(link, recent_clicks)
+        link = get_object_or_404(Link.objects.with_click_totals(), code=code, owner=request.user)
+        stats = LinkStatsSerializer.from_link(link, recent_clicks(link), unique_visitors(link))
         return response.Response(stats.data)
 
 
+class LinkTimeseriesView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, code: str):
+        link = get_object_or_404(Link, code=code, owner=request.user)
+        query = TimeseriesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        return response.Response(
+            click_timeseries(link, params["from"], params["to"], params["granularity"], top=params["top"])
+        )
+
+
+class CodePoolStatusView(views.APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return response.Response({"pools": pool_status()})
+
+
+class ConnectionStatusView(views.APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return response.Response({"redis": redis_pool_stats(), "databases": database_stats()})
+
+
 class RedirectView(views.APIView):
     permission_classes: List[type[permissions.BasePermission]] = [permissions.AllowAny]
+    # Redirects are limited per IP by the "redirect" policy in redirect_response.
+    throttle_classes: List[type] = []
 
     def get(self, request, code: str):
-        link = get_object_or_404(Link, code=code)
-        if not link.is_active:
-            return HttpResponseGone("Link is inactive")
-        if link.is_expired():
-            return HttpResponseGone("Link has expired")
-        link.mark_clicked(
-            ip=_client_ip(request),
-            user_agent=request.META.get("HTTP_USER_AGENT"),
-            referrer=request.META.get("HTTP_REFERER"),
-        )
-        return redirect(link.target_url)
+        return redirect_response(request, code)
+
+
+async def async_redirect_view(request, code: str):
+    return await aredirect_response(request, code)
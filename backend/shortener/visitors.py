@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from .hll import STANDARD_ERROR, HyperLogLog
+from .models import Click, Link, VisitorSketch
+
+SketchKey = Tuple[int, Optional[date]]
+
+
+def _day(ts: datetime) -> date:
+    return ts.astimezone(dt_timezone.utc).date()
+
+
+def visitor_keys(rows: Iterable[Tuple[int, datetime, Optional[str]]]) -> Dict[SketchKey, Set[str]]:
+    """Group ``(link_id, ts, ip)`` rows by daily and all-time sketch; rows without an IP are skipped."""
+    keys: Dict[SketchKey, Set[str]] = defaultdict(set)
+    for link_id, ts, ip in rows:
+        if not ip:
+            continue
+        keys[(link_id, _day(ts))].add(ip)
+        keys[(link_id, None)].add(ip)
+    return keys
+
+
+def record_visitors(visitors: Dict[SketchKey, Set[str]]) -> None:
+    """Fold visitor IPs into the stored sketches. Adding an IP twice is a no-op, so replays are safe."""
+    if not visitors:
+        return
+    # A stable lock order keeps concurrent flushes from deadlocking.
+    ordered = sorted(visitors, key=lambda key: (key[0], key[1] or date.min))
+    days = {day for _, day in ordered if day is not None}
+    with transaction.atomic():
+        existing = {
+            (row.link_id, row.day): row
+            for row in VisitorSketch.objects.select_for_update()
+            .filter(link_id__in={link_id for link_id, _ in ordered})
+            .filter(models.Q(day__in=days) | models.Q(day__isnull=True))
+            .order_by("link_id", "day")
+        }
+        changed: List[VisitorSketch] = []
+        now = timezone.now()
+        for key in ordered:
+            row = existing.get(key)
+            if row is None:
+                _create(key, visitors[key])
+                continue
+            sketch = HyperLogLog.from_bytes(row.sketch)
+            if any([sketch.add(ip) for ip in visitors[key]]):
+                row.sketch, row.updated_at = sketch.to_bytes(), now
+                changed.append(row)
+        if changed:
+            VisitorSketch.objects.bulk_update(changed, ["sketch", "updated_at"], batch_size=500)
+
+
+def _create(key: SketchKey, ips: Set[str]) -> None:
+    link_id, day = key
+    sketch = HyperLogLog().update(ips)
+    try:
+        with transaction.atomic():
+            VisitorSketch.objects.create(link_id=link_id, day=day, sketch=sketch.to_bytes())
+    except IntegrityError:
+        # Another flush created it first; merge into theirs.
+        row = VisitorSketch.objects.select_for_update().get(link_id=link_id, day=day)
+        row.sketch = HyperLogLog.from_bytes(row.sketch).merge(sketch).to_bytes()
+        row.save(update_fields=["sketch", "updated_at"])
+
+
+def unique_visitors(link: Link, first_day: date | None = None, last_day: date | None = None) -> dict:
+    """Approximate distinct visitor IPs, all time or for ``[first_day, last_day]`` merged from daily sketches."""
+    if first_day is None and last_day is None:
+        rows = VisitorSketch.objects.filter(link=link, day__isnull=True)
+    else:
+        rows = VisitorSketch.objects.filter(link=link, day__isnull=False)
+        if first_day is not None:
+            rows = rows.filter(day__gte=first_day)
+        if last_day is not None:
+            rows = rows.filter(day__lte=last_day)
+    merged = HyperLogLog.union(HyperLogLog.from_bytes(data) for data in rows.values_list("sketch", flat=True))
+    return {"estimate": merged.count(), "standard_error": round(STANDARD_ERROR, 4)}
+
+
+def backfill_visitor_sketches(batch_size: int = 500, since: date | None = None) -> int:
+    """Build sketches from stored clicks, a batch of links at a time; returns links scanned.
+
+    Merges into existing sketches, so it can run while the click worker keeps flushing.
+    """
+    links = Link.objects.order_by("pk").values_list("pk", flat=True)
+    clicks = Click.objects.exclude(ip__isnull=True).order_by()
+    if since is not None:
+        clicks = clicks.filter(ts__date__gte=since)
+    last_id, scanned = 0, 0
+    while True:
+        link_ids = list(links.filter(pk__gt=last_id)[:batch_size])
+        if not link_ids:
+            return scanned
+        rows = clicks.filter(link_id__in=link_ids).values_list("link_id", "ts", "ip").iterator(chunk_size=10_000)
+        record_visitors(visitor_keys(rows))
+        scanned += len(link_ids)
+        last_id = link_ids[-1]
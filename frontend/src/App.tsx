@@ -18,6 +18,7 @@ export default function App() {
   const [links, setLinks] = useState<LinkDto[]>([]);
   const [generated, setGenerated] = useState<LinkDto[]>([]);
   const [loadingLinks, setLoadingLinks] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [toast, setToast] = useState<ToastState | null>(null);
   const [stats, setStats] = useState<LinkStatsResponse | null>(null);
   const [statsOpen, setStatsOpen] = useState(false);
@@ -32,7 +33,8 @@ export default function App() {
     setLoadingLinks(true);
     try {
       const response = await fetchLinks(token);
-      setLinks(response);
+      setLinks(response.links);
+      setNextCursor(response.nextCursor);
     } catch (err) {
       console.error(err);
       showToast({ type: 'error', message: err instanceof Error ? err.message : 'Failed to load links' });
@@ -41,11 +43,30 @@ export default function App() {
     }
   }, [token, showToast]);
 
+  const loadMoreLinks = useCallback(async () => {
+    if (!token || !nextCursor) return;
+    setLoadingLinks(true);
+    try {
+      const response = await fetchLinks(token, nextCursor);
+      setLinks((prev) => {
+        const known = new Set(prev.map((link) => link.id));
+        return [...prev, ...response.links.filter((link) => !known.has(link.id))];
+      });
+      setNextCursor(response.nextCursor);
+    } catch (err) {
+      console.error(err);
+      showToast({ type: 'error', message: err instanceof Error ? err.message : 'Failed to load links' });
+    } finally {
+      setLoadingLinks(false);
+    }
+  }, [token, nextCursor, showToast]);
+
   useEffect(() => {
     if (isAuthenticated) {
       void loadLinks();
     } else {
       setLinks([]);
+      setNextCursor(null);
       setGenerated([]);
     }
   }, [isAuthenticated, loadLinks]);
@@ -209,6 +230,7 @@ export default function App() {
               links={links}
               loading={loadingLinks}
               onRefresh={loadLinks}
+              onLoadMore={nextCursor ? loadMoreLinks : undefined}
               onShowStats={handleShowStats}
               onDelete={handleDeleteLink}
             />
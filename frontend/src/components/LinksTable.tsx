@@ -6,11 +6,19 @@ interface LinksTableProps {
   links: LinkDto[];
   loading?: boolean;
   onRefresh: () => void;
+  onLoadMore?: () => void;
   onShowStats: (link: LinkDto) => void;
   onDelete: (link: LinkDto) => void | Promise<void>;
 }
 
-export default function LinksTable({ links, loading, onRefresh, onShowStats, onDelete }: LinksTableProps) {
+export default function LinksTable({
+  links,
+  loading,
+  onRefresh,
+  onLoadMore,
+  onShowStats,
+  onDelete
+}: LinksTableProps) {
   const [copiedCode, setCopiedCode] = useState<string | null>(null);
   const [copiedGroup, setCopiedGroup] = useState<string | null>(null);
   const [search, setSearch] = useState('');
@@ -206,6 +214,18 @@ export default function LinksTable({ links, loading, onRefresh, onShowStats, onD
           ))}
         </div>
       )}
+      {onLoadMore && !isEmpty ? (
+        <div className="border-t border-slate-700 px-4 py-3 text-center">
+          <button
+            type="button"
+            onClick={onLoadMore}
+            disabled={loading}
+            className="text-sm font-medium text-brand hover:text-sky-300 disabled:opacity-50"
+          >
+            {loading ? 'Loading…' : 'Load older links'}
+          </button>
+        </div>
+      ) : null}
     </div>
   );
 }
@@ -74,11 +74,20 @@ export default function StatsModal({ open, stats, onClose }: StatsModalProps) {
                         {stats.link.short_url}
                       </a>
                     </div>
-                    <div className="grid gap-4 sm:grid-cols-3">
+                    <div className="grid gap-4 sm:grid-cols-4">
                       <div className="rounded-lg bg-slate-800 p-4">
                         <p className="text-xs uppercase tracking-wide text-slate-400">Total clicks</p>
                         <p className="mt-2 text-3xl font-bold text-slate-100">{stats.total_clicks}</p>
                       </div>
+                      <div className="rounded-lg bg-slate-800 p-4">
+                        <p className="text-xs uppercase tracking-wide text-slate-400">Unique visitors</p>
+                        <p
+                          className="mt-2 text-3xl font-bold text-slate-100"
+                          title={`Approximate, ±${(stats.unique_visitors.standard_error * 100).toFixed(1)}%`}
+                        >
+                          ~{stats.unique_visitors.estimate}
+                        </p>
+                      </div>
                       <div className="rounded-lg bg-slate-800 p-4">
                         <p className="text-xs uppercase tracking-wide text-slate-400">Recent events</p>
                         <p className="mt-2 text-3xl font-bold text-slate-100">{stats.recent_clicks.length}</p>
@@ -125,13 +134,14 @@ export default function StatsModal({ open, stats, onClose }: StatsModalProps) {
                           <tr>
                             <th className="px-4 py-2 text-left text-slate-300">Timestamp</th>
                             <th className="px-4 py-2 text-left text-slate-300">IP</th>
+                            <th className="px-4 py-2 text-left text-slate-300">Client</th>
                             <th className="px-4 py-2 text-left text-slate-300">Referrer</th>
                           </tr>
                         </thead>
                         <tbody className="divide-y divide-slate-800">
                           {stats.recent_clicks.length === 0 ? (
                             <tr>
-                              <td colSpan={3} className="px-4 py-4 text-center text-slate-500">
+                              <td colSpan={4} className="px-4 py-4 text-center text-slate-500">
                                 No click events recorded yet.
                               </td>
                             </tr>
@@ -140,6 +150,9 @@ export default function StatsModal({ open, stats, onClose }: StatsModalProps) {
                               <tr key={click.ts}>
                                 <td className="px-4 py-2 text-slate-200">{new Date(click.ts).toLocaleString()}</td>
                                 <td className="px-4 py-2 text-slate-400">{click.ip ?? '—'}</td>
+                                <td className="px-4 py-2 text-slate-400" title={click.user_agent ?? undefined}>
+                                  {click.browser ? `${click.browser} · ${click.os} · ${click.device}` : '—'}
+                                </td>
                                 <td className="px-4 py-2 text-slate-400">
                                   <span className="line-clamp-2 break-words">{click.referrer ?? '—'}</span>
                                 </td>
@@ -32,6 +32,10 @@ export interface ClickEventDto {
   ts: string;
   ip: string | null;
   user_agent: string | null;
+  browser: string | null;
+  os: string | null;
+  device: 'desktop' | 'mobile' | 'tablet' | 'bot' | 'other' | null;
+  is_bot: boolean | null;
   referrer: string | null;
   country: string | null;
 }
@@ -39,6 +43,7 @@ export interface ClickEventDto {
 export interface LinkStatsResponse {
   link: LinkDto;
   total_clicks: number;
+  unique_visitors: { estimate: number; standard_error: number };
   recent_clicks: ClickEventDto[];
 }
 
@@ -79,13 +84,20 @@ export async function bulkCreateLinks(token: string, payload: BulkCreatePayload)
   return parseResponse<BulkCreateResponse>(res);
 }
 
-export async function fetchLinks(token: string): Promise<LinkDto[]> {
-  const res = await fetch(`${API_BASE}/api/links/`, {
+export interface LinksPage {
+  links: LinkDto[];
+  nextCursor: string | null;
+}
+
+export async function fetchLinks(token: string, cursor?: string | null): Promise<LinksPage> {
+  const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+  const res = await fetch(`${API_BASE}/api/links/${query}`, {
     headers: {
       Authorization: `Bearer ${token}`
     }
   });
-  return parseResponse<LinkDto[]>(res);
+  const links = await parseResponse<LinkDto[]>(res);
+  return { links, nextCursor: res.headers.get('X-Next-Cursor') };
 }
 
 export async function fetchStats(token: string, code: string): Promise<LinkStatsResponse> {